@@ -111,6 +111,32 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'benta.wsgi.application'
+ASGI_APPLICATION = 'benta.asgi.application'
+
+# -------------------------------------------------------------------
+# CHANNELS & CACHE — with REDIS_URL set, Redis fans messaging events
+# out across nodes and holds the shared cache (presence, feed
+# timelines). Without it both stay local to this process.
+# -------------------------------------------------------------------
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [REDIS_URL]},
+        }
+    }
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}
+    }
 
 # -------------------------------------------------------------------
 # DATABASE — AUTO Railway support
@@ -184,8 +210,12 @@ STATICFILES_DIRS = [
 
 #end
 MAX_UPLOAD_SIZE = 314572800  # 300MB in bytes
-DATA_UPLOAD_MAX_MEMORY_SIZE = 314572800  # 300MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 314572800  # 300MB
+# Large files go through the chunked upload API (hiring.services.chunked_upload);
+# form uploads above 2.5MB spill to a temporary file instead of worker memory
+DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB of non-file request data
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB
+CHUNKED_UPLOAD_CHUNK_SIZE = 5242880  # 5MB, the S3 multipart minimum
+CHUNKED_UPLOAD_EXPIRY = 24  # hours before an unattached upload is discarded
 
 # Add to Django settings
 FILE_UPLOAD_HANDLERS = [
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
 from .models import *
+from .services.job_facets import invalidate_job_facets
 
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'user_type', 'mobile_phone', 'is_staff', 'date_joined')
@@ -91,6 +92,19 @@ class JobListingAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
+    
+    # Keep cached job search facet counts in step with listing edits
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_job_facets()
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_job_facets()
+    
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        invalidate_job_facets()
 
 class ApplicationAdmin(admin.ModelAdmin):
     list_display = ('get_applicant_name', 'get_job_title', 'status', 'applied_date', 'get_company')
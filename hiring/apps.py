@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class HiringConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hiring'
-    verbose_name = 'Hiring Portal'
\ No newline at end of file
+    verbose_name = 'Hiring Portal'
+
+    def ready(self):
+        from . import signals  # noqa: F401
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""
+WebSocket consumer for a single conversation.
+
+Clients connect to ws/conversations/<conversation_id>/ with their session
+cookie and receive the events described in services.realtime, including
+their own unread badge. They can
+send two events of their own:
+- {"type": "typing", "is_typing": true|false}: relayed to the other sockets
+- {"type": "read"}: marks the messages sent to this user as read, then
+  broadcasts a read receipt
+Opening the socket counts as a presence heartbeat, and typing events
+update the cached typing state (services.presence). New messages are
+still sent through the REST endpoints, which validate and store them
+before they are pushed here.
+"""
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .models import Conversation
+from .services import presence
+from .services.inbox import mark_conversation_read
+from .services.realtime import conversation_group, user_group
+
+
+class ConversationConsumer(AsyncJsonWebsocketConsumer):
+
+    async def connect(self):
+        self.user = self.scope.get('user')
+        self.conversation_id = self.scope['url_route']['kwargs']['conversation_id']
+        if self.user is None or not self.user.is_authenticated or not await self.is_participant():
+            await self.close(code=4403)
+            return
+        self.group = conversation_group(self.conversation_id)
+        self.user_group = user_group(self.user.pk)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.channel_layer.group_add(self.user_group, self.channel_name)
+        await self.accept()
+        await self.heartbeat()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group'):
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+            await self.channel_layer.group_discard(self.user_group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        event_type = content.get('type') if isinstance(content, dict) else None
+        if event_type == 'typing':
+            await sync_to_async(presence.set_typing)(self.user, self.conversation_id, bool(content.get('is_typing')))
+            await self.broadcast({'type': 'typing', 'user_id': self.user.pk, 'is_typing': bool(content.get('is_typing'))})
+        elif event_type == 'read':
+            read_at = await self.mark_read()
+            if read_at is not None:
+                await self.broadcast({'type': 'message.read', 'user_id': self.user.pk, 'read_at': read_at.isoformat()})
+        else:
+            await self.send_json({'type': 'error', 'error': 'Unsupported event type'})
+
+    async def broadcast(self, event):
+        await self.channel_layer.group_send(self.group, {'type': 'conversation.event', 'event': event})
+
+    async def conversation_event(self, message):
+        await self.send_json(message['event'])
+
+    @database_sync_to_async
+    def is_participant(self):
+        return Conversation.objects.filter(id=self.conversation_id, participants=self.user).exists()
+
+    @database_sync_to_async
+    def heartbeat(self):
+        # May flush the last-seen buffer to UserStatus
+        presence.heartbeat(self.user)
+
+    @database_sync_to_async
+    def mark_read(self):
+        return mark_conversation_read(self.conversation_id, self.user)
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from hiring.services.chunked_upload import expire_uploads
+
+class Command(BaseCommand):
+    help = 'Discard chunked uploads that were never attached within CHUNKED_UPLOAD_EXPIRY hours'
+    
+    def handle(self, *args, **options):
+        expired = expire_uploads()
+        self.stdout.write(self.style.SUCCESS(f'Discarded {expired} expired uploads'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from hiring.services.feature_store import rebuild_applicant_features
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed applicant feature table used for employment and education matching'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk insert')
+    
+    def handle(self, *args, **options):
+        count = rebuild_applicant_features(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt features for {count} applicants'))
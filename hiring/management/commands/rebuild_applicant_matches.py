@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from hiring.services.reverse_matching import rebuild_applicant_matches
+
+class Command(BaseCommand):
+    help = 'Recompute the stored business preference matches shown on applicant dashboards'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert')
+    
+    def handle(self, *args, **options):
+        count = rebuild_applicant_matches(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Stored {count} applicant preference matches'))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from hiring.services.post_tags import rebuild_tag_counts
+
+class Command(BaseCommand):
+    help = 'Recompute tag post counts and daily trending usage from the post-tag links'
+    
+    def handle(self, *args, **options):
+        tags = rebuild_tag_counts()
+        self.stdout.write(self.style.SUCCESS(f'Recounted {tags} tags'))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from hiring.services.unread_counters import rebuild_unread_counters
+
+class Command(BaseCommand):
+    help = 'Recompute per-user unread message counters from the messages read flags'
+    
+    def handle(self, *args, **options):
+        counters = rebuild_unread_counters()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {counters} unread counters'))
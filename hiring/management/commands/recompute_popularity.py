@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from hiring.services.popularity import recompute_popularity
+
+class Command(BaseCommand):
+    help = 'Re-apply time decay to the stored post popularity scores (run periodically, e.g. from cron)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk update')
+    
+    def handle(self, *args, **options):
+        count = recompute_popularity(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Recomputed popularity for {count} posts'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from hiring.services.engagement_counters import reconcile_counters
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized like, dislike and comment counts on posts and comments'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk update')
+    
+    def handle(self, *args, **options):
+        posts, comments = reconcile_counters(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Corrected {posts} posts and {comments} comments'))
@@ -9,7 +9,7 @@ from django.utils import timezone
 from django.core.files.storage import default_storage
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes, parser_classes
-from rest_framework.parsers import MultiPartParser
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework import status
 from django.http import JsonResponse
@@ -28,6 +28,15 @@ logger = logging.getLogger(__name__)
 
 from .models import *
 from .serializers import *
+from django.core.exceptions import ValidationError
+from .pagination import InvalidCursor, page_params
+from .services.inbox import inbox_online_user_ids, inbox_page, mark_conversation_read
+from .services import presence
+from .services.presence import online_user_ids
+from .services.message_history import history_page, messages_since
+from .services.realtime import publish_message, publish_read, publish_typing
+from .services.unread_counters import record_new_message, unread_total
+from .services.chunked_upload import UploadError, claim_upload, completed_upload, store_file
 # ==================== HELPER FUNCTIONS ====================
 
 # Conversation ViewSet
@@ -37,16 +46,32 @@ class ConversationViewSet(viewsets.ViewSet):
     
     def list(self, request):
         try:
-            # Simple query without any complex filters
-            conversations = Conversation.objects.filter(
-                participants=request.user
-            ).order_by('-updated_at')
+            try:
+                page_size, cursor, page, with_total = page_params(request.GET, default_page_size=50)
+            except ValueError:
+                return Response({
+                    'success': False,
+                    'error': 'Invalid page or page_size parameter'
+                }, status=status.HTTP_400_BAD_REQUEST)
             
-            serializer = ConversationSerializer(conversations, many=True, context={'request': request})
+            # Last message, unread count and other participant come from the page query
+            try:
+                result = inbox_page(request.user, page_size, cursor=cursor, page=page, with_total=with_total)
+            except InvalidCursor:
+                return Response({
+                    'success': False,
+                    'error': 'Invalid cursor parameter'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            serializer = ConversationSerializer(result.items, many=True, context={
+                'request': request,
+                'online_user_ids': inbox_online_user_ids(result.items),
+            })
             
             return Response({
                 'success': True,
-                'conversations': serializer.data
+                'conversations': serializer.data,
+                'pagination': result.pagination(total_key='total_conversations')
             })
             
         except Exception as e:
@@ -61,10 +86,8 @@ class ConversationViewSet(viewsets.ViewSet):
     def unread_count(self, request):
         """Get unread message count for current user"""
         try:
-            unread_count = Message.objects.filter(
-                conversation__participants=request.user,
-                is_read=False
-            ).exclude(sender=request.user).count()
+            # One indexed SUM over the user's maintained counters
+            unread_count = unread_total(request.user)
             
             return Response({
                 'success': True,
@@ -158,14 +181,10 @@ class MessageViewSet(viewsets.ViewSet):
             
             serializer = MessageSerializer(messages, many=True, context={'request': request})
             
-            # Mark messages as read
-            Message.objects.filter(
-                conversation=conversation,
-                is_read=False
-            ).exclude(sender=request.user).update(
-                is_read=True,
-                read_at=timezone.now()
-            )
+            # Mark messages as read and send a read receipt to the conversation
+            read_at = mark_conversation_read(conversation.id, request.user)
+            if read_at:
+                publish_read(conversation.id, request.user, read_at)
             
             conversation_data = ConversationSerializer(conversation, context={'request': request}).data
             
@@ -181,6 +200,71 @@ class MessageViewSet(viewsets.ViewSet):
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['get'])
+    def history(self, request, conversation_id=None):
+        """
+        Messages newest page first: ?cursor= pages back through older
+        messages, ?since=<message id> returns only newer ones, oldest first;
+        ?since= with the next_cursor of a since page continues the catch-up.
+        The conversation is included on the first page only.
+        """
+        conversation = Conversation.objects.filter(
+            id=conversation_id,
+            participants=request.user
+        ).first()
+        
+        if not conversation:
+            return Response({
+                'success': False,
+                'error': 'Conversation not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            page_size, cursor, _, _ = page_params(request.GET, default_page_size=30)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'Invalid page_size parameter'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        since = request.GET.get('since')
+        
+        try:
+            if since:
+                result = messages_since(conversation, since, page_size, cursor=cursor)
+            else:
+                result = history_page(conversation, page_size, cursor=cursor)
+        except (InvalidCursor, Message.DoesNotExist, ValidationError):
+            return Response({
+                'success': False,
+                'error': 'Invalid cursor or since parameter'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        senders = {
+            user_id for message in result.items
+            for user_id in (message.sender_id, message.original_sender_id,
+                            message.parent_message.sender_id if message.parent_message else None)
+            if user_id
+        }
+        context = {'request': request, 'online_user_ids': online_user_ids(senders)}
+        data = {
+            'success': True,
+            'messages': MessageSerializer(result.items, many=True, context=context).data,
+            'pagination': result.pagination(),
+        }
+        
+        # Older pages never contain unread messages worth acknowledging, and a
+        # truncated catch-up has not delivered the newest ones yet
+        first_page = not cursor and not since
+        caught_up = bool(since) and not result.has_more
+        if first_page or caught_up:
+            read_at = mark_conversation_read(conversation.id, request.user)
+            if read_at:
+                publish_read(conversation.id, request.user, read_at)
+        if first_page:
+            data['conversation'] = ConversationSerializer(conversation, context={'request': request}).data
+        
+        return Response(data)
+
     def create(self, request, conversation_id=None):
         try:
             conversation = Conversation.objects.filter(
@@ -205,6 +289,8 @@ class MessageViewSet(viewsets.ViewSet):
                 # Update conversation timestamp
                 conversation.save()
                 
+                record_new_message(message)
+                publish_message(message, request)
                 message_data = MessageSerializer(message, context={'request': request}).data
                 return Response({
                     'success': True,
@@ -236,15 +322,27 @@ class MessageViewSet(viewsets.ViewSet):
                     'error': 'Conversation not found'
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            serializer = FileUploadSerializer(data=request.data)
+            serializer = FileUploadSerializer(data=request.data, context={'request': request})
             if serializer.is_valid():
-                file = serializer.validated_data['file']
                 message_type = serializer.validated_data['message_type']
+                upload = serializer.validated_data.get('upload_id')
+                if upload:
+                    try:
+                        file = claim_upload(upload)
+                    except UploadError as e:
+                        return Response({
+                            'success': False,
+                            'error': str(e)
+                        }, status=e.status_code)
+                    file_name, file_size, file_mime_type = upload.file_name, upload.size, upload.content_type
+                else:
+                    file = serializer.validated_data['file']
+                    file_name, file_size, file_mime_type = file.name, file.size, file.content_type
                 
                 # Determine message type from file if not specified
                 if message_type == 'file':
                     import mimetypes
-                    mime_type, _ = mimetypes.guess_type(file.name)
+                    mime_type, _ = mimetypes.guess_type(file_name)
                     if mime_type:
                         if mime_type.startswith('image/'):
                             message_type = 'image'
@@ -258,14 +356,16 @@ class MessageViewSet(viewsets.ViewSet):
                     sender=request.user,
                     message_type=message_type,
                     file=file,
-                    file_name=file.name,
-                    file_size=file.size,
-                    file_mime_type=file.content_type
+                    file_name=file_name,
+                    file_size=file_size,
+                    file_mime_type=file_mime_type
                 )
                 
                 # Update conversation timestamp
                 conversation.save()
                 
+                record_new_message(message)
+                publish_message(message, request)
                 message_data = MessageSerializer(message, context={'request': request}).data
                 return Response({
                     'success': True,
@@ -304,6 +404,8 @@ class MessageViewSet(viewsets.ViewSet):
                 
                 conversation.save()
                 
+                record_new_message(message)
+                publish_message(message, request)
                 message_data = MessageSerializer(message, context={'request': request}).data
                 return Response({
                     'success': True,
@@ -364,6 +466,8 @@ class MessageViewSet(viewsets.ViewSet):
             
             target_conversation.save()
             
+            record_new_message(message)
+            publish_message(message, request)
             message_data = MessageSerializer(message, context={'request': request}).data
             return Response({
                 'success': True,
@@ -388,6 +492,7 @@ class UserViewSet(viewsets.ViewSet):
             users = CustomUser.objects.exclude(id=request.user.id)
             
             # Add basic user data to check if it's working
+            online = online_user_ids([user.id for user in users])
             user_data = []
             for user in users:
                 user_data.append({
@@ -396,7 +501,7 @@ class UserViewSet(viewsets.ViewSet):
                     'first_name': user.first_name or '',
                     'last_name': user.last_name or '',
                     'email': user.email,
-                    'is_online': getattr(user, 'is_online', False)  # Fallback if no status
+                    'is_online': user.id in online
                 })
             
             return Response({
@@ -430,6 +535,7 @@ class UserViewSet(viewsets.ViewSet):
                 Q(email__icontains=query)
             ).exclude(id=request.user.id)
             
+            online = online_user_ids([user.id for user in users])
             user_data = []
             for user in users:
                 user_data.append({
@@ -438,7 +544,7 @@ class UserViewSet(viewsets.ViewSet):
                     'first_name': user.first_name or '',
                     'last_name': user.last_name or '',
                     'email': user.email,
-                    'is_online': getattr(user, 'is_online', False)
+                    'is_online': user.id in online
                 })
             
             return Response({
@@ -459,6 +565,7 @@ class UserViewSet(viewsets.ViewSet):
         try:
             users = CustomUser.objects.exclude(id=request.user.id)
             
+            online = online_user_ids([user.id for user in users])
             user_data = []
             for user in users:
                 user_data.append({
@@ -467,7 +574,7 @@ class UserViewSet(viewsets.ViewSet):
                     'first_name': user.first_name or '',
                     'last_name': user.last_name or '',
                     'email': user.email,
-                    'is_online': getattr(user, 'is_online', False)
+                    'is_online': user.id in online
                 })
             
             return Response({
@@ -490,10 +597,8 @@ class UserStatusViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['post'])
     def set_online(self, request):
         try:
-            status_obj, created = UserStatus.objects.get_or_create(user=request.user)
-            status_obj.is_online = True
-            status_obj.last_seen = timezone.now()
-            status_obj.save()
+            # Heartbeat: cache only, last_seen reaches UserStatus in batched flushes
+            presence.heartbeat(request.user)
             
             return Response({
                 'success': True,
@@ -509,10 +614,7 @@ class UserStatusViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['post'])
     def set_offline(self, request):
         try:
-            status_obj, created = UserStatus.objects.get_or_create(user=request.user)
-            status_obj.is_online = False
-            status_obj.last_seen = timezone.now()
-            status_obj.save()
+            presence.go_offline(request.user)
             
             return Response({
                 'success': True,
@@ -531,18 +633,16 @@ class UserStatusViewSet(viewsets.ViewSet):
             conversation_id = request.data.get('conversation_id')
             is_typing = request.data.get('is_typing', False)
             
-            status_obj, created = UserStatus.objects.get_or_create(user=request.user)
+            previous_conversation_id = presence.typing_conversation(request.user.pk)
             
             if is_typing and conversation_id:
-                try:
-                    conversation = Conversation.objects.get(id=conversation_id, participants=request.user)
-                    status_obj.typing_to = conversation
-                except Conversation.DoesNotExist:
-                    pass
+                if Conversation.objects.filter(id=conversation_id, participants=request.user).exists():
+                    presence.set_typing(request.user, conversation_id, True)
+                    publish_typing(conversation_id, request.user, True)
             else:
-                status_obj.typing_to = None
-                
-            status_obj.save()
+                presence.set_typing(request.user, None, False)
+                if previous_conversation_id:
+                    publish_typing(previous_conversation_id, request.user, False)
             
             return Response({
                 'success': True,
@@ -559,9 +659,12 @@ class UserStatusViewSet(viewsets.ViewSet):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
-@parser_classes([MultiPartParser])
+@parser_classes([MultiPartParser, FormParser, JSONParser])
 def send_file_message(request, conversation_id):
-    """Enhanced file upload endpoint with better media handling"""
+    """
+    Enhanced file upload endpoint with better media handling. Takes either
+    a multipart file or the upload_id of a completed chunked upload.
+    """
     try:
         # Verify conversation access
         conversation = Conversation.objects.filter(
@@ -575,24 +678,34 @@ def send_file_message(request, conversation_id):
                 'error': 'Conversation not found'
             }, status=404)
         
-        # Get uploaded file
+        # Get uploaded file, either sent in chunks beforehand or in this request
+        upload_id = request.data.get('upload_id')
         uploaded_file = request.FILES.get('file')
-        if not uploaded_file:
+        if not upload_id and not uploaded_file:
             return Response({
                 'success': False,
                 'error': 'No file provided'
             }, status=400)
         
-        # Check file size (100MB limit)
-        if uploaded_file.size > 504857600:  # 100MB
+        # Size limit (100MB) and name checks live in services.chunked_upload
+        try:
+            if upload_id:
+                upload = completed_upload(request.user, upload_id, 'message_file')
+                file_path = claim_upload(upload)
+                file_name, file_size, mime_type = upload.file_name, upload.size, upload.content_type
+            else:
+                # Streamed to storage by the backend rather than read into memory
+                file_path = store_file(uploaded_file, 'message_file')
+                file_name, file_size, mime_type = uploaded_file.name, uploaded_file.size, uploaded_file.content_type
+        except UploadError as e:
             return Response({
                 'success': False,
-                'error': 'File size exceeds 100MB limit'
-            }, status=400)
+                'error': str(e)
+            }, status=e.status_code)
         
         # Determine message type based on file content
-        file_extension = os.path.splitext(uploaded_file.name)[1].lower()
-        mime_type = uploaded_file.content_type
+        file_extension = os.path.splitext(file_name)[1].lower()
+        mime_type = mime_type or ''
         
         # Map file types
         message_type = 'file'  # default
@@ -606,21 +719,15 @@ def send_file_message(request, conversation_id):
         elif file_extension in ['.pdf', '.doc', '.docx', '.txt', '.rtf']:
             message_type = 'document'
         
-        # Generate unique filename to avoid conflicts
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        
-        # Save file with unique name
-        file_path = default_storage.save(f'message_files/{unique_filename}', ContentFile(uploaded_file.read()))
-        
         # Create message
         message = Message.objects.create(
             conversation=conversation,
             sender=request.user,
             message_type=message_type,
             file=file_path,  # This should be the path to the file
-            file_name=uploaded_file.name,
-            file_size=uploaded_file.size,
-            file_mime_type=uploaded_file.content_type
+            file_name=file_name,
+            file_size=file_size,
+            file_mime_type=mime_type
         )
         
         # Update conversation timestamp
@@ -630,6 +737,8 @@ def send_file_message(request, conversation_id):
         # Get the full URL for the file
         file_url = request.build_absolute_uri(default_storage.url(file_path))
         
+        record_new_message(message)
+        publish_message(message, request)
         serializer = MessageSerializer(message, context={'request': request})
         return Response({
             'success': True,
@@ -648,9 +757,7 @@ def send_file_message(request, conversation_id):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def update_user_status(request):
-    status_obj, created = UserStatus.objects.get_or_create(user=request.user)
-    status_obj.last_seen = timezone.now()
-    status_obj.save()
+    presence.heartbeat(request.user)
     
     return JsonResponse({'success': True})
 
@@ -659,13 +766,17 @@ def update_user_status(request):
 def get_user_status(request, user_id):
     try:
         user = CustomUser.objects.get(id=user_id)
-        status_obj = UserStatus.objects.get(user=user)
-        serializer = UserStatusSerializer(status_obj, context={'request': request})
+        online = presence.is_online(user.id)
         return Response({
             'success': True,
-            'status': serializer.data
+            'status': {
+                'user': MessagingUserSerializer(user, context={'request': request, 'online_user_ids': {user.id} if online else set()}).data,
+                'is_online': online,
+                'last_seen': presence.last_seen(user.id),
+                'typing_to': presence.typing_conversation(user.id),
+            }
         })
-    except (CustomUser.DoesNotExist, UserStatus.DoesNotExist):
+    except (CustomUser.DoesNotExist, ValueError):
         return Response({
             'success': False,
             'error': 'User status not found'
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hiring', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicantFeatures',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employment_count', models.PositiveIntegerField(default=0)),
+                ('experience_months', models.PositiveIntegerField(default=0)),
+                ('open_positions', models.PositiveIntegerField(default=0)),
+                ('contract_types', models.PositiveIntegerField(default=0)),
+                ('job_titles', models.JSONField(blank=True, default=list)),
+                ('title_tokens', models.JSONField(blank=True, default=list)),
+                ('education_count', models.PositiveIntegerField(default=0)),
+                ('degree_levels', models.PositiveIntegerField(default=0)),
+                ('highest_degree_rank', models.PositiveSmallIntegerField(default=0)),
+                ('highest_degree_level', models.CharField(blank=True, max_length=20)),
+                ('max_gpa', models.FloatField(blank=True, null=True)),
+                ('fields_of_study', models.JSONField(blank=True, default=list)),
+                ('grades', models.JSONField(blank=True, default=list)),
+                ('refreshed_on', models.DateField(default=django.utils.timezone.localdate)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='features', to='hiring.applicantprofile')),
+            ],
+            options={
+                'verbose_name_plural': 'Applicant Features',
+                'indexes': [models.Index(fields=['employment_count'], name='hiring_appl_employm_04be6c_idx'), models.Index(fields=['education_count'], name='hiring_appl_educati_300651_idx'), models.Index(fields=['highest_degree_rank'], name='hiring_appl_highest_5bbdaa_idx'), models.Index(fields=['max_gpa'], name='hiring_appl_max_gpa_1d87a1_idx')],
+            },
+        ),
+    ]
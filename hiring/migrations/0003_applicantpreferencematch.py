@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hiring', '0002_applicantfeatures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicantPreferenceMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('match_score', models.PositiveSmallIntegerField()),
+                ('match_reasons', models.JSONField(blank=True, default=list)),
+                ('total_experience_years', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('education_preference', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='applicant_matches', to='hiring.businesspreference')),
+                ('employment_preference', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='applicant_matches', to='hiring.businessemploymentpreference')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='preference_matches', to='hiring.applicantprofile')),
+            ],
+            options={
+                'verbose_name_plural': 'Applicant Preference Matches',
+                'indexes': [models.Index(fields=['profile', '-match_score'], name='hiring_appl_profile_a09901_idx')],
+                'constraints': [models.UniqueConstraint(fields=('profile', 'employment_preference'), name='unique_employment_preference_match'), models.UniqueConstraint(fields=('profile', 'education_preference'), name='unique_education_preference_match')],
+            },
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:28
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+POSTGRESQL_FORWARD = [
+    """
+    CREATE OR REPLACE FUNCTION hiring_joblisting_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.skills_requirements, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.position_summary, '') || ' ' || coalesce(NEW.job_description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER hiring_joblisting_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, skills_requirements, position_summary, job_description
+    ON hiring_joblisting FOR EACH ROW EXECUTE FUNCTION hiring_joblisting_search_vector_update()
+    """,
+    "UPDATE hiring_joblisting SET title = title",
+    "CREATE INDEX hiring_joblisting_search_vector_gin ON hiring_joblisting USING gin (search_vector)",
+]
+
+POSTGRESQL_REVERSE = [
+    "DROP INDEX IF EXISTS hiring_joblisting_search_vector_gin",
+    "DROP TRIGGER IF EXISTS hiring_joblisting_search_vector_trigger ON hiring_joblisting",
+    "DROP FUNCTION IF EXISTS hiring_joblisting_search_vector_update()",
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE hiring_joblisting_fts USING fts5(title, skills, description, tokenize = 'porter unicode61')",
+    """
+    CREATE TRIGGER hiring_joblisting_fts_insert AFTER INSERT ON hiring_joblisting BEGIN
+        INSERT INTO hiring_joblisting_fts (rowid, title, skills, description)
+        VALUES (new.id, new.title, new.skills_requirements, new.position_summary || ' ' || new.job_description);
+    END
+    """,
+    """
+    CREATE TRIGGER hiring_joblisting_fts_update AFTER UPDATE OF title, skills_requirements, position_summary, job_description
+    ON hiring_joblisting BEGIN
+        DELETE FROM hiring_joblisting_fts WHERE rowid = old.id;
+        INSERT INTO hiring_joblisting_fts (rowid, title, skills, description)
+        VALUES (new.id, new.title, new.skills_requirements, new.position_summary || ' ' || new.job_description);
+    END
+    """,
+    """
+    CREATE TRIGGER hiring_joblisting_fts_delete AFTER DELETE ON hiring_joblisting BEGIN
+        DELETE FROM hiring_joblisting_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    INSERT INTO hiring_joblisting_fts (rowid, title, skills, description)
+    SELECT id, title, skills_requirements, position_summary || ' ' || job_description FROM hiring_joblisting
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS hiring_joblisting_fts_insert",
+    "DROP TRIGGER IF EXISTS hiring_joblisting_fts_update",
+    "DROP TRIGGER IF EXISTS hiring_joblisting_fts_delete",
+    "DROP TABLE IF EXISTS hiring_joblisting_fts",
+]
+
+
+def run_vendor_sql(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hiring', '0003_applicantpreferencematch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='joblisting',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            run_vendor_sql({'postgresql': POSTGRESQL_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            run_vendor_sql({'postgresql': POSTGRESQL_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:35
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, key):
+    counts = queryset.order_by().values(key).annotate(total=Count('*')).values('total')[:1]
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def backfill_counts(apps, schema_editor):
+    Post = apps.get_model('hiring', 'Post')
+    Comment = apps.get_model('hiring', 'Comment')
+    PostLike = Post._meta.get_field('likes').remote_field.through
+    PostDislike = Post._meta.get_field('dislikes').remote_field.through
+    CommentLike = Comment._meta.get_field('likes').remote_field.through
+
+    Post.objects.update(
+        likes_count=_count(PostLike.objects.filter(post_id=OuterRef('pk')), 'post_id'),
+        dislikes_count=_count(PostDislike.objects.filter(post_id=OuterRef('pk')), 'post_id'),
+        comment_count=_count(Comment.objects.filter(post_id=OuterRef('pk')), 'post_id'),
+    )
+    Comment.objects.update(likes_count=_count(CommentLike.objects.filter(comment_id=OuterRef('pk')), 'comment_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hiring', '0004_joblisting_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='dislikes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
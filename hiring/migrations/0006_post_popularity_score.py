@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:37
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_popularity(apps, schema_editor):
+    # Same formula as services.popularity.popularity_score at the time of writing
+    Post = apps.get_model('hiring', 'Post')
+    gravity = getattr(settings, 'POST_POPULARITY_GRAVITY', 1.8)
+    now = timezone.now()
+    batch = []
+    for post in Post.objects.only('pk', 'likes_count', 'comment_count', 'views', 'shares', 'created_at').iterator():
+        engagement = post.likes_count + post.comment_count * 2 + post.views * 0.1 + post.shares * 3
+        age_hours = max((now - post.created_at).total_seconds() / 3600, 0)
+        post.popularity_score = engagement / (age_hours + 2) ** gravity
+        batch.append(post)
+        if len(batch) >= 1000:
+            Post.objects.bulk_update(batch, ['popularity_score'])
+            batch = []
+    Post.objects.bulk_update(batch, ['popularity_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hiring', '0005_engagement_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='popularity_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-popularity_score', '-created_at'], name='hiring_post_popular_idx'),
+        ),
+        migrations.RunPython(backfill_popularity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:41
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_totals(apps, schema_editor):
+    Post = apps.get_model('hiring', 'Post')
+    Rating = apps.get_model('hiring', 'Rating')
+    ratings = Rating.objects.filter(post_id=OuterRef('pk')).order_by().values('post_id')
+    Post.objects.update(
+        rating_sum=Coalesce(Subquery(ratings.annotate(total=Sum('rating')).values('total')[:1], output_field=IntegerField()), 0),
+        rating_count=Coalesce(Subquery(ratings.annotate(total=Count('*')).values('total')[:1], output_field=IntegerField()), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hiring', '0006_post_popularity_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_totals, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='post',
+            name='average_rating',
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(models.OrderBy(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('rating_sum', models.FloatField()), '/', django.db.models.functions.comparison.NullIf('rating_count', 0)), descending=True), models.OrderBy(models.F('created_at'), descending=True), name='hiring_post_top_idx'),
+        ),
+    ]
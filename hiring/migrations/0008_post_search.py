@@ -0,0 +1,100 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:46
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+POSTGRESQL_FORWARD = [
+    """
+    CREATE OR REPLACE FUNCTION hiring_post_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.tags, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.content, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER hiring_post_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, tags, content
+    ON hiring_post FOR EACH ROW EXECUTE FUNCTION hiring_post_search_vector_update()
+    """,
+    "UPDATE hiring_post SET title = title",
+    "CREATE INDEX hiring_post_search_vector_gin ON hiring_post USING gin (search_vector)",
+    # Author names are matched with icontains, which compiles to UPPER(col::text) LIKE UPPER(...)
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX hiring_customuser_username_trgm ON hiring_customuser USING gin (UPPER(username::text) gin_trgm_ops)",
+    "CREATE INDEX hiring_customuser_first_name_trgm ON hiring_customuser USING gin (UPPER(first_name::text) gin_trgm_ops)",
+    "CREATE INDEX hiring_customuser_last_name_trgm ON hiring_customuser USING gin (UPPER(last_name::text) gin_trgm_ops)",
+]
+
+POSTGRESQL_REVERSE = [
+    "DROP INDEX IF EXISTS hiring_customuser_last_name_trgm",
+    "DROP INDEX IF EXISTS hiring_customuser_first_name_trgm",
+    "DROP INDEX IF EXISTS hiring_customuser_username_trgm",
+    "DROP INDEX IF EXISTS hiring_post_search_vector_gin",
+    "DROP TRIGGER IF EXISTS hiring_post_search_vector_trigger ON hiring_post",
+    "DROP FUNCTION IF EXISTS hiring_post_search_vector_update()",
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE hiring_post_fts USING fts5(title, tags, content, tokenize = 'porter unicode61')",
+    """
+    CREATE TRIGGER hiring_post_fts_insert AFTER INSERT ON hiring_post BEGIN
+        INSERT INTO hiring_post_fts (rowid, title, tags, content)
+        VALUES (new.id, new.title, new.tags, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER hiring_post_fts_update AFTER UPDATE OF title, tags, content
+    ON hiring_post BEGIN
+        DELETE FROM hiring_post_fts WHERE rowid = old.id;
+        INSERT INTO hiring_post_fts (rowid, title, tags, content)
+        VALUES (new.id, new.title, new.tags, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER hiring_post_fts_delete AFTER DELETE ON hiring_post BEGIN
+        DELETE FROM hiring_post_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    INSERT INTO hiring_post_fts (rowid, title, tags, content)
+    SELECT id, title, tags, content FROM hiring_post
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS hiring_post_fts_insert",
+    "DROP TRIGGER IF EXISTS hiring_post_fts_update",
+    "DROP TRIGGER IF EXISTS hiring_post_fts_delete",
+    "DROP TABLE IF EXISTS hiring_post_fts",
+]
+
+
+def run_vendor_sql(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hiring', '0007_post_rating_sum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            run_vendor_sql({'postgresql': POSTGRESQL_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            run_vendor_sql({'postgresql': POSTGRESQL_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+    ]
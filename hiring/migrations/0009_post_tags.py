@@ -0,0 +1,103 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def parse_tags(tags):
+    parsed = {}
+    for raw in (tags or '').split(','):
+        name = ' '.join(raw.strip().lstrip('#').split())[:100]
+        slug = name.casefold()[:100]
+        if slug and slug not in parsed:
+            parsed[slug] = name
+    return parsed
+
+
+def backfill_post_tags(apps, schema_editor):
+    Post = apps.get_model('hiring', 'Post')
+    Tag = apps.get_model('hiring', 'Tag')
+    PostTag = apps.get_model('hiring', 'PostTag')
+    TagUsage = apps.get_model('hiring', 'TagUsage')
+
+    posts = Post.objects.exclude(tags='').order_by('id').values_list('id', 'tags', 'is_published', 'visibility', 'created_at')
+    tag_ids = {}
+    batch = []
+
+    def flush():
+        names = {slug: name for *_, parsed in batch for slug, name in parsed.items() if slug not in tag_ids}
+        Tag.objects.bulk_create([Tag(name=name, slug=slug) for slug, name in names.items()], ignore_conflicts=True)
+        tag_ids.update(Tag.objects.filter(slug__in=list(names)).values_list('slug', 'id'))
+        PostTag.objects.bulk_create([
+            PostTag(post_id=post_id, tag_id=tag_ids[slug], position=position, counted_on=counted_on)
+            for post_id, counted_on, parsed in batch
+            for position, slug in enumerate(parsed)
+        ])
+        batch.clear()
+
+    for post_id, tags, is_published, visibility, created_at in posts.iterator(chunk_size=1000):
+        counted_on = created_at.date() if is_published and visibility == 'public' else None
+        batch.append((post_id, counted_on, parse_tags(tags)))
+        if len(batch) >= 1000:
+            flush()
+    flush()
+
+    TagUsage.objects.bulk_create([
+        TagUsage(tag_id=row['tag_id'], day=row['counted_on'], post_count=row['total'])
+        for row in PostTag.objects.filter(counted_on__isnull=False).order_by()
+        .values('tag_id', 'counted_on').annotate(total=Count('*'))
+    ])
+    counts = PostTag.objects.filter(tag_id=OuterRef('pk'), counted_on__isnull=False).order_by().values('tag_id')
+    Tag.objects.update(post_count=Coalesce(
+        Subquery(counts.annotate(total=Count('*')).values('total')[:1], output_field=models.IntegerField()), 0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hiring', '0008_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.CharField(max_length=100, unique=True)),
+                ('post_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('counted_on', models.DateField(blank=True, null=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_tags', to='hiring.post')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_tags', to='hiring.tag')),
+            ],
+            options={
+                'ordering': ['position'],
+                'unique_together': {('tag', 'post')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TagUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('post_count', models.PositiveIntegerField(default=0)),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='hiring.tag')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='hiring_tagu_day_c16322_idx')],
+                'unique_together': {('tag', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_post_tags, migrations.RunPython.noop),
+    ]
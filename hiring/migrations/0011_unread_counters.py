@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_counters(apps, schema_editor):
+    Conversation = apps.get_model('hiring', 'Conversation')
+    Message = apps.get_model('hiring', 'Message')
+    UnreadCounter = apps.get_model('hiring', 'UnreadCounter')
+    unread = Message.objects.filter(
+        conversation_id=OuterRef('conversation_id'), is_read=False
+    ).exclude(sender_id=OuterRef('customuser_id')).order_by().values('conversation_id').annotate(total=Count('*')).values('total')[:1]
+    memberships = Conversation.participants.through.objects.annotate(
+        unread=Coalesce(Subquery(unread, output_field=models.IntegerField()), 0)
+    ).values_list('customuser_id', 'conversation_id', 'unread')
+    batch = []
+    for user_id, conversation_id, count in memberships.iterator(chunk_size=2000):
+        batch.append(UnreadCounter(user_id=user_id, conversation_id=conversation_id, count=count))
+        if len(batch) >= 2000:
+            UnreadCounter.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    UnreadCounter.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hiring', '0010_message_inbox_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to='hiring.conversation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'conversation')},
+            },
+        ),
+        migrations.RunPython(backfill_unread_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+MAX_GPA = 5.0
+
+
+def drop_non_gpa_grades(apps, schema_editor):
+    """Stored grades were parsed before percentages stopped counting as GPAs"""
+    ApplicantFeatures = apps.get_model('hiring', 'ApplicantFeatures')
+    changed = []
+    for features in ApplicantFeatures.objects.exclude(grades=[]).iterator(chunk_size=2000):
+        grades = [grade if grade is not None and grade <= MAX_GPA else None for grade in features.grades]
+        if grades != features.grades:
+            valid = [grade for grade in grades if grade]
+            features.grades = grades
+            features.max_gpa = max(valid) if valid else None
+            changed.append(features)
+    ApplicantFeatures.objects.bulk_update(changed, ['grades', 'max_gpa'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hiring', '0013_chunked_upload_lease'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_non_gpa_grades, migrations.RunPython.noop),
+    ]
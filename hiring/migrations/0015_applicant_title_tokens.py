@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:24
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+TITLE_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def index_title_tokens(apps, schema_editor):
+    """Postings for the job titles already stored on ApplicantFeatures"""
+    ApplicantFeatures = apps.get_model('hiring', 'ApplicantFeatures')
+    ApplicantTitleToken = apps.get_model('hiring', 'ApplicantTitleToken')
+    postings = [
+        ApplicantTitleToken(token=token, profile_id=profile_id, record=record)
+        for profile_id, job_titles in ApplicantFeatures.objects.exclude(job_titles=[]).values_list(
+            'profile_id', 'job_titles'
+        ).iterator(chunk_size=2000)
+        for record, job_title in enumerate(job_titles)
+        for token in sorted(set(TITLE_TOKEN_RE.findall((job_title or '').lower())))
+    ]
+    ApplicantTitleToken.objects.bulk_create(postings, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hiring', '0014_drop_non_gpa_grades'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='applicantfeatures',
+            name='title_tokens',
+        ),
+        migrations.CreateModel(
+            name='ApplicantTitleToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(db_index=True, max_length=200)),
+                ('record', models.PositiveSmallIntegerField()),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='title_tokens', to='hiring.applicantprofile')),
+            ],
+            options={
+                'unique_together': {('profile', 'record', 'token')},
+            },
+        ),
+        migrations.RunPython(index_title_tokens, migrations.RunPython.noop),
+    ]
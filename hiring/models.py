@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import FileExtensionValidator
 from django.utils import timezone
 import uuid
@@ -10,6 +11,7 @@ from django.db import models
 from django.core.validators import FileExtensionValidator
 from django.utils import timezone
 from django.db.models import Avg, Count
+from django.db.models.functions import Cast, NullIf
 import json
 from datetime import timedelta
 import re
@@ -150,6 +152,38 @@ class Skill(models.Model):
 
 
 class Education(models.Model):
+    DEGREE_LEVEL_CHOICES = (
+        ('high_school', 'High School'),
+        ('certificate', 'Certificate'),
+        ('diploma', 'Diploma'),
+        ('associate', 'Associate'),
+        ('bachelor', "Bachelor's"),
+        ('master', "Master's"),
+        ('phd', 'PhD'),
+        ('other', 'Other'),
+    )
+    MAX_GPA = 5.0  # highest value parse_grade() accepts as a GPA
+    DEGREE_LEVEL_RANKS = {
+        'high_school': 1,
+        'associate': 2,
+        'bachelor': 3,
+        'master': 4,
+        'phd': 5,
+        'certificate': 1,
+        'diploma': 2,
+        'other': 1
+    }
+    # Qualification keywords per degree level, most senior level first
+    DEGREE_LEVEL_KEYWORDS = (
+        ('phd', ('phd', 'doctorate', 'doctoral', 'doctor', 'dphil')),
+        ('master', ('master', 'masters', 'msc', 'mba', 'mcom', 'meng', 'mphil', 'ma')),
+        ('bachelor', ('bachelor', 'bachelors', 'degree', 'honours', 'hons', 'bsc', 'bcom', 'ba', 'beng', 'btech', 'llb')),
+        ('associate', ('associate',)),
+        ('diploma', ('diploma',)),
+        ('certificate', ('certificate', 'cert', 'certification')),
+        ('high_school', ('matric', 'nsc', 'high', 'grade')),
+    )
+
     profile = models.ForeignKey('ApplicantProfile', on_delete=models.CASCADE, related_name='education')
     qualification = models.CharField(max_length=200)
     institution = models.CharField(max_length=200)
@@ -164,6 +198,45 @@ class Education(models.Model):
     def __str__(self):
         return f"{self.qualification} - {self.institution}"
 
+    @classmethod
+    def classify_qualification(cls, qualification):
+        """Map a free-text qualification to one of DEGREE_LEVEL_CHOICES"""
+        tokens = set(re.findall(r'[a-z]+', (qualification or '').lower()))
+        for level, keywords in cls.DEGREE_LEVEL_KEYWORDS:
+            if tokens.intersection(keywords):
+                return level
+        return 'other'
+
+    @staticmethod
+    def parse_grade(grade):
+        """
+        The GPA in a grade ("3.5", "GPA 3.2/4") or None. Percentages ("75%")
+        and numbers above MAX_GPA are not GPAs and give None, so they never
+        meet a minimum_gpa requirement.
+        """
+        if not grade or '%' in grade:
+            return None
+        found = re.search(r'\d+(?:\.\d+)?', grade)
+        if not found:
+            return None
+        value = float(found.group())
+        return value if value <= Education.MAX_GPA else None
+
+    @property
+    def degree_level(self):
+        return self.classify_qualification(self.qualification)
+
+    def get_degree_level_display(self):
+        return dict(self.DEGREE_LEVEL_CHOICES).get(self.degree_level, self.degree_level)
+
+    @property
+    def field_of_study(self):
+        return self.major_subject
+
+    @property
+    def gpa(self):
+        return self.parse_grade(self.grade)
+
 
 class Document(models.Model):
     DOCUMENT_TYPES = (
@@ -411,6 +484,106 @@ class EmploymentHistory(models.Model):
         return 0
 
 
+class ApplicantFeatures(models.Model):
+    """
+    Denormalized matching features per applicant, derived from EmploymentHistory
+    and Education rows. Kept in sync by hiring.services.feature_store and rebuilt
+    in bulk with the rebuild_applicant_features management command.
+    """
+    profile = models.OneToOneField(ApplicantProfile, on_delete=models.CASCADE, related_name='features')
+
+    # Employment
+    employment_count = models.PositiveIntegerField(default=0)
+    experience_months = models.PositiveIntegerField(default=0)  # As of refreshed_on
+    open_positions = models.PositiveIntegerField(default=0)  # Currently-working jobs still accruing months
+    contract_types = models.PositiveIntegerField(default=0)  # Bitmask over EmploymentHistory.CONTRACT_TYPE_CHOICES
+    job_titles = models.JSONField(default=list, blank=True)  # In record order
+
+    # Education
+    education_count = models.PositiveIntegerField(default=0)
+    degree_levels = models.PositiveIntegerField(default=0)  # Bitmask over Education.DEGREE_LEVEL_CHOICES
+    highest_degree_rank = models.PositiveSmallIntegerField(default=0)
+    highest_degree_level = models.CharField(max_length=20, blank=True)
+    max_gpa = models.FloatField(null=True, blank=True)
+    fields_of_study = models.JSONField(default=list, blank=True)  # In record order
+    grades = models.JSONField(default=list, blank=True)  # Parsed numeric grades, in record order
+
+    refreshed_on = models.DateField(default=timezone.localdate)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'hiring'
+        verbose_name_plural = 'Applicant Features'
+        indexes = [
+            models.Index(fields=['employment_count']),
+            models.Index(fields=['education_count']),
+            models.Index(fields=['highest_degree_rank']),
+            models.Index(fields=['max_gpa']),
+        ]
+
+    def __str__(self):
+        return f"Features for {self.profile}"
+
+    def current_experience_months(self, today=None):
+        """Experience months including time accrued in open positions since refreshed_on"""
+        today = today or timezone.now().date()
+        elapsed = (today.year - self.refreshed_on.year) * 12 + (today.month - self.refreshed_on.month)
+        return self.experience_months + self.open_positions * max(0, elapsed)
+
+
+class ApplicantTitleToken(models.Model):
+    """
+    Inverted job title index: one posting per normalized token of each of an
+    applicant's job titles, so title keywords resolve to applicants through
+    an indexed token lookup. record is the title's position in
+    ApplicantFeatures.job_titles. Kept in sync with ApplicantFeatures by
+    hiring.services.feature_store.
+    """
+    token = models.CharField(max_length=200, db_index=True)
+    profile = models.ForeignKey(ApplicantProfile, on_delete=models.CASCADE, related_name='title_tokens')
+    record = models.PositiveSmallIntegerField()
+
+    class Meta:
+        app_label = 'hiring'
+        unique_together = ['profile', 'record', 'token']
+
+    def __str__(self):
+        return f"{self.token} ({self.profile_id}:{self.record})"
+
+
+class ApplicantPreferenceMatch(models.Model):
+    """
+    Precomputed match between an applicant and an active business preference,
+    so applicants can list the preferences that match them without scoring
+    every preference on each request. Exactly one preference FK is set.
+    """
+    profile = models.ForeignKey(ApplicantProfile, on_delete=models.CASCADE, related_name='preference_matches')
+    employment_preference = models.ForeignKey(
+        BusinessEmploymentPreference, on_delete=models.CASCADE, null=True, blank=True, related_name='applicant_matches'
+    )
+    education_preference = models.ForeignKey(
+        BusinessPreference, on_delete=models.CASCADE, null=True, blank=True, related_name='applicant_matches'
+    )
+    match_score = models.PositiveSmallIntegerField()
+    match_reasons = models.JSONField(default=list, blank=True)
+    total_experience_years = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'hiring'
+        verbose_name_plural = 'Applicant Preference Matches'
+        indexes = [
+            models.Index(fields=['profile', '-match_score']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'employment_preference'], name='unique_employment_preference_match'),
+            models.UniqueConstraint(fields=['profile', 'education_preference'], name='unique_education_preference_match'),
+        ]
+
+    def __str__(self):
+        return f"{self.profile} - {self.employment_preference or self.education_preference} ({self.match_score}%)"
+
+
 # ===== JOB LISTING MODELS =====
 
 class JobListing(models.Model):
@@ -445,6 +618,9 @@ class JobListing(models.Model):
     competencies_requirements = models.TextField()
     experience_requirements = models.TextField()
     education_requirements = models.TextField()
+    # Weighted full-text vector, maintained by a database trigger on PostgreSQL
+    # (see hiring.services.job_search); unused on SQLite, which uses FTS5
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -731,6 +907,10 @@ class Message(models.Model):
     class Meta:
         app_label = 'hiring'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['conversation', '-created_at'], name='hiring_message_latest_idx'),
+            models.Index(fields=['conversation'], condition=models.Q(is_read=False), name='hiring_message_unread_idx'),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender.username} in {self.conversation.id}"
@@ -747,6 +927,58 @@ class MessageRecipient(models.Model):
         unique_together = ['message', 'recipient']
 
 
+class UnreadCounter(models.Model):
+    """Messages in a conversation the user has not read, maintained by services.unread_counters"""
+    user = models.ForeignKey('CustomUser', on_delete=models.CASCADE, related_name='unread_counters')
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='unread_counters')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        app_label = 'hiring'
+        unique_together = ['user', 'conversation']
+
+    def __str__(self):
+        return f"{self.user_id} has {self.count} unread in {self.conversation_id}"
+
+
+class ChunkedUpload(models.Model):
+    """A file sent in sequential chunks straight to storage, see services.chunked_upload"""
+    PURPOSES = (
+        ('message_file', 'Message file'),
+        ('document', 'Document'),
+        ('post_video', 'Post video'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('complete', 'Complete'),
+        ('attached', 'Attached'),
+        ('aborted', 'Aborted'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey('CustomUser', on_delete=models.CASCADE, related_name='chunked_uploads')
+    purpose = models.CharField(max_length=20, choices=PURPOSES)
+    file_name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.BigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    received = models.BigIntegerField(default=0)
+    storage_name = models.CharField(max_length=255)
+    multipart_id = models.CharField(max_length=255, blank=True)  # S3 multipart UploadId
+    parts = models.JSONField(default=list, blank=True)  # S3 [{'PartNumber', 'ETag'}]
+    writing_until = models.DateTimeField(null=True, blank=True)  # lease on the chunk being written
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'hiring'
+        indexes = [models.Index(fields=['status', 'updated_at'], name='hiring_upload_status_idx')]
+
+    def __str__(self):
+        return f"{self.file_name} ({self.received}/{self.size} bytes, {self.status})"
+
+
 class UserStatus(models.Model):
     user = models.OneToOneField('CustomUser', on_delete=models.CASCADE, related_name='chat_status')
     is_online = models.BooleanField(default=False)
@@ -771,6 +1003,11 @@ class BusinessProfileView(models.Model):
 
 # models.py - Django models
 
+def post_average_rating():
+    """Post.rating_sum / rating_count as a float (NULL when unrated); the expression the top feed sorts and indexes on"""
+    return Cast('rating_sum', models.FloatField()) / NullIf('rating_count', 0)
+
+
 class Post(models.Model):
     POST_TYPES = [
         ('job', 'Job Post'),
@@ -808,6 +1045,8 @@ class Post(models.Model):
     )
     video_url = models.URLField(blank=True)  # For YouTube/Vimeo links
     tags = models.CharField(max_length=500, blank=True, help_text="Comma-separated tags")
+    # Weighted title/tags/content tsvector, kept current by a trigger (migration 0008)
+    search_vector = SearchVectorField(null=True, editable=False)
     
     # Engagement metrics
     views = models.PositiveIntegerField(default=0)
@@ -815,9 +1054,14 @@ class Post(models.Model):
     dislikes = models.ManyToManyField(CustomUser, related_name='post_dislikes', blank=True)
     shares = models.PositiveIntegerField(default=0)
     comment_count = models.PositiveIntegerField(default=0)  # Comment count field
-    
-    # Ratings
-    average_rating = models.FloatField(default=0)
+    # Denormalized reaction counts, maintained by services.engagement_counters
+    likes_count = models.PositiveIntegerField(default=0)
+    dislikes_count = models.PositiveIntegerField(default=0)
+    # Time-decayed hot score for the popular feed, maintained by services.popularity
+    popularity_score = models.FloatField(default=0)
+    
+    # Ratings, maintained by services.engagement_counters; the average is derived on read
+    rating_sum = models.PositiveIntegerField(default=0)
     rating_count = models.PositiveIntegerField(default=0)
     
     # Post visibility
@@ -839,14 +1083,20 @@ class Post(models.Model):
             models.Index(fields=['post_type']),
             models.Index(fields=['author']),
             models.Index(fields=['is_published']),
+            models.Index(fields=['-popularity_score', '-created_at'], name='hiring_post_popular_idx'),
+            models.Index(post_average_rating().desc(), models.F('created_at').desc(), name='hiring_post_top_idx'),
         ]
     
     def __str__(self):
         return f"{self.title} by {self.author.username}"
     
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else 0
+
     def total_engagement(self):
         """Calculate total engagement score"""
-        return self.likes.count() + self.comment_count + self.shares
+        return self.likes_count + self.comment_count + self.shares
     
     def update_comment_count(self):
         """Update comment count from related comments"""
@@ -857,7 +1107,9 @@ class Post(models.Model):
         return count
 
     def get_tags_list(self):
-        """Convert comma-separated tags string to list"""
+        """Tag names in order, from prefetched post_tags when available"""
+        if 'post_tags' in getattr(self, '_prefetched_objects_cache', {}):
+            return [link.tag.name for link in self.post_tags.all()]
         if not self.tags:
             return []
         # Split by comma and clean up whitespace
@@ -872,16 +1124,46 @@ class Post(models.Model):
         else:
             self.tags = ''
 
-    def get_tags_list(self, obj):
-        # Safe version that handles missing method
-        try:
-            return obj.get_tags_list()
-        except AttributeError:
-            # Fallback if method doesn't exist
-            if obj.tags:
-                return [tag.strip() for tag in obj.tags.split(',') if tag.strip()]
-            return []
-        
+
+class Tag(models.Model):
+    """A normalized post tag; slug is the case-folded name used for lookups"""
+    name = models.CharField(max_length=100)
+    slug = models.CharField(max_length=100, unique=True)
+    # Public, published posts carrying the tag, maintained by services.post_tags
+    post_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class PostTag(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='post_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='post_tags')
+    position = models.PositiveSmallIntegerField(default=0)
+    # Day the link started counting towards the tag's totals; null while the post is not public
+    counted_on = models.DateField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['position']
+        unique_together = ['tag', 'post']
+
+    def __str__(self):
+        return f"{self.tag.name} on post {self.post_id}"
+
+
+class TagUsage(models.Model):
+    """Daily count of public posts tagged with a tag, for trending tags"""
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='usage')
+    day = models.DateField()
+    post_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['tag', 'day']
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+
 
 class Comment(models.Model):
     # Foreign keys to content types
@@ -895,6 +1177,7 @@ class Comment(models.Model):
     
     # Engagement
     likes = models.ManyToManyField(CustomUser, related_name='comment_likes', blank=True)
+    likes_count = models.PositiveIntegerField(default=0)  # Maintained by services.engagement_counters
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
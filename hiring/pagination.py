@@ -0,0 +1,162 @@
+"""
+Keyset (cursor) pagination shared by the list endpoints.
+
+Pages are read with WHERE (key) < (last key seen) ORDER BY key LIMIT n
+instead of OFFSET, so every page costs the same however deep the client
+scrolls, and no COUNT runs unless a total is requested. The ordering must
+end in a unique column (normally id) and its columns must be non-null.
+
+Cursors are opaque base64 tokens carrying the ordering and the key values
+of the last row served. A cursor is only valid for the ordering it was
+issued for.
+
+Clients that still send ?page= without a cursor get the old numbered-page
+behaviour (OFFSET plus an exact count). Those responses also carry a
+next_cursor, so clients can switch over gradually.
+"""
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, 'hex'):  # UUID
+        return str(value)
+    raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+
+def encode_cursor(ordering, values):
+    payload = json.dumps({'o': list(ordering), 'v': list(values)}, default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, ordering):
+    """Key values stored in cursor. Raises InvalidCursor if malformed or issued for another ordering."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        values = payload['v']
+    except (TypeError, KeyError, UnicodeError, ValueError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+    if payload.get('o') != list(ordering) or len(values) != len(ordering):
+        raise InvalidCursor('Cursor does not match the requested ordering')
+    return values
+
+
+def _field_name(order_field):
+    return order_field.lstrip('-')
+
+
+def keyset_filter(ordering, values):
+    """Q selecting the rows that sort strictly after `values` under `ordering`"""
+    condition = Q()
+    for position, order_field in enumerate(ordering):
+        lookup = 'lt' if order_field.startswith('-') else 'gt'
+        clause = Q(**{f'{_field_name(order_field)}__{lookup}': values[position]})
+        for previous_field, previous_value in zip(ordering[:position], values):
+            clause &= Q(**{_field_name(previous_field): previous_value})
+        condition |= clause
+    return condition
+
+
+def _key_values(item, ordering):
+    if isinstance(item, dict):
+        return [item[_field_name(order_field)] for order_field in ordering]
+    return [getattr(item, _field_name(order_field)) for order_field in ordering]
+
+
+def estimate_count(queryset):
+    """
+    Row count for a queryset: the planner's estimate on PostgreSQL (no scan),
+    an exact COUNT elsewhere. Returns (count, is_estimate).
+    """
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows']), True
+    return queryset.count(), False
+
+
+class CursorPage:
+    """One page of results plus the cursor for the next one"""
+
+    def __init__(self, items, page_size, next_cursor, total=None, total_is_estimate=False, page=None):
+        self.items = items
+        self.page_size = page_size
+        self.next_cursor = next_cursor
+        self.total = total
+        self.total_is_estimate = total_is_estimate
+        self.page = page
+
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+    def pagination(self, total_key='total_items'):
+        data = {
+            'page_size': self.page_size,
+            'next_cursor': self.next_cursor,
+            'has_more': self.has_more,
+        }
+        if self.page is not None:
+            data['current_page'] = self.page
+        if self.total is not None:
+            data[total_key] = self.total
+            data['total_pages'] = (self.total + self.page_size - 1) // self.page_size
+            data['total_is_estimate'] = self.total_is_estimate
+        return data
+
+
+def paginate(queryset, ordering, page_size, cursor=None, page=None, with_total=False):
+    """
+    Page through queryset ordered by `ordering` (e.g. ('-created_at', '-id')).
+    With a cursor (or no page), returns the page_size rows after it; with only
+    a page number, falls back to OFFSET pagination with an exact total.
+    Raises InvalidCursor for a bad cursor.
+    """
+    ordering = tuple(ordering)
+    queryset = queryset.order_by(*ordering)
+
+    if cursor is None and page is not None:
+        start = (page - 1) * page_size
+        rows = list(queryset[start:start + page_size + 1])
+        total, total_is_estimate = queryset.count(), False
+    else:
+        page = None
+        after = queryset.filter(keyset_filter(ordering, decode_cursor(cursor, ordering))) if cursor else queryset
+        rows = list(after[:page_size + 1])
+        total, total_is_estimate = estimate_count(queryset) if with_total else (None, False)
+
+    items = rows[:page_size]
+    next_cursor = encode_cursor(ordering, _key_values(items[-1], ordering)) if len(rows) > page_size else None
+    return CursorPage(items, page_size, next_cursor, total, total_is_estimate, page)
+
+
+def page_params(params, default_page_size=10, max_page_size=100):
+    """
+    (page_size, cursor, page, with_total) from request query/body params.
+    page is None unless the client asked for a numbered page.
+    Raises ValueError for non-numeric values.
+    """
+    page_size = min(max_page_size, max(1, int(params.get('page_size', default_page_size))))
+    cursor = params.get('cursor') or None
+    page = params.get('page')
+    page = max(1, int(page)) if page not in (None, '') else None
+    with_total = str(params.get('include_total', '')).lower() in ('1', 'true', 'yes')
+    return page_size, cursor, page, with_total
@@ -1,6 +1,9 @@
 # serializers.py
 from rest_framework import serializers
 from .models import *
+from .services.engagement_counters import rate_post
+from .services import presence
+from .services.chunked_upload import UploadError, claim_upload, completed_upload
 import os
 
 # Define the choices that are missing
@@ -12,6 +15,35 @@ SKILL_PROFICIENCY_LEVELS = [
 ]
 
 
+class ChunkedUploadField(serializers.UUIDField):
+    """Id of one of the requesting user's completed chunked uploads for purpose; validates to the ChunkedUpload"""
+
+    def __init__(self, purpose, **kwargs):
+        self.purpose = purpose
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        upload_id = super().to_internal_value(data)
+        try:
+            return completed_upload(self.context['request'].user, upload_id, self.purpose)
+        except UploadError as e:
+            raise serializers.ValidationError(str(e))
+
+
+def claim_upload_file(upload):
+    """Storage name of a validated ChunkedUploadField upload, now attached"""
+    try:
+        return claim_upload(upload)
+    except UploadError as e:
+        raise serializers.ValidationError({'upload_id': str(e)})
+
+
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChunkedUpload
+        fields = ['id', 'purpose', 'file_name', 'content_type', 'size', 'chunk_size', 'received', 'status', 'created_at']
+
+
 def has_business_access(user):
     """
     Check if user has business access.
@@ -374,9 +406,26 @@ class DocumentSerializer(serializers.ModelSerializer):
         read_only_fields = ('profile', 'file_name', 'uploaded_at')
 
 class DocumentCreateSerializer(serializers.ModelSerializer):
+    upload_id = ChunkedUploadField('document', required=False, write_only=True)
+
     class Meta:
         model = Document
-        fields = ['document_type', 'file']
+        fields = ['document_type', 'file', 'upload_id']
+        extra_kwargs = {'file': {'required': False}}
+    
+    def validate(self, data):
+        if not data.get('file') and not data.get('upload_id'):
+            raise serializers.ValidationError({'file': 'Provide a file or the upload_id of a chunked upload.'})
+        return data
+    
+    def create(self, validated_data):
+        upload = validated_data.pop('upload_id', None)
+        if upload:
+            validated_data['file'] = claim_upload_file(upload)
+            validated_data['file_name'] = upload.file_name
+        else:
+            validated_data['file_name'] = validated_data['file'].name
+        return super().create(validated_data)
     
     def validate_file(self, value):
         """Validate file size and type"""
@@ -400,7 +449,7 @@ class JobListingSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = JobListing
-        fields = '__all__'
+        exclude = ('search_vector',)
         read_only_fields = ('created_at', 'updated_at')
     
     def get_company_logo_url(self, obj):
@@ -733,10 +782,11 @@ class MessagingUserSerializer(serializers.ModelSerializer):
         return obj.username
 
     def get_is_online(self, obj):
-        try:
-            return obj.chat_status.is_online
-        except UserStatus.DoesNotExist:
-            return False
+        # Views listing many users pass one bulk presence lookup in the context
+        online_user_ids = self.context.get('online_user_ids')
+        if online_user_ids is not None:
+            return obj.id in online_user_ids
+        return presence.is_online(obj.id)
 
     def get_profile_pic(self, obj):
         return None
@@ -751,19 +801,29 @@ class ConversationSerializer(serializers.ModelSerializer):
         model = Conversation
         fields = ['id', 'participants', 'created_at', 'updated_at', 'last_message', 'unread_count', 'other_user']
 
+    # Inbox querysets (services.inbox) carry last_message, num_unread and
+    # other_user_id; the per-conversation queries are only a fallback.
+    # Unread counts are maintained by services.unread_counters.
+
     def get_last_message(self, obj):
-        last_message = obj.messages.last()
+        last_message = obj.last_message if hasattr(obj, 'last_message') else obj.messages.last()
         if last_message:
-            return MessagePreviewSerializer(last_message).data
+            return MessagePreviewSerializer(last_message, context=self.context).data
         return None
 
     def get_unread_count(self, obj):
+        if hasattr(obj, 'num_unread'):
+            return obj.num_unread
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.messages.filter(is_read=False).exclude(sender=request.user).count()
+            counter = UnreadCounter.objects.filter(conversation=obj, user=request.user).values_list('count', flat=True).first()
+            return counter or 0
         return 0
 
     def get_other_user(self, obj):
+        if hasattr(obj, 'other_user_id'):
+            other_user = next((user for user in obj.participants.all() if user.id == obj.other_user_id), None)
+            return MessagingUserSerializer(other_user, context=self.context).data if other_user else None
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             other_users = obj.participants.exclude(id=request.user.id)
@@ -832,9 +892,15 @@ class MessageCreateSerializer(serializers.ModelSerializer):
         fields = ['content', 'message_type', 'parent_message', 'is_forwarded']
 
 class FileUploadSerializer(serializers.Serializer):
-    file = serializers.FileField()
+    file = serializers.FileField(required=False)
+    upload_id = ChunkedUploadField('message_file', required=False)
     message_type = serializers.ChoiceField(choices=Message.MESSAGE_TYPES, default='file')
 
+    def validate(self, data):
+        if not data.get('file') and not data.get('upload_id'):
+            raise serializers.ValidationError({'file': 'Provide a file or the upload_id of a chunked upload.'})
+        return data
+
     def validate_file(self, value):
         # Validate file size (10MB limit)
         max_size = 10 * 1024 * 1024  # 10MB
@@ -909,32 +975,42 @@ class PostSerializer(serializers.ModelSerializer):
             'image_url', 'video_url', 'can_edit', 'can_delete', 'time_since'
         ]
         read_only_fields = [
-            'views', 'likes', 'dislikes', 'shares', 'average_rating', 
+            'views', 'likes', 'dislikes', 'shares',
             'rating_count', 'created_at', 'updated_at'
         ]
     
+    # Counts are denormalized columns; the viewer's reactions come from
+    # services.post_queries.with_engagement annotations when present and the
+    # per-post queries are only a fallback.
+
     def get_likes_count(self, obj):
-        return obj.likes.count()
+        return obj.likes_count
     
     def get_dislikes_count(self, obj):
-        return obj.dislikes.count()
+        return obj.dislikes_count
     
     def get_comments_count(self, obj):
-        return obj.comments.count()
+        return obj.comment_count
     
     def get_user_has_liked(self, obj):
+        if hasattr(obj, 'viewer_liked'):
+            return bool(obj.viewer_liked)
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.likes.filter(id=request.user.id).exists()
         return False
     
     def get_user_has_disliked(self, obj):
+        if hasattr(obj, 'viewer_disliked'):
+            return bool(obj.viewer_disliked)
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.dislikes.filter(id=request.user.id).exists()
         return False
     
     def get_user_rating(self, obj):
+        if hasattr(obj, 'viewer_rating'):
+            return obj.viewer_rating
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             rating = Rating.objects.filter(post=obj, user=request.user).first()
@@ -954,10 +1030,7 @@ class PostSerializer(serializers.ModelSerializer):
         return None
     
     def get_tags_list(self, obj):
-        """Convert comma-separated tags to list"""
-        if not obj.tags:
-            return []
-        return [tag.strip() for tag in obj.tags.split(',') if tag.strip()]
+        return obj.get_tags_list()
 
     def get_can_edit(self, obj):
         request = self.context.get('request')
@@ -984,12 +1057,13 @@ class PostSerializer(serializers.ModelSerializer):
 #post create serializer
 class PostCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating posts - ULTRA FLEXIBLE VERSION"""
+    video_upload_id = ChunkedUploadField('post_video', required=False, write_only=True)
     
     class Meta:
         model = Post
         fields = [
             'post_type', 'title', 'content', 'image', 'video', 
-            'video_url', 'tags', 'visibility', 'is_published'
+            'video_url', 'tags', 'visibility', 'is_published', 'video_upload_id'
         ]
         extra_kwargs = {
             'title': {'required': True},  # But we handle this in the view
@@ -1022,7 +1096,7 @@ class PostCreateSerializer(serializers.ModelSerializer):
             })
         
         # Don't allow both video and video_url
-        if data.get('video') and data.get('video_url'):
+        if (data.get('video') or data.get('video_upload_id')) and data.get('video_url'):
             raise serializers.ValidationError({
                 'video': 'Please upload a video file OR provide a video URL, not both.'
             })
@@ -1041,6 +1115,11 @@ class PostCreateSerializer(serializers.ModelSerializer):
         # 1. Set the author
         validated_data['author'] = user
         
+        # Video sent as a chunked upload
+        upload = validated_data.pop('video_upload_id', None)
+        if upload:
+            validated_data['video'] = claim_upload_file(upload)
+        
         # 2. Auto-set company if user has business profile
         if hasattr(user, 'business_profile'):
             validated_data['company'] = user.business_profile
@@ -1060,11 +1139,13 @@ class PostCreateSerializer(serializers.ModelSerializer):
 
 class PostUpdateSerializer(serializers.ModelSerializer):
     """Serializer for updating posts"""
+    video_upload_id = ChunkedUploadField('post_video', required=False, write_only=True)
+
     class Meta:
         model = Post
         fields = [
             'title', 'content', 'image', 'video', 
-            'video_url', 'tags', 'visibility', 'is_published'
+            'video_url', 'tags', 'visibility', 'is_published', 'video_upload_id'
         ]
         extra_kwargs = {
             'title': {'required': False},
@@ -1094,7 +1175,7 @@ class PostUpdateSerializer(serializers.ModelSerializer):
                 })
         
         # Don't allow both video file and video URL
-        if data.get('video') and data.get('video_url'):
+        if (data.get('video') or data.get('video_upload_id')) and data.get('video_url'):
             raise serializers.ValidationError(
                 "Please upload a video file OR provide a video URL, not both."
             )
@@ -1115,7 +1196,10 @@ class PostUpdateSerializer(serializers.ModelSerializer):
                 instance.image.delete(save=False)
         
         # Handle video
-        if 'video' in request.FILES:
+        upload = validated_data.pop('video_upload_id', None)
+        if upload:
+            validated_data['video'] = claim_upload_file(upload)
+        elif 'video' in request.FILES:
             validated_data['video'] = request.FILES['video']
         elif 'video' in validated_data and validated_data['video'] is None:
             # Remove video if explicitly set to null
@@ -1148,12 +1232,16 @@ class CommentSerializer(serializers.ModelSerializer):
         ]
     
     def get_likes_count(self, obj):
-        return obj.likes.count()
+        return obj.likes_count
     
     def get_replies_count(self, obj):
+        if hasattr(obj, 'num_replies'):  # services.comment_tree annotation
+            return obj.num_replies
         return obj.replies.count()
     
     def get_user_has_liked(self, obj):
+        if hasattr(obj, 'viewer_liked'):
+            return bool(obj.viewer_liked)
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.likes.filter(id=request.user.id).exists()
@@ -1233,26 +1321,8 @@ class RatingSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         post = validated_data['post']
         
-        # Check if user already rated this post
-        existing_rating = Rating.objects.filter(user=user, post=post).first()
-        if existing_rating:
-            # Update existing rating
-            existing_rating.rating = validated_data['rating']
-            existing_rating.save()
-            
-            # Update post average rating
-            post.update_rating(validated_data['rating'])
-            
-            return existing_rating
-        else:
-            # Create new rating
-            validated_data['user'] = user
-            rating = Rating.objects.create(**validated_data)
-            
-            # Update post average rating
-            post.update_rating(validated_data['rating'])
-            
-            return rating
+        # Creates or updates the rating and adjusts the post's rating_sum / rating_count
+        return rate_post(post, user, validated_data['rating'])
 
 class LikeDislikeSerializer(serializers.Serializer):
     """Serializer for like/dislike actions"""
@@ -1287,19 +1357,28 @@ class JobListingInteractionSerializer(serializers.ModelSerializer):
     user_has_disliked = serializers.SerializerMethodField()
     company_logo_url = serializers.SerializerMethodField()
     
+    # Values come from services.job_interactions.with_interaction_counts annotations
+    # when present; the per-job queries are only a fallback.
+    
     def get_likes_count(self, obj):
+        if hasattr(obj, 'num_likes'):
+            return obj.num_likes
         return JobInteraction.objects.filter(
             job_listing=obj, 
             interaction_type='like'
         ).count()
     
     def get_dislikes_count(self, obj):
+        if hasattr(obj, 'num_dislikes'):
+            return obj.num_dislikes
         return JobInteraction.objects.filter(
             job_listing=obj, 
             interaction_type='dislike'
         ).count()
     
     def get_comments_count(self, obj):
+        if hasattr(obj, 'num_comments'):
+            return obj.num_comments
         return JobInteraction.objects.filter(
             job_listing=obj, 
             interaction_type='comment',
@@ -1307,6 +1386,8 @@ class JobListingInteractionSerializer(serializers.ModelSerializer):
         ).count()
     
     def get_user_has_liked(self, obj):
+        if hasattr(obj, 'viewer_likes'):
+            return obj.viewer_likes > 0
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return JobInteraction.objects.filter(
@@ -1317,6 +1398,8 @@ class JobListingInteractionSerializer(serializers.ModelSerializer):
         return False
     
     def get_user_has_disliked(self, obj):
+        if hasattr(obj, 'viewer_dislikes'):
+            return obj.viewer_dislikes > 0
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return JobInteraction.objects.filter(
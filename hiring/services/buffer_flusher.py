@@ -0,0 +1,78 @@
+"""
+Background flushing for the in-process write buffers.
+
+The view and last-seen buffers (services.view_counter, services.presence)
+hold their writes in memory, and record() only flushes once a later call
+finds the buffer due. Once traffic stops, whatever they hold would wait
+for the next request, or be lost when the process exits. The match
+refresh queue (services.reverse_matching) is never flushed by requests at
+all, so rescoring stays off the write path. A BufferFlusher
+therefore flushes its buffer every flush_interval seconds on a daemon
+thread, and once more from an atexit hook. A clean shutdown, such as a
+deploy or a daphne restart, still writes what is buffered.
+
+start_buffer_flushing() starts a flusher for each buffer. benta.asgi calls
+it, so flushers run in server processes only; management commands and
+tests flush explicitly.
+"""
+import atexit
+import logging
+import threading
+
+from django.db import close_old_connections
+
+from .presence import last_seen_buffer
+from .reverse_matching import match_refresh_queue
+from .view_counter import view_buffer
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFlusher:
+    """Calls buffer.flush() every interval seconds on a daemon thread, and once more at exit"""
+
+    def __init__(self, buffer, interval):
+        self.buffer = buffer
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.buffer.flush()
+            except Exception as e:
+                logger.error(f"Background flush of {type(self.buffer).__name__} failed: {e}", exc_info=True)
+            finally:
+                close_old_connections()  # this thread's own connection
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name=f'{type(self.buffer).__name__}-flusher', daemon=True
+            )
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the thread and write whatever is still buffered"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+        return self.buffer.flush()
+
+
+_flushers = []
+
+
+def start_buffer_flushing():
+    """Start background flushing for every buffer in this process. Safe to call more than once."""
+    if not _flushers:
+        _flushers.extend(
+            BufferFlusher(buffer, buffer.flush_interval) for buffer in (view_buffer, last_seen_buffer, match_refresh_queue)
+        )
+    for flusher in _flushers:
+        flusher.start()
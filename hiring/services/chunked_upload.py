@@ -0,0 +1,350 @@
+"""
+Resumable chunked uploads written straight to the storage backend.
+
+start_upload() checks the declared name and size before any bytes
+arrive. The checks are the purpose's size limit and the validators of the
+model field the file is for. It then opens the file in storage.
+append_chunk() takes the file in order, one chunk per request. Every
+chunk but the last is exactly chunk_size bytes, and the chunk is read
+from the request with a hard cap. A worker therefore never holds more
+than one chunk, and an upload can never grow past its declared size. A
+client that loses its connection reads upload.received and resends from
+there. The upload row is locked only to reserve the offset and, after
+the chunk is in storage, to record it; the storage write itself runs
+outside any transaction. The reservation is a lease that lapses after
+CHUNK_LEASE_SECONDS, so a worker that dies mid-chunk does not block the
+upload for good. complete_upload() finalises the file. claim_upload() then hands
+its storage name, once, to the message, document or post that uses it.
+
+Storage backends:
+- FileSystemStorage: each chunk is written at its offset in the file on
+  disk, so a resent chunk overwrites instead of duplicating.
+- S3Boto3Storage: each chunk is one part of an S3 multipart upload, which
+  S3 assembles on completion. S3 requires every part but the last to be
+  at least 5 MB, so chunk_size is never smaller than that.
+
+store_file() is the one-request path for ordinary multipart form
+uploads. It runs the same checks, then lets the storage backend stream
+the uploaded file instead of reading it into memory.
+
+expire_uploads() discards uploads that were never attached and backs
+the expire_chunked_uploads management command.
+
+Settings:
+- CHUNKED_UPLOAD_CHUNK_SIZE: bytes per chunk (default 5 MB)
+- CHUNKED_UPLOAD_EXPIRY: hours an unattached upload is kept (default 24)
+"""
+import logging
+import os
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import ChunkedUpload, Document, Message, Post
+
+try:
+    from storages.backends.s3boto3 import S3Boto3Storage
+    from storages.utils import clean_name
+except ImportError:  # django-storages is only needed for S3
+    S3Boto3Storage = None
+
+logger = logging.getLogger(__name__)
+
+
+MB = 1024 * 1024
+S3_MIN_PART_SIZE = 5 * MB
+READ_SIZE = 64 * 1024
+CHUNK_LEASE_SECONDS = 300
+CHUNK_SIZE = getattr(settings, 'CHUNKED_UPLOAD_CHUNK_SIZE', 5 * MB)
+EXPIRY_HOURS = getattr(settings, 'CHUNKED_UPLOAD_EXPIRY', 24)
+
+# purpose -> (model, file field, size limit in bytes)
+PURPOSES = {
+    'message_file': (Message, 'file', 100 * MB),
+    'document': (Document, 'file', 5 * MB),
+    'post_video': (Post, 'video', getattr(settings, 'MAX_UPLOAD_SIZE', 300 * MB)),
+}
+
+# What model field validators see of a file that has not arrived yet
+_PendingFile = namedtuple('_PendingFile', 'name size')
+
+
+class UploadError(Exception):
+    """A rejected upload request. status_code is the HTTP status to answer with."""
+
+    def __init__(self, message, status_code=400, received=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.received = received
+
+
+class FileSystemChunkWriter:
+    """Writes each chunk at its offset in the file on local disk"""
+    min_chunk_size = 1
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def start(self, upload):
+        upload.storage_name = self.storage.save(upload.storage_name, ContentFile(b''))
+
+    def write(self, upload, offset, data):
+        with open(self.storage.path(upload.storage_name), 'r+b') as f:
+            f.seek(offset)
+            f.write(data)
+            f.truncate()
+
+    def record(self, upload, part):
+        pass
+
+    def complete(self, upload):
+        pass
+
+    def abort(self, upload):
+        self.storage.delete(upload.storage_name)
+
+
+class S3MultipartWriter:
+    """Sends each chunk as one part of an S3 multipart upload"""
+    min_chunk_size = S3_MIN_PART_SIZE
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.client = storage.connection.meta.client
+
+    def _target(self, upload):
+        return {
+            'Bucket': self.storage.bucket_name,
+            'Key': self.storage._normalize_name(clean_name(upload.storage_name)),
+        }
+
+    def start(self, upload):
+        upload.storage_name = self.storage.get_available_name(upload.storage_name)
+        target = self._target(upload)
+        params = self.storage._get_write_parameters(target['Key'])
+        if upload.content_type:
+            params['ContentType'] = upload.content_type
+        upload.multipart_id = self.client.create_multipart_upload(**target, **params)['UploadId']
+
+    def write(self, upload, offset, data):
+        """Upload the chunk as a part and return the part for record()"""
+        part_number = offset // upload.chunk_size + 1
+        response = self.client.upload_part(
+            **self._target(upload), UploadId=upload.multipart_id, PartNumber=part_number, Body=data
+        )
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+    def record(self, upload, part):
+        """Add part to upload.parts, replacing an earlier upload of the same part"""
+        upload.parts = [p for p in upload.parts if p['PartNumber'] != part['PartNumber']]
+        upload.parts.append(part)
+
+    def complete(self, upload):
+        parts = sorted(upload.parts, key=lambda part: part['PartNumber'])
+        self.client.complete_multipart_upload(
+            **self._target(upload), UploadId=upload.multipart_id, MultipartUpload={'Parts': parts}
+        )
+
+    def abort(self, upload):
+        self.client.abort_multipart_upload(**self._target(upload), UploadId=upload.multipart_id)
+
+
+def chunk_writer(storage):
+    """The chunk writer for storage. Raises ImproperlyConfigured for other backends."""
+    if isinstance(storage, FileSystemStorage):
+        return FileSystemChunkWriter(storage)
+    if S3Boto3Storage is not None and isinstance(storage, S3Boto3Storage):
+        return S3MultipartWriter(storage)
+    raise ImproperlyConfigured(f'Chunked uploads are not supported by {storage.__class__.__name__}')
+
+
+def _field(purpose):
+    if purpose not in PURPOSES:
+        raise UploadError(f"Unknown upload purpose '{purpose}'")
+    model, field_name, max_size = PURPOSES[purpose]
+    return model._meta.get_field(field_name), max_size
+
+
+def check_file(purpose, file_name, size):
+    """The model field a file for purpose is stored in, once file_name and size pass its checks. Raises UploadError."""
+    field, max_size = _field(purpose)
+    if not file_name:
+        raise UploadError('file_name is required')
+    if size <= 0:
+        raise UploadError('File is empty')
+    if size > max_size:
+        raise UploadError(f'File size exceeds {max_size // MB}MB limit', 413)
+    try:
+        for validator in field.validators:
+            validator(_PendingFile(file_name, size))
+    except ValidationError as e:
+        raise UploadError(' '.join(e.messages))
+    return field
+
+
+def _storage_name(field, file_name):
+    return field.generate_filename(None, f'{uuid.uuid4()}{os.path.splitext(file_name)[1].lower()}')
+
+
+def store_file(uploaded_file, purpose):
+    """Save a form-uploaded file for purpose without reading it into memory. Returns the storage name."""
+    field = check_file(purpose, uploaded_file.name, uploaded_file.size)
+    return field.storage.save(_storage_name(field, uploaded_file.name), uploaded_file)
+
+
+def start_upload(user, purpose, file_name, size, content_type=''):
+    """Check the declared file and open it in storage. Raises UploadError."""
+    field = check_file(purpose, file_name, size)
+    writer = chunk_writer(field.storage)
+    upload = ChunkedUpload(
+        user=user,
+        purpose=purpose,
+        file_name=file_name[:255],
+        content_type=(content_type or '')[:100],
+        size=size,
+        chunk_size=max(CHUNK_SIZE, writer.min_chunk_size),
+        storage_name=_storage_name(field, file_name),
+    )
+    writer.start(upload)
+    upload.save()
+    return upload
+
+
+def get_upload(user, upload_id, lock=False):
+    uploads = ChunkedUpload.objects.select_for_update() if lock else ChunkedUpload.objects
+    try:
+        return uploads.get(pk=upload_id, user_id=user.pk)
+    except ChunkedUpload.DoesNotExist:
+        raise UploadError('Upload not found', 404)
+
+
+def read_chunk(stream, limit):
+    """Up to limit bytes from stream. Raises UploadError as soon as more arrive."""
+    data = bytearray()
+    while True:
+        piece = stream.read(min(READ_SIZE, limit + 1 - len(data)))
+        if not piece:
+            return bytes(data)
+        data += piece
+        if len(data) > limit:
+            raise UploadError(f'Chunk exceeds {limit} bytes', 413)
+
+
+def append_chunk(user, upload_id, offset, stream):
+    """
+    Write the chunk read from stream at offset and return the upload.
+    offset must be upload.received; otherwise UploadError carries the
+    received count so the client can resume from it.
+    """
+    upload = get_upload(user, upload_id)
+    if upload.status != 'pending':
+        raise UploadError('Upload is not accepting chunks', 409, upload.received)
+    if offset != upload.received:
+        raise UploadError(f'Expected offset {upload.received}', 409, upload.received)
+    expected = min(upload.chunk_size, upload.size - upload.received)
+    data = read_chunk(stream, expected)
+    if len(data) != expected:
+        raise UploadError(f'Chunk must be {expected} bytes, got {len(data)}', 400, upload.received)
+
+    now = timezone.now()
+    with transaction.atomic():
+        upload = get_upload(user, upload_id, lock=True)
+        if upload.status != 'pending' or upload.received != offset:
+            raise UploadError(f'Expected offset {upload.received}', 409, upload.received)
+        if upload.writing_until and upload.writing_until > now:
+            raise UploadError('Another chunk is being written, retry shortly', 409, upload.received)
+        upload.writing_until = now + timedelta(seconds=CHUNK_LEASE_SECONDS)
+        upload.save(update_fields=['writing_until', 'updated_at'])
+
+    writer = chunk_writer(_field(upload.purpose)[0].storage)
+    try:
+        part = writer.write(upload, offset, data)
+    except Exception:
+        ChunkedUpload.objects.filter(pk=upload.pk).update(writing_until=None)
+        raise
+
+    with transaction.atomic():
+        upload = get_upload(user, upload_id, lock=True)
+        if upload.status != 'pending':
+            raise UploadError(f'Upload is {upload.status}', 409, upload.received)
+        writer.record(upload, part)
+        upload.received = offset + len(data)
+        upload.writing_until = None
+        upload.save(update_fields=['received', 'parts', 'writing_until', 'updated_at'])
+    return upload
+
+
+def complete_upload(user, upload_id):
+    """Finalise a fully received upload in storage. Raises UploadError."""
+    with transaction.atomic():
+        upload = get_upload(user, upload_id, lock=True)
+        if upload.status == 'complete':
+            return upload
+        if upload.status != 'pending':
+            raise UploadError(f'Upload is {upload.status}', 409, upload.received)
+        if upload.received != upload.size:
+            raise UploadError(f'Received {upload.received} of {upload.size} bytes', 409, upload.received)
+        chunk_writer(_field(upload.purpose)[0].storage).complete(upload)
+        upload.status = 'complete'
+        upload.save(update_fields=['status', 'updated_at'])
+    return upload
+
+
+def _discard(upload):
+    storage = _field(upload.purpose)[0].storage
+    if upload.status == 'pending':
+        chunk_writer(storage).abort(upload)
+    else:
+        storage.delete(upload.storage_name)
+    upload.status = 'aborted'
+    upload.save(update_fields=['status', 'updated_at'])
+
+
+def abort_upload(user, upload_id):
+    """Drop an upload that was never attached, along with anything stored for it"""
+    with transaction.atomic():
+        upload = get_upload(user, upload_id, lock=True)
+        if upload.status == 'attached':
+            raise UploadError('Upload is already in use', 409)
+        if upload.status != 'aborted':
+            _discard(upload)
+    return upload
+
+
+def completed_upload(user, upload_id, purpose):
+    """user's completed, unattached upload for purpose. Raises UploadError."""
+    try:
+        upload = ChunkedUpload.objects.filter(pk=upload_id, user_id=user.pk, purpose=purpose, status='complete').first()
+    except ValidationError:
+        upload = None  # not a UUID
+    if upload is None:
+        raise UploadError('No completed upload with this id')
+    return upload
+
+
+def claim_upload(upload):
+    """Mark a completed upload attached and return its storage name. Raises UploadError if it was claimed meanwhile."""
+    if not ChunkedUpload.objects.filter(pk=upload.pk, status='complete').update(status='attached', updated_at=timezone.now()):
+        raise UploadError('Upload has already been used', 409)
+    upload.status = 'attached'
+    return upload.storage_name
+
+
+def expire_uploads(max_age=None):
+    """Discard uploads never attached within max_age (default CHUNKED_UPLOAD_EXPIRY hours). Returns the number discarded."""
+    cutoff = timezone.now() - (max_age or timedelta(hours=EXPIRY_HOURS))
+    expired = 0
+    for upload in ChunkedUpload.objects.filter(status__in=['pending', 'complete'], updated_at__lt=cutoff).iterator():
+        try:
+            _discard(upload)
+            expired += 1
+        except Exception as e:
+            logger.error(f"Failed to discard upload {upload.pk}: {e}", exc_info=True)
+    return expired
@@ -0,0 +1,101 @@
+"""
+Threaded comment loading.
+
+A post's thread is read in two queries. The first fetches the page of
+top-level comments, keyset-paginated like the other lists. The second
+fetches every reply beneath them, down to COMMENT_TREE_MAX_DEPTH levels
+and at most COMMENT_TREE_MAX_REPLIES rows. A recursive CTE collects those
+replies, and the reply counts and the viewer's likes are annotated in
+bulk. The tree is then assembled in memory: each serialized comment gets
+a 'replies' list, oldest reply first. replies_count still reports every
+direct reply, so clients can tell when a branch was cut off.
+
+JobInteraction reply threads use the same CTE.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Exists, OuterRef, Value
+from django.db.models.expressions import RawSQL
+
+from ..models import Comment, JobInteraction
+from ..pagination import paginate
+from ..serializers import CommentSerializer, JobInteractionSerializer
+from .engagement_counters import aggregate_subquery
+
+
+MAX_DEPTH = getattr(settings, 'COMMENT_TREE_MAX_DEPTH', 5)
+MAX_REPLIES = getattr(settings, 'COMMENT_TREE_MAX_REPLIES', 500)
+TOP_LEVEL_ORDERING = ('-created_at', '-id')
+
+
+def descendants(queryset, parent_field, root_ids, max_depth=MAX_DEPTH, limit=MAX_REPLIES):
+    """queryset narrowed to the rows below root_ids, at most max_depth levels and limit rows"""
+    if not root_ids:
+        return queryset.none()
+    meta = queryset.model._meta
+    quote = connection.ops.quote_name
+    table, pk = quote(meta.db_table), quote(meta.pk.column)
+    parent = quote(meta.get_field(parent_field).column)
+    placeholders = ', '.join(['%s'] * len(root_ids))
+    sql = (
+        f"WITH RECURSIVE thread (node, depth) AS ("
+        f"SELECT {pk}, 1 FROM {table} WHERE {parent} IN ({placeholders}) "
+        f"UNION ALL "
+        f"SELECT child.{pk}, thread.depth + 1 FROM {table} child JOIN thread ON child.{parent} = thread.node "
+        f"WHERE thread.depth < %s"
+        f") SELECT node FROM thread LIMIT %s"
+    )
+    return queryset.filter(pk__in=RawSQL(sql, [*root_ids, max_depth, limit]))
+
+
+def nest(rows, parent_key):
+    """
+    Attach serialized rows to their parents' 'replies' lists, keeping row
+    order. Returns the rows whose parent is not among them.
+    """
+    by_id = {row['id']: row for row in rows}
+    roots = []
+    for row in rows:
+        row['replies'] = []
+    for row in rows:
+        parent = by_id.get(row[parent_key])
+        (parent['replies'] if parent is not None else roots).append(row)
+    return roots
+
+
+def comment_queryset(user=None):
+    """Comments annotated with num_replies and viewer_liked for CommentSerializer"""
+    comments = Comment.objects.select_related('author').annotate(
+        num_replies=aggregate_subquery(Comment.objects.filter(parent_comment_id=OuterRef('pk')), 'parent_comment_id')
+    )
+    if user is None or not user.is_authenticated:
+        return comments.annotate(viewer_liked=Value(False))
+    return comments.annotate(
+        viewer_liked=Exists(Comment.likes.through.objects.filter(comment_id=OuterRef('pk'), customuser_id=user.pk))
+    )
+
+
+def post_comment_tree(post, request, page_size=20, cursor=None, page=None, with_total=False,
+                      max_depth=MAX_DEPTH, max_replies=MAX_REPLIES):
+    """
+    (CursorPage of top-level comments, serialized threads) for post.
+    Raises InvalidCursor for a bad cursor.
+    """
+    comments = comment_queryset(request.user)
+    result = paginate(
+        comments.filter(post=post, parent_comment__isnull=True), TOP_LEVEL_ORDERING, page_size,
+        cursor=cursor, page=page, with_total=with_total
+    )
+    root_ids = [comment.id for comment in result.items]
+    replies = descendants(comments, 'parent_comment', root_ids, max_depth, max_replies).order_by('created_at', 'id')
+    rows = CommentSerializer([*result.items, *replies], many=True, context={'request': request}).data
+    return result, nest(rows, 'parent_comment')
+
+
+def job_reply_tree(interaction, request, max_depth=MAX_DEPTH, max_replies=MAX_REPLIES):
+    """Serialized reply threads below a JobInteraction comment"""
+    replies = descendants(
+        JobInteraction.objects.select_related('user'), 'parent_interaction', [interaction.id], max_depth, max_replies
+    ).order_by('created_at', 'id')
+    rows = JobInteractionSerializer(replies, many=True, context={'request': request}).data
+    return nest(rows, 'parent_interaction')
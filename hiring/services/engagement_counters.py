@@ -0,0 +1,172 @@
+"""
+Denormalized engagement counters on Post and Comment.
+
+The counters are Post.likes_count, Post.dislikes_count, Post.comment_count,
+Post.shares, Post.rating_sum, Post.rating_count and Comment.likes_count.
+Each one is adjusted with an F() expression in the same transaction as the
+reaction, comment, share or rating write, so feed reads never count the M2M
+tables and ratings are never re-averaged. Reaction, comment and share
+counters change through update_post_counters(), which sets the post's
+stored popularity score (see services.popularity) in the same UPDATE.
+reconcile_counters() recomputes every counter from the source rows to
+repair drift, such as reactions edited in the admin. It backs the
+reconcile_engagement_counts management command. No endpoint writes
+comment likes, so Comment.likes_count only changes through
+reconcile_counters().
+"""
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from ..models import Comment, Post, Rating
+from .popularity import popularity_expression
+
+
+def aggregate_subquery(queryset, key, aggregate=None):
+    """Correlated COUNT(*) (or another aggregate) of queryset rows grouped on key, 0 when there are none"""
+    totals = queryset.order_by().values(key).annotate(total=aggregate or Count('*')).values('total')[:1]
+    return Coalesce(Subquery(totals, output_field=IntegerField()), 0)
+
+
+def update_post_counters(post, **deltas):
+    """
+    Add deltas to post's counters with F() expressions and set its
+    popularity score from the new values in the same UPDATE. Refreshes the
+    changed counters on post.
+    """
+    Post.objects.filter(pk=post.pk).update(
+        popularity_score=popularity_expression(post.created_at, deltas),
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    post.refresh_from_db(fields=list(deltas))
+    return post
+
+
+def _add_reaction(through, **fields):
+    _, created = through.objects.get_or_create(**fields)
+    return int(created)
+
+
+def _remove_reaction(through, **fields):
+    return through.objects.filter(**fields).delete()[0]
+
+
+def set_post_reaction(post, user, action):
+    """
+    Set user's reaction to post to 'like', 'dislike' or 'remove' and adjust
+    the counters. Refreshes post.likes_count and post.dislikes_count.
+
+    A user holds at most one reaction per post, so adding a reaction that is
+    already there changes nothing, and once one reaction is removed the
+    other cannot exist; neither case touches the other table.
+    """
+    row = {'post_id': post.pk, 'customuser_id': user.pk}
+    with transaction.atomic():
+        like_delta = dislike_delta = 0
+        if action == 'like':
+            like_delta = _add_reaction(Post.likes.through, **row)
+            if like_delta:
+                dislike_delta = -_remove_reaction(Post.dislikes.through, **row)
+        elif action == 'dislike':
+            dislike_delta = _add_reaction(Post.dislikes.through, **row)
+            if dislike_delta:
+                like_delta = -_remove_reaction(Post.likes.through, **row)
+        else:
+            like_delta = -_remove_reaction(Post.likes.through, **row)
+            if not like_delta:
+                dislike_delta = -_remove_reaction(Post.dislikes.through, **row)
+
+        if like_delta or dislike_delta:
+            return update_post_counters(post, likes_count=like_delta, dislikes_count=dislike_delta)
+    post.refresh_from_db(fields=['likes_count', 'dislikes_count'])
+    return post
+
+
+def record_comment_added(comment):
+    """Count a newly created comment (or reply) against its post. Refreshes comment.post.comment_count."""
+    if comment.post_id:
+        update_post_counters(comment.post, comment_count=1)
+
+
+def record_share(post):
+    """Count a share of post. Refreshes post.shares."""
+    return update_post_counters(post, shares=1)
+
+
+def rate_post(post, user, value):
+    """
+    Create or change user's rating of post. The post's rating_sum (by the
+    delta from any previous rating) and rating_count change in one UPDATE.
+    Refreshes post.rating_sum and post.rating_count and returns the Rating.
+
+    The post row is locked before the rating is read, so concurrent ratings
+    of one post serialize and a repeated first rating updates the row the
+    earlier one created instead of failing on the unique constraint.
+    """
+    with transaction.atomic():
+        Post.objects.select_for_update().only('pk').get(pk=post.pk)
+        rating = Rating.objects.filter(post_id=post.pk, user_id=user.pk).first()
+        if rating is None:
+            rating = Rating.objects.create(post=post, user=user, rating=value)
+            Post.objects.filter(pk=post.pk).update(rating_sum=F('rating_sum') + value, rating_count=F('rating_count') + 1)
+        elif rating.rating != value:
+            delta = value - rating.rating
+            rating.rating = value
+            rating.save(update_fields=['rating'])
+            Post.objects.filter(pk=post.pk).update(rating_sum=F('rating_sum') + delta)
+    post.refresh_from_db(fields=['rating_sum', 'rating_count'])
+    return rating
+
+
+def remove_post_rating(post, user):
+    """Delete user's rating of post, if any. Returns True if one was removed."""
+    with transaction.atomic():
+        Post.objects.select_for_update().only('pk').get(pk=post.pk)
+        rating = Rating.objects.filter(post_id=post.pk, user_id=user.pk).first()
+        if rating is not None:
+            rating.delete()
+            Post.objects.filter(pk=post.pk).update(
+                rating_sum=F('rating_sum') - rating.rating, rating_count=F('rating_count') - 1
+            )
+    post.refresh_from_db(fields=['rating_sum', 'rating_count'])
+    return rating is not None
+
+
+def _post_counts():
+    return {
+        'likes_count': aggregate_subquery(Post.likes.through.objects.filter(post_id=OuterRef('pk')), 'post_id'),
+        'dislikes_count': aggregate_subquery(Post.dislikes.through.objects.filter(post_id=OuterRef('pk')), 'post_id'),
+        'comment_count': aggregate_subquery(Comment.objects.filter(post_id=OuterRef('pk')), 'post_id'),
+        'rating_sum': aggregate_subquery(Rating.objects.filter(post_id=OuterRef('pk')), 'post_id', Sum('rating')),
+        'rating_count': aggregate_subquery(Rating.objects.filter(post_id=OuterRef('pk')), 'post_id'),
+    }
+
+
+def _comment_counts():
+    return {
+        'likes_count': aggregate_subquery(Comment.likes.through.objects.filter(comment_id=OuterRef('pk')), 'comment_id'),
+    }
+
+
+def _reconcile(model, counts, batch_size):
+    actual = {f'actual_{field}': expression for field, expression in counts.items()}
+    drift = Q()
+    for field in counts:
+        drift |= ~Q(**{field: F(f'actual_{field}')})
+
+    stale = []
+    for obj in model.objects.annotate(**actual).filter(drift).only('pk', *counts).iterator(chunk_size=batch_size):
+        for field in counts:
+            setattr(obj, field, getattr(obj, f'actual_{field}'))
+        stale.append(obj)
+    model.objects.bulk_update(stale, list(counts), batch_size=batch_size)
+    return len(stale)
+
+
+def reconcile_counters(batch_size=500):
+    """Rewrite drifted counters from the source rows. Returns (posts fixed, comments fixed)."""
+    with transaction.atomic():
+        return (
+            _reconcile(Post, _post_counts(), batch_size),
+            _reconcile(Comment, _comment_counts(), batch_size),
+        )
@@ -0,0 +1,140 @@
+"""
+Precomputed applicant features.
+
+ApplicantFeatures holds one row per applicant with the employment and
+education facts the matching engine scores against, and ApplicantTitleToken
+the inverted index over their job title tokens. Views that write
+EmploymentHistory or Education call refresh_applicant_features() for the
+affected profile; rebuild_applicant_features() recomputes both tables and
+backs the rebuild_applicant_features management command.
+"""
+from itertools import groupby
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import ApplicantFeatures, ApplicantTitleToken, EmploymentHistory, Education
+from .match_cache import bump_applicant_feature_version
+from .matching_service import CONTRACT_TYPE_BITS, DEGREE_LEVEL_BITS, tokenize_title
+from .reverse_matching import queue_applicant_refresh
+
+
+EMPLOYMENT_COLUMNS = ('profile_id', 'job_title', 'contract_type', 'start_date', 'end_date', 'currently_working')
+EDUCATION_COLUMNS = ('profile_id', 'qualification', 'major_subject', 'grade')
+
+
+def employment_features(rows, today):
+    """Employment feature values from EMPLOYMENT_COLUMNS rows of one profile"""
+    job_titles = []
+    contract_types = experience_months = open_positions = 0
+    for _, job_title, contract_type, start_date, end_date, currently_working in rows:
+        job_titles.append(job_title or '')
+        contract_types |= CONTRACT_TYPE_BITS.get(contract_type, 0)
+        if currently_working:
+            open_positions += 1
+            end_date = today
+        if start_date and end_date:
+            experience_months += max(0, (end_date.year - start_date.year) * 12 + (end_date.month - start_date.month))
+    return {
+        'employment_count': len(job_titles),
+        'experience_months': experience_months,
+        'open_positions': open_positions,
+        'contract_types': contract_types,
+        'job_titles': job_titles,
+    }
+
+
+def title_postings(profile_id, job_titles):
+    """ApplicantTitleToken rows for an applicant's job titles (ApplicantFeatures.job_titles)"""
+    return [
+        ApplicantTitleToken(token=token, profile_id=profile_id, record=record)
+        for record, job_title in enumerate(job_titles)
+        for token in sorted(set(tokenize_title(job_title)))
+    ]
+
+
+def education_features(rows):
+    """Education feature values from EDUCATION_COLUMNS rows of one profile"""
+    degree_levels = highest_rank = 0
+    highest_level = ''
+    fields, grades = [], []
+    for _, qualification, major_subject, grade in rows:
+        level = Education.classify_qualification(qualification)
+        degree_levels |= DEGREE_LEVEL_BITS[level]
+        rank = Education.DEGREE_LEVEL_RANKS.get(level, 0)
+        if rank > highest_rank:
+            highest_rank, highest_level = rank, level
+        fields.append(major_subject or '')
+        grades.append(Education.parse_grade(grade))
+    valid_grades = [grade for grade in grades if grade]
+    return {
+        'education_count': len(fields),
+        'degree_levels': degree_levels,
+        'highest_degree_rank': highest_rank,
+        'highest_degree_level': highest_level,
+        'max_gpa': max(valid_grades) if valid_grades else None,
+        'fields_of_study': fields,
+        'grades': grades,
+    }
+
+
+def _build_features(employment_rows, education_rows, today):
+    values = employment_features(employment_rows, today)
+    values.update(education_features(education_rows))
+    values['refreshed_on'] = today
+    return values
+
+
+def refresh_applicant_features(profile):
+    """
+    Recompute the feature row of a single applicant after its employment or
+    education changed, and queue a refresh of its stored preference matches
+    (see reverse_matching). Applicants with neither lose their row.
+    """
+    employment_rows = list(EmploymentHistory.objects.filter(profile=profile).order_by('id').values_list(*EMPLOYMENT_COLUMNS))
+    education_rows = list(Education.objects.filter(profile=profile).order_by('id').values_list(*EDUCATION_COLUMNS))
+    with transaction.atomic():
+        ApplicantTitleToken.objects.filter(profile=profile).delete()
+        if not employment_rows and not education_rows:
+            ApplicantFeatures.objects.filter(profile=profile).delete()
+            features = None
+        else:
+            values = _build_features(employment_rows, education_rows, timezone.now().date())
+            features, _ = ApplicantFeatures.objects.update_or_create(profile=profile, defaults=values)
+            ApplicantTitleToken.objects.bulk_create(title_postings(profile.id, values['job_titles']))
+    bump_applicant_feature_version()
+    queue_applicant_refresh(profile.id)
+    return features
+
+
+def rebuild_applicant_features(batch_size=500):
+    """Recompute every applicant's feature row in bulk. Returns the number of rows written."""
+    today = timezone.now().date()
+    employment = {
+        profile_id: list(rows) for profile_id, rows in groupby(
+            EmploymentHistory.objects.order_by('profile_id', 'id').values_list(*EMPLOYMENT_COLUMNS).iterator(),
+            key=lambda row: row[0]
+        )
+    }
+    education = {
+        profile_id: list(rows) for profile_id, rows in groupby(
+            Education.objects.order_by('profile_id', 'id').values_list(*EDUCATION_COLUMNS).iterator(),
+            key=lambda row: row[0]
+        )
+    }
+
+    features = [
+        ApplicantFeatures(
+            profile_id=profile_id,
+            **_build_features(employment.get(profile_id, []), education.get(profile_id, []), today)
+        )
+        for profile_id in sorted(employment.keys() | education.keys())
+    ]
+    postings = [posting for row in features for posting in title_postings(row.profile_id, row.job_titles)]
+    with transaction.atomic():
+        ApplicantTitleToken.objects.all().delete()
+        ApplicantFeatures.objects.all().delete()
+        ApplicantFeatures.objects.bulk_create(features, batch_size=batch_size)
+        ApplicantTitleToken.objects.bulk_create(postings, batch_size=batch_size)
+    bump_applicant_feature_version()
+    return len(features)
@@ -0,0 +1,79 @@
+"""
+Conversation inbox in a fixed number of queries.
+
+The page query annotates each conversation with three correlated
+subqueries, so none of them needs a GROUP BY: last_message_id, the
+viewer's num_unread (read from services.unread_counters) and
+other_user_id. It is keyset-paginated on (updated_at, id). Two more
+queries hydrate the page. One prefetches the participants, the other
+fetches the last messages with their senders. Online status comes from
+one presence lookup (services.presence). ConversationSerializer reads
+those attributes rather than querying per conversation. An inbox page
+therefore costs three queries whatever its size.
+"""
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from ..models import Conversation, Message
+from ..pagination import paginate
+from .presence import online_user_ids
+from .unread_counters import lock_unread, reset_unread, unread_subquery
+
+
+INBOX_ORDERING = ('-updated_at', '-id')
+
+
+def with_inbox_fields(queryset, user):
+    """Annotate conversations with last_message_id, num_unread and other_user_id for user"""
+    messages = Message.objects.filter(conversation_id=OuterRef('pk'))
+    others = Conversation.participants.through.objects.filter(conversation_id=OuterRef('pk')).exclude(customuser_id=user.pk)
+    return queryset.annotate(
+        last_message_id=Subquery(messages.order_by('-created_at', '-id').values('id')[:1]),
+        num_unread=unread_subquery(user),
+        other_user_id=Subquery(others.order_by('customuser_id').values('customuser_id')[:1]),
+    )
+
+
+def inbox_conversations(user):
+    """user's conversations ready for ConversationSerializer(many=True) once passed through attach_last_messages()"""
+    return with_inbox_fields(Conversation.objects.filter(participants=user), user).prefetch_related('participants')
+
+
+def attach_last_messages(conversations):
+    """Set last_message on each annotated conversation, loading all of them in one query"""
+    ids = [conversation.last_message_id for conversation in conversations if conversation.last_message_id]
+    messages = Message.objects.select_related('sender').in_bulk(ids)
+    for conversation in conversations:
+        conversation.last_message = messages.get(conversation.last_message_id)
+    return conversations
+
+
+def inbox_page(user, page_size, cursor=None, page=None, with_total=False):
+    """A CursorPage of user's conversations, most recently active first. Raises InvalidCursor for a bad cursor."""
+    result = paginate(inbox_conversations(user), INBOX_ORDERING, page_size, cursor=cursor, page=page, with_total=with_total)
+    attach_last_messages(result.items)
+    return result
+
+
+def inbox_online_user_ids(conversations):
+    """Online participants of a loaded inbox page, for the serializer context"""
+    return online_user_ids({participant.id for conversation in conversations for participant in conversation.participants.all()})
+
+
+def mark_conversation_read(conversation_id, user):
+    """
+    Mark the messages other participants sent user as read and zero user's
+    unread counter, holding the counter's lock throughout so a message
+    recorded meanwhile is either marked read or counted (see
+    services.unread_counters). Returns the read time, or None if nothing
+    was unread.
+    """
+    read_at = timezone.now()
+    with transaction.atomic():
+        lock_unread(conversation_id, user)
+        marked = Message.objects.filter(
+            conversation_id=conversation_id, is_read=False
+        ).exclude(sender_id=user.pk).update(is_read=True, read_at=read_at)
+        reset_unread(conversation_id, user)
+    return read_at if marked else None
@@ -0,0 +1,92 @@
+"""
+Facet counts for job search.
+
+All four facets come from a single GROUP BY over the (location,
+job_category, industry, contract_type) combinations of the jobs matching
+the search text. Each facet is then counted under the selections of the
+*other* facets, so choosing a location still shows how many jobs every
+other location has. Counts are cached per (search text, selection) and
+the whole cache is invalidated by bumping a version whenever listings are
+created, edited, deleted or change status.
+"""
+import hashlib
+import json
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .job_search import matching_jobs, published_jobs
+
+
+FACET_FIELDS = ('location', 'job_category', 'industry', 'contract_type')
+FACET_VERSION_KEY = 'jobs:facet_version'
+FACET_CACHE_TIMEOUT = getattr(settings, 'JOB_FACET_CACHE_TIMEOUT', 600)
+
+
+def facet_version():
+    version = cache.get(FACET_VERSION_KEY)
+    if version is None:
+        cache.add(FACET_VERSION_KEY, 1, timeout=None)
+        version = cache.get(FACET_VERSION_KEY, 1)
+    return version
+
+
+def invalidate_job_facets():
+    """Call after any JobListing write that can change published facet counts"""
+    try:
+        cache.incr(FACET_VERSION_KEY)
+    except ValueError:
+        cache.add(FACET_VERSION_KEY, 1, timeout=None)
+        cache.incr(FACET_VERSION_KEY)
+
+
+def normalize_selection(selected):
+    """Keep known facets with at least one value, values sorted and de-duplicated"""
+    return {
+        field: sorted(set(values))
+        for field, values in (selected or {}).items()
+        if field in FACET_FIELDS and values
+    }
+
+
+def apply_facet_filters(queryset, selected):
+    for field, values in normalize_selection(selected).items():
+        queryset = queryset.filter(**{f'{field}__in': values})
+    return queryset
+
+
+def _count_facets(queryset, selected):
+    rows = queryset.order_by().values_list(*FACET_FIELDS).annotate(total=Count('id'))
+    counts = {field: Counter() for field in FACET_FIELDS}
+    selections = [(position, set(selected[field])) for position, field in enumerate(FACET_FIELDS) if field in selected]
+    for row in rows:
+        values, total = row[:-1], row[-1]
+        for position, field in enumerate(FACET_FIELDS):
+            if all(values[other] in allowed for other, allowed in selections if other != position):
+                counts[field][values[position]] += total
+    return {
+        field: [
+            {'value': value, 'count': total}
+            for value, total in sorted(counts[field].items(), key=lambda item: (-item[1], item[0]))
+        ]
+        for field in FACET_FIELDS
+    }
+
+
+def job_facet_counts(query_text='', selected=None):
+    """
+    Per-facet counts for published jobs matching query_text under the given
+    facet selection, e.g. {'location': [{'value': 'Durban', 'count': 12}, ...]}
+    """
+    selected = normalize_selection(selected)
+    fingerprint = hashlib.sha1(json.dumps([query_text, selected], sort_keys=True).encode()).hexdigest()
+    cache_key = f'jobs:facets:{facet_version()}:{fingerprint}'
+
+    counts = cache.get(cache_key)
+    if counts is None:
+        queryset = matching_jobs(query_text) if query_text else published_jobs()
+        counts = _count_facets(queryset, selected)
+        cache.set(cache_key, counts, FACET_CACHE_TIMEOUT)
+    return counts
@@ -0,0 +1,116 @@
+"""
+Ranked full-text search over JobListing.
+
+On PostgreSQL, JobListing.search_vector holds a weighted tsvector. The
+title is weighted A, skills_requirements B, and position_summary plus
+job_description C. A BEFORE INSERT/UPDATE trigger keeps the vector
+current and a GIN index backs it; both are created in migration 0004.
+SQLite, used locally and in tests, mirrors the same three columns in the
+FTS5 table hiring_joblisting_fts, which triggers keep in sync. Results
+are ranked with bm25 using matching column weights. Any other backend
+falls back to icontains filters.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+from ..models import JobListing
+
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'hiring_joblisting_fts'
+# bm25 column weights for (title, skills, description), matching PostgreSQL's default A/B/C weights
+FTS_WEIGHTS = (1.0, 0.4, 0.2)
+
+SEARCH_TOKEN_RE = re.compile(r'\w+')
+
+
+def published_jobs():
+    return JobListing.objects.filter(status='published')
+
+
+def fts_match_expression(query_text):
+    """Quote every token so user input cannot inject FTS5 query syntax; tokens are ANDed"""
+    return ' '.join(f'"{token}"' for token in SEARCH_TOKEN_RE.findall(query_text.lower()))
+
+
+def _page(items, page, page_size):
+    start = (page - 1) * page_size
+    return items[start:start + page_size]
+
+
+def _search_postgresql(queryset, query_text, page, page_size):
+    query = SearchQuery(query_text, search_type='websearch', config=SEARCH_CONFIG)
+    matches = queryset.filter(search_vector=query).annotate(
+        search_rank=SearchRank(F('search_vector'), query)
+    ).order_by('-search_rank', '-created_at', '-id')
+    return list(_page(matches, page, page_size)), matches.count()
+
+
+def _search_sqlite(queryset, query_text, page, page_size):
+    expression = fts_match_expression(query_text)
+    if not expression:
+        return [], 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, bm25({FTS_TABLE}, %s, %s, %s) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s ORDER BY 2, rowid DESC",
+            [*FTS_WEIGHTS, expression]
+        )
+        # bm25 is lower-is-better; expose a higher-is-better rank like ts_rank
+        ranks = {job_id: -score for job_id, score in cursor.fetchall()}
+
+    allowed = set(queryset.filter(id__in=list(ranks)).values_list('id', flat=True))
+    ranked_ids = [job_id for job_id in ranks if job_id in allowed]
+    page_ids = _page(ranked_ids, page, page_size)
+    jobs = queryset.in_bulk(page_ids)
+    results = []
+    for job_id in page_ids:
+        job = jobs[job_id]
+        job.search_rank = ranks[job_id]
+        results.append(job)
+    return results, len(ranked_ids)
+
+
+def _search_fallback(queryset, query_text, page, page_size):
+    matches = matching_jobs(query_text, queryset).order_by('-created_at', '-id')
+    jobs = list(_page(matches, page, page_size))
+    for job in jobs:
+        job.search_rank = 0.0
+    return jobs, matches.count()
+
+
+def matching_jobs(query_text, queryset=None):
+    """Unranked queryset of the jobs matching query_text, for counting and aggregation"""
+    queryset = published_jobs() if queryset is None else queryset
+    if connection.vendor == 'postgresql':
+        return queryset.filter(search_vector=SearchQuery(query_text, search_type='websearch', config=SEARCH_CONFIG))
+    if connection.vendor == 'sqlite':
+        expression = fts_match_expression(query_text)
+        if not expression:
+            return queryset.none()
+        return queryset.filter(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression]))
+    condition = Q()
+    for token in SEARCH_TOKEN_RE.findall(query_text):
+        condition &= (
+            Q(title__icontains=token) | Q(skills_requirements__icontains=token) |
+            Q(position_summary__icontains=token) | Q(job_description__icontains=token)
+        )
+    return queryset.filter(condition)
+
+
+def search_jobs(query_text, page=1, page_size=20, queryset=None):
+    """
+    Jobs matching query_text, best match first (published jobs unless a
+    queryset is given). Returns (jobs on the requested page, total matches);
+    every returned job carries a search_rank attribute.
+    """
+    queryset = published_jobs() if queryset is None else queryset
+    if connection.vendor == 'postgresql':
+        return _search_postgresql(queryset, query_text, page, page_size)
+    if connection.vendor == 'sqlite':
+        return _search_sqlite(queryset, query_text, page, page_size)
+    return _search_fallback(queryset, query_text, page, page_size)
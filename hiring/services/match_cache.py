@@ -0,0 +1,116 @@
+"""
+In-process cache for preference match results.
+
+Entries are keyed by the preference (kind, id, updated_at) plus a global
+applicant-feature version. Editing a preference changes its updated_at and
+every employment/education write bumps the version through the feature
+store, so stale entries are never looked up again and simply age out of the
+LRU. The version lives in Django's cache so that every worker sees bumps
+when a shared backend is configured; MATCH_CACHE_TTL bounds staleness
+otherwise.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+FEATURE_VERSION_KEY = 'matching:applicant_feature_version'
+
+
+def applicant_feature_version():
+    """Current applicant-feature version"""
+    version = cache.get(FEATURE_VERSION_KEY)
+    if version is None:
+        cache.add(FEATURE_VERSION_KEY, 1, timeout=None)
+        version = cache.get(FEATURE_VERSION_KEY, 1)
+    return version
+
+
+def bump_applicant_feature_version():
+    """Invalidate every cached match after employment or education rows change"""
+    try:
+        return cache.incr(FEATURE_VERSION_KEY)
+    except ValueError:
+        cache.add(FEATURE_VERSION_KEY, 1, timeout=None)
+        return cache.incr(FEATURE_VERSION_KEY)
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with a per-entry TTL and hit/miss counters"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+match_cache = LRUCache(
+    maxsize=getattr(settings, 'MATCH_CACHE_SIZE', 512),
+    ttl=getattr(settings, 'MATCH_CACHE_TTL', 300),
+)
+
+
+def cached_matches(kind, preference, compute, *extra):
+    """
+    Match results for a preference, computed on a miss. `extra` distinguishes
+    variants of the same preference such as page size and cursor.
+    """
+    key = (kind, preference.id, preference.updated_at, applicant_feature_version()) + extra
+    return match_cache.get_or_compute(key, compute)
+
+
+feature_matrix_cache = LRUCache(maxsize=2, ttl=getattr(settings, 'MATCH_CACHE_TTL', 300))
+
+
+def load_feature_matrix(matrix_class):
+    """The matrix_class.load() result for the current applicant-feature version"""
+    key = (matrix_class.__name__, applicant_feature_version())
+    return feature_matrix_cache.get_or_compute(key, matrix_class.load)
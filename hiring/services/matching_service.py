@@ -0,0 +1,469 @@
+"""
+Vectorized applicant matching.
+
+The per-applicant functions in views.py (calculate_employment_matches,
+calculate_education_matches) walk the ORM once per applicant. The feature
+matrices below load the same facts for every applicant into NumPy arrays in
+one query against the precomputed ApplicantFeatures table (see
+feature_store.py) and score a whole preference against the pool in a single pass,
+producing the same scores and reasons.
+"""
+import base64
+import heapq
+import re
+from bisect import bisect_left
+
+import numpy as np
+from django.utils import timezone
+
+from ..models import ApplicantFeatures, ApplicantProfile, ApplicantTitleToken, EmploymentHistory, Education
+
+
+CONTRACT_TYPE_BITS = {
+    contract_type: 1 << index
+    for index, (contract_type, _) in enumerate(EmploymentHistory.CONTRACT_TYPE_CHOICES)
+}
+DEGREE_LEVEL_BITS = {
+    level: 1 << index
+    for index, (level, _) in enumerate(Education.DEGREE_LEVEL_CHOICES)
+}
+DEGREE_LEVEL_INDEX = {level: index for index, (level, _) in enumerate(Education.DEGREE_LEVEL_CHOICES)}
+
+TITLE_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize_title(title):
+    """Lowercase alphanumeric tokens of a job title or keyword"""
+    return TITLE_TOKEN_RE.findall((title or '').lower())
+
+
+class TitleTokenIndex:
+    """
+    Inverted index from normalized job title tokens to the records holding them.
+
+    A keyword matches a title when every token of the keyword is a prefix of
+    some token in the title ("dev" matches "Backend Developer", "team lead"
+    matches "Python Team Lead"). Lookups are sorted-vocabulary range scans and
+    set operations over posting lists, never substring scans over titles.
+    """
+
+    def __init__(self, titles):
+        postings = {}
+        for record, title in enumerate(titles):
+            for token in set(tokenize_title(title)):
+                postings.setdefault(token, set()).add(record)
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+
+    def _prefix_records(self, prefix):
+        # Tokens are [a-z0-9], so '{' sorts after every token starting with prefix
+        start = bisect_left(self.vocabulary, prefix)
+        end = bisect_left(self.vocabulary, prefix + '{', start)
+        records = set()
+        for token in self.vocabulary[start:end]:
+            records |= self.postings[token]
+        return records
+
+    def lookup(self, keyword):
+        """Records whose title matches a single keyword"""
+        tokens = tokenize_title(keyword)
+        if not tokens:
+            return set()
+        records = self._prefix_records(tokens[0])
+        for token in tokens[1:]:
+            if not records:
+                break
+            records &= self._prefix_records(token)
+        return records
+
+    def lookup_any(self, keywords):
+        """Records whose title matches at least one of the keywords"""
+        records = set()
+        for keyword in keywords or ():
+            if keyword:
+                records |= self.lookup(str(keyword))
+        return records
+
+
+class StoredTitleTokenIndex(TitleTokenIndex):
+    """
+    TitleTokenIndex over the ApplicantTitleToken postings the feature store
+    keeps in sync with employment writes, so loading a matrix builds nothing.
+    Prefix scans run against the token index in the database and map each
+    (applicant, record) posting into the matrix through record_ranges, which
+    holds the (first record, record count) of every loaded applicant id.
+    """
+
+    def __init__(self, record_ranges, profile_ids=None):
+        self.record_ranges = record_ranges
+        self.profile_ids = profile_ids
+
+    def _prefix_records(self, prefix):
+        postings = ApplicantTitleToken.objects.filter(token__startswith=prefix)
+        if self.profile_ids is not None:
+            postings = postings.filter(profile_id__in=self.profile_ids)
+        records = set()
+        for profile_id, record in postings.values_list('profile_id', 'record'):
+            first, count = self.record_ranges.get(profile_id, (0, 0))
+            if record < count:  # Postings written after this matrix was loaded
+                records.add(first + record)
+        return records
+
+
+def _group_records(profile_ids):
+    """
+    Group record owners (already sorted by profile id).
+    Returns (applicant_ids, owner index per record, first record of each group)
+    """
+    profile_ids = np.asarray(profile_ids, dtype=np.int64)
+    applicant_ids, starts, owners = np.unique(profile_ids, return_index=True, return_inverse=True)
+    return applicant_ids, owners.astype(np.int64), starts
+
+
+def _first_hit_per_owner(hits, owners):
+    """Map owner index -> first record index where hits is True"""
+    hit_idx = np.flatnonzero(hits)
+    hit_owners, first = np.unique(owners[hit_idx], return_index=True)
+    return dict(zip(hit_owners.tolist(), hit_idx[first].tolist()))
+
+
+def _ranked(applicant_ids, scores, limit=None, after=None):
+    """
+    Indices of applicants with a positive score, best first, ties by id.
+    With a limit only the best `limit` applicants ranked after the `after`
+    (score, applicant_id) position are kept, selected through a bounded heap
+    instead of sorting the whole pool.
+    """
+    matched = np.flatnonzero(scores > 0)
+    if after is not None:
+        after_score, after_id = after
+        matched_scores, matched_ids = scores[matched], applicant_ids[matched]
+        matched = matched[(matched_scores < after_score) | ((matched_scores == after_score) & (matched_ids > after_id))]
+    if limit is None:
+        order = np.lexsort((applicant_ids[matched], -scores[matched]))
+        return matched[order]
+
+    best = heapq.nsmallest(limit, zip((-scores[matched]).tolist(), applicant_ids[matched].tolist(), matched.tolist()))
+    return np.array([index for _, _, index in best], dtype=np.int64)
+
+
+def encode_match_cursor(match_score, applicant_id):
+    """Opaque cursor pointing just past a (score, applicant_id) ranking position"""
+    return base64.urlsafe_b64encode(f"{match_score}:{applicant_id}".encode()).decode()
+
+
+def decode_match_cursor(cursor):
+    """Inverse of encode_match_cursor. Raises ValueError for malformed cursors."""
+    try:
+        match_score, applicant_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        return int(match_score), int(applicant_id)
+    except (TypeError, UnicodeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def match_page(features, preference, limit, cursor=None):
+    """
+    One page of matches, best first. Returns (results, next_cursor); next_cursor
+    is None on the last page.
+    """
+    after = decode_match_cursor(cursor) if cursor else None
+    results = features.match(preference, limit=limit + 1, after=after)
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        next_cursor = encode_match_cursor(results[-1]['match_score'], results[-1]['applicant_id'])
+    return results, next_cursor
+
+
+def applicant_contacts(applicant_ids):
+    """Name and email for each applicant id in a single query"""
+    rows = ApplicantProfile.objects.filter(id__in=applicant_ids).values_list(
+        'id', 'user__first_name', 'user__last_name', 'user__username', 'user__email'
+    )
+    return {
+        applicant_id: (f"{first_name} {last_name}".strip() or username, email)
+        for applicant_id, first_name, last_name, username, email in rows
+    }
+
+
+class EmploymentFeatureMatrix:
+    """Employment features for every applicant that has employment history"""
+
+    def __init__(self, applicant_ids, contract_masks, experience_months,
+                 record_owners, record_titles, title_index=None):
+        self.applicant_ids = applicant_ids
+        self.contract_masks = contract_masks
+        self.experience_months = experience_months
+        self.record_owners = record_owners
+        self.record_titles = record_titles
+        self.title_index = title_index if title_index is not None else TitleTokenIndex(record_titles.tolist())
+
+    @classmethod
+    def load(cls, profile_ids=None):
+        queryset = ApplicantFeatures.objects.filter(employment_count__gt=0)
+        if profile_ids is not None:
+            queryset = queryset.filter(profile_id__in=profile_ids)
+        rows = list(queryset.order_by('profile_id').values_list(
+            'profile_id', 'contract_types', 'experience_months', 'open_positions', 'refreshed_on', 'job_titles'
+        ))
+        if not rows:
+            return cls.from_records([], [], [], [])
+
+        today = timezone.now().date()
+        applicant_ids, contract_masks, experience_months, record_owners, record_titles = [], [], [], [], []
+        record_ranges = {}
+        for owner, (profile_id, contract_types, months, open_positions, refreshed_on, job_titles) in enumerate(rows):
+            elapsed = max(0, (today.year - refreshed_on.year) * 12 + (today.month - refreshed_on.month))
+            applicant_ids.append(profile_id)
+            contract_masks.append(contract_types)
+            experience_months.append(months + open_positions * elapsed)
+            record_ranges[profile_id] = (len(record_titles), len(job_titles))
+            record_owners.extend([owner] * len(job_titles))
+            record_titles.extend(job_titles)
+        return cls(
+            np.array(applicant_ids, dtype=np.int64), np.array(contract_masks, dtype=np.int64),
+            np.array(experience_months, dtype=np.int64), np.array(record_owners, dtype=np.int64),
+            np.array(record_titles, dtype=str), StoredTitleTokenIndex(record_ranges, profile_ids)
+        )
+
+    @classmethod
+    def from_records(cls, profile_ids, titles, contract_bits, months):
+        """Build the matrix from per-record columns sorted by (profile_id, id)"""
+        if not len(profile_ids):
+            empty = np.zeros(0, dtype=np.int64)
+            return cls(empty, empty, empty, empty, np.array([], dtype=str))
+
+        applicant_ids, owners, starts = _group_records(profile_ids)
+        contract_masks = np.bitwise_or.reduceat(np.asarray(contract_bits, dtype=np.int64), starts)
+        experience_months = np.bincount(
+            owners, weights=np.asarray(months, dtype=np.int64), minlength=len(applicant_ids)
+        ).astype(np.int64)
+        return cls(applicant_ids, contract_masks, experience_months, owners, np.array(titles, dtype=str))
+
+    def __len__(self):
+        return len(self.applicant_ids)
+
+    def score(self, preference, limit=None, after=None):
+        """
+        Score every applicant against a BusinessEmploymentPreference.
+        Returns (ranked applicant indices, scores, per-applicant reasons);
+        limit/after select a single page of the ranking (see _ranked).
+        """
+        count = len(self)
+        scores = np.zeros(count, dtype=np.int64)
+
+        # 1. Contract type (30 points)
+        contract_bit = CONTRACT_TYPE_BITS.get(preference.preferred_contract_type, 0)
+        contract_hits = (self.contract_masks & contract_bit) != 0
+        scores += 30 * contract_hits
+
+        # 2. Job title keywords (40 points per matching job). The per-applicant
+        # loop stops once the score reaches 70, i.e. after one title when the
+        # contract type matched and after two otherwise.
+        title_hits = np.zeros(len(self.record_owners), dtype=bool)
+        title_hits[list(self.title_index.lookup_any(preference.job_title_keywords))] = True
+        hit_idx = np.flatnonzero(title_hits)
+        hit_owners = self.record_owners[hit_idx]
+        title_limit = np.where(contract_hits, 1, 2)
+        rank_in_owner = np.arange(len(hit_idx)) - np.searchsorted(hit_owners, hit_owners, side='left')
+        counted = rank_in_owner < title_limit[hit_owners]
+        hit_idx, hit_owners = hit_idx[counted], hit_owners[counted]
+        scores += 40 * np.bincount(hit_owners, minlength=count)
+
+        # 3. Total experience (30 points)
+        required_months = preference.required_experience_years * 12
+        experience_hits = self.experience_months >= required_months
+        scores += 30 * experience_hits
+
+        scores = np.minimum(scores, 100)
+        ranked = _ranked(self.applicant_ids, scores, limit, after)
+
+        titles_by_owner = {}
+        for owner, record in zip(hit_owners.tolist(), hit_idx.tolist()):
+            titles_by_owner.setdefault(owner, []).append(str(self.record_titles[record]))
+
+        contract_display = dict(EmploymentHistory.CONTRACT_TYPE_CHOICES).get(
+            preference.preferred_contract_type, preference.preferred_contract_type
+        )
+        reasons = {}
+        for index in ranked.tolist():
+            match_reasons = []
+            if contract_hits[index]:
+                match_reasons.append(f"Experience with {contract_display} work")
+            for job_title in titles_by_owner.get(index, ()):
+                match_reasons.append(f"Relevant job title: {job_title}")
+            if experience_hits[index]:
+                total_years = int(self.experience_months[index]) // 12
+                match_reasons.append(
+                    f"Meets experience requirement: {total_years}+ years "
+                    f"(needs {preference.required_experience_years}+)"
+                )
+            reasons[index] = match_reasons
+        return ranked, scores, reasons
+
+    def match(self, preference, limit=None, after=None):
+        """Same payload as views.find_matching_applicants, best match first"""
+        ranked, scores, reasons = self.score(preference, limit, after)
+        contacts = applicant_contacts(self.applicant_ids[ranked].tolist())
+        results = []
+        for index in ranked.tolist():
+            applicant_id = int(self.applicant_ids[index])
+            name, email = contacts.get(applicant_id, ('', ''))
+            results.append({
+                'applicant_id': applicant_id,
+                'applicant_name': name,
+                'email': email,
+                'match_score': int(scores[index]),
+                'match_reasons': reasons[index],
+                'total_experience_years': int(self.experience_months[index]) // 12
+            })
+        return results
+
+
+class EducationFeatureMatrix:
+    """Education features for every applicant that has education records"""
+
+    def __init__(self, applicant_ids, degree_masks, highest_levels,
+                 record_owners, record_fields, record_gpas):
+        self.applicant_ids = applicant_ids
+        self.degree_masks = degree_masks
+        self.highest_levels = highest_levels
+        self.record_owners = record_owners
+        self.record_fields = record_fields
+        self.record_fields_lower = np.char.lower(record_fields)
+        self.record_gpas = record_gpas
+
+    @classmethod
+    def load(cls, profile_ids=None):
+        queryset = ApplicantFeatures.objects.filter(education_count__gt=0)
+        if profile_ids is not None:
+            queryset = queryset.filter(profile_id__in=profile_ids)
+        rows = list(queryset.order_by('profile_id').values_list(
+            'profile_id', 'degree_levels', 'highest_degree_level', 'fields_of_study', 'grades'
+        ))
+        if not rows:
+            return cls.from_records([], [], [], [])
+
+        applicant_ids, degree_masks, highest_levels = [], [], []
+        record_owners, record_fields, record_gpas = [], [], []
+        for owner, (profile_id, degree_levels, highest_level, fields, grades) in enumerate(rows):
+            applicant_ids.append(profile_id)
+            degree_masks.append(degree_levels)
+            highest_levels.append(DEGREE_LEVEL_INDEX.get(highest_level, DEGREE_LEVEL_INDEX['other']))
+            record_owners.extend([owner] * len(fields))
+            record_fields.extend(fields)
+            # A missing or zero grade never satisfies a GPA requirement
+            record_gpas.extend(gpa if gpa else np.nan for gpa in grades)
+        return cls(
+            np.array(applicant_ids, dtype=np.int64), np.array(degree_masks, dtype=np.int64),
+            np.array(highest_levels, dtype=np.int64), np.array(record_owners, dtype=np.int64),
+            np.array(record_fields, dtype=str), np.array(record_gpas, dtype=float)
+        )
+
+    @classmethod
+    def from_records(cls, profile_ids, levels, fields, gpas):
+        """Build the matrix from per-record columns sorted by (profile_id, id)"""
+        if not len(profile_ids):
+            empty = np.zeros(0, dtype=np.int64)
+            return cls(empty, empty, empty, empty, np.array([], dtype=str), np.zeros(0))
+
+        applicant_ids, owners, starts = _group_records(profile_ids)
+        level_index = np.array([DEGREE_LEVEL_INDEX.get(level, DEGREE_LEVEL_INDEX['other']) for level in levels])
+        degree_masks = np.bitwise_or.reduceat(np.left_shift(1, level_index).astype(np.int64), starts)
+
+        # Highest degree: first record holding the best rank, like max()
+        ranks = np.array([Education.DEGREE_LEVEL_RANKS.get(level, 0) for level in levels])
+        best_rank = np.maximum.reduceat(ranks, starts)
+        is_best = np.flatnonzero(ranks == best_rank[owners])
+        _, first_best = np.unique(owners[is_best], return_index=True)
+        highest_levels = level_index[is_best[first_best]]
+
+        # A missing or zero grade never satisfies a GPA requirement
+        record_gpas = np.array([gpa if gpa else np.nan for gpa in gpas], dtype=float)
+        return cls(applicant_ids, degree_masks, highest_levels, owners,
+                   np.array(fields, dtype=str), record_gpas)
+
+    def __len__(self):
+        return len(self.applicant_ids)
+
+    def highest_degree_display(self, index):
+        level = Education.DEGREE_LEVEL_CHOICES[int(self.highest_levels[index])]
+        return level[1]
+
+    def score(self, preference, limit=None, after=None):
+        """
+        Score every applicant against an education BusinessPreference.
+        Returns (ranked applicant indices, scores, per-applicant reasons);
+        limit/after select a single page of the ranking (see _ranked).
+        """
+        count = len(self)
+        scores = np.zeros(count, dtype=np.int64)
+        criteria = preference.criteria or {}
+        degree_display = dict(Education.DEGREE_LEVEL_CHOICES)
+
+        # 1. Degree level (40 points)
+        required_degree = criteria.get('degree_level')
+        degree_hits = np.zeros(count, dtype=bool)
+        if required_degree:
+            degree_hits = (self.degree_masks & DEGREE_LEVEL_BITS.get(required_degree, 0)) != 0
+            scores += 40 * degree_hits
+
+        # 2. Field of study (30 points, first matching record)
+        required_field = criteria.get('field_of_study')
+        field_hits = {}
+        if required_field:
+            hits = np.char.find(self.record_fields_lower, required_field.lower()) >= 0
+            hits &= self.record_fields_lower != ''
+            field_hits = _first_hit_per_owner(hits, self.record_owners)
+            scores[list(field_hits)] += 30
+
+        # 3. GPA (20 points, first record meeting the minimum)
+        min_gpa = criteria.get('minimum_gpa')
+        gpa_hits = {}
+        if min_gpa:
+            with np.errstate(invalid='ignore'):
+                hits = self.record_gpas >= float(min_gpa)
+            gpa_hits = _first_hit_per_owner(hits, self.record_owners)
+            scores[list(gpa_hits)] += 20
+
+        # 4. Certifications (10 points for everyone until certifications are modelled)
+        required_certs = criteria.get('required_certifications', [])
+        certs_reason = None
+        if required_certs and isinstance(required_certs, list):
+            scores += 10
+            certs_reason = f"Looking for certifications: {', '.join(required_certs[:2])}"
+
+        scores = np.minimum(scores, 100)
+        ranked = _ranked(self.applicant_ids, scores, limit, after)
+
+        reasons = {}
+        for index in ranked.tolist():
+            match_reasons = []
+            if degree_hits[index]:
+                match_reasons.append(f"Has {degree_display.get(required_degree, required_degree)} degree")
+            if index in field_hits:
+                match_reasons.append(f"Studied {self.record_fields[field_hits[index]]}")
+            if index in gpa_hits:
+                match_reasons.append(f"Meets GPA requirement: {float(self.record_gpas[gpa_hits[index]])}")
+            if certs_reason:
+                match_reasons.append(certs_reason)
+            reasons[index] = match_reasons
+        return ranked, scores, reasons
+
+    def match(self, preference, limit=None, after=None):
+        """Same payload as views.find_education_matching_applicants, best match first"""
+        ranked, scores, reasons = self.score(preference, limit, after)
+        contacts = applicant_contacts(self.applicant_ids[ranked].tolist())
+        results = []
+        for index in ranked.tolist():
+            applicant_id = int(self.applicant_ids[index])
+            name, email = contacts.get(applicant_id, ('', ''))
+            results.append({
+                'applicant_id': applicant_id,
+                'applicant_name': name,
+                'email': email,
+                'match_score': int(scores[index]),
+                'match_reasons': reasons[index],
+                'highest_degree': self.highest_degree_display(index)
+            })
+        return results
@@ -0,0 +1,48 @@
+"""
+Paged message history for a conversation.
+
+history_page() reads backwards from the newest message. It is
+keyset-paginated on (created_at, id), so opening a long chat costs one
+page however many messages the chat holds. messages_since() returns only
+the messages after one the client already has. It starts a forward
+keyset scan at that message's key, which lets a reconnecting client catch
+up without reloading anything. A catch-up longer than one page continues
+with the page's next_cursor, passed back together with since. Both queries are served by the
+(conversation, -created_at) message index.
+"""
+from ..models import Message
+from ..pagination import encode_cursor, paginate
+
+
+HISTORY_ORDERING = ('-created_at', '-id')
+SINCE_ORDERING = ('created_at', 'id')
+
+
+def conversation_messages(conversation):
+    """conversation's messages with everything MessageSerializer reads"""
+    return Message.objects.filter(conversation=conversation).select_related(
+        'sender', 'parent_message__sender', 'original_sender'
+    )
+
+
+def history_page(conversation, page_size, cursor=None):
+    """
+    A CursorPage of conversation's messages, newest page first; items run
+    oldest to newest within the page. Raises InvalidCursor for a bad cursor.
+    """
+    result = paginate(conversation_messages(conversation), HISTORY_ORDERING, page_size, cursor=cursor)
+    result.items.reverse()
+    return result
+
+
+def messages_since(conversation, message_id, page_size, cursor=None):
+    """
+    A CursorPage of up to page_size messages after message_id, oldest first;
+    cursor, a next_cursor from an earlier since page, continues from there.
+    Raises Message.DoesNotExist if message_id is not in the conversation and
+    InvalidCursor for a bad cursor.
+    """
+    if cursor is None:
+        seen = Message.objects.filter(conversation=conversation).values('created_at', 'id').get(id=message_id)
+        cursor = encode_cursor(SINCE_ORDERING, [seen['created_at'], seen['id']])
+    return paginate(conversation_messages(conversation), SINCE_ORDERING, page_size, cursor=cursor)
@@ -0,0 +1,82 @@
+"""
+Stored popularity score behind the "popular" feed sort.
+
+Post.popularity_score is a Hacker News style hot score:
+
+    (likes + 2 * comments + 0.1 * views + 3 * shares) / (age_hours + 2) ** gravity
+
+with gravity from POST_POPULARITY_GRAVITY (default 1.8). Setting gravity to
+0 gives the undecayed engagement total the feed used to compute per request.
+The score is stored and indexed, so the popular sort is an index scan with a
+LIMIT.
+
+engagement_counters sets the score from popularity_expression() in the
+same UPDATE whenever a post's likes, comments or shares change, and the
+view buffer calls refresh_popularity() after flushing views. Time decay is applied by
+recompute_popularity(), which the recompute_popularity management command
+runs on a schedule (e.g. every 15 minutes from cron).
+"""
+from django.conf import settings
+from django.db.models import ExpressionWrapper, F, FloatField, Value
+from django.utils import timezone
+
+from ..models import Post
+
+
+ENGAGEMENT_WEIGHTS = {'likes_count': 1, 'comment_count': 2, 'views': 0.1, 'shares': 3}
+SCORE_FIELDS = tuple(ENGAGEMENT_WEIGHTS) + ('created_at',)
+
+
+def gravity():
+    return getattr(settings, 'POST_POPULARITY_GRAVITY', 1.8)
+
+
+def decay(created_at, now=None):
+    """Divisor of the engagement of a post created at created_at, at `now`"""
+    now = now or timezone.now()
+    age_hours = max((now - created_at).total_seconds() / 3600, 0)
+    return (age_hours + 2) ** gravity()
+
+
+def popularity_score(post, now=None):
+    """Hot score for a post, from its counters and age at `now`"""
+    engagement = sum(getattr(post, field) * weight for field, weight in ENGAGEMENT_WEIGHTS.items())
+    return engagement / decay(post.created_at, now)
+
+
+def popularity_expression(created_at, deltas=None, now=None):
+    """
+    The score as an expression over the post's counters, each offset by its
+    entry in deltas, for the UPDATE that applies those deltas
+    """
+    deltas = deltas or {}
+    engagement = sum(
+        (Value(float(weight)) * (F(field) + deltas.get(field, 0)) for field, weight in ENGAGEMENT_WEIGHTS.items()),
+        Value(0.0)
+    )
+    return ExpressionWrapper(engagement / Value(decay(created_at, now)), output_field=FloatField())
+
+
+def refresh_popularity(post_ids):
+    """Recompute the stored score of the given posts"""
+    now = timezone.now()
+    posts = list(Post.objects.filter(pk__in=post_ids).only('pk', *SCORE_FIELDS))
+    for post in posts:
+        post.popularity_score = popularity_score(post, now)
+    Post.objects.bulk_update(posts, ['popularity_score'])
+
+
+def recompute_popularity(batch_size=1000):
+    """Re-apply time decay to every post. Returns the number of posts updated."""
+    now = timezone.now()
+    count = 0
+    batch = []
+    for post in Post.objects.only('pk', *SCORE_FIELDS).iterator(chunk_size=batch_size):
+        post.popularity_score = popularity_score(post, now)
+        batch.append(post)
+        if len(batch) >= batch_size:
+            Post.objects.bulk_update(batch, ['popularity_score'])
+            count += len(batch)
+            batch = []
+    Post.objects.bulk_update(batch, ['popularity_score'])
+    return count + len(batch)
@@ -0,0 +1,40 @@
+"""
+Post querysets annotated with everything PostSerializer reads.
+
+Like, dislike and comment totals are denormalized columns on Post (see
+services.engagement_counters). The remaining per-viewer values are the
+viewer's reactions and rating, and with_engagement() computes them as
+correlated subqueries in the same SELECT. The subqueries use no joins or
+GROUP BY, so they combine safely with other annotations and with keyset
+pagination. feed_posts() also pulls author and company through
+select_related and prefetches tags (services.post_tags), which keeps a
+page at a fixed number of queries whatever its size.
+"""
+from django.db.models import Exists, IntegerField, OuterRef, Subquery, Value
+
+from ..models import Post, Rating
+from .post_tags import with_tags
+
+
+def with_engagement(queryset, user=None):
+    """Annotate posts with viewer_liked, viewer_disliked and viewer_rating for user"""
+    if user is None or not user.is_authenticated:
+        return queryset.annotate(
+            viewer_liked=Value(False),
+            viewer_disliked=Value(False),
+            viewer_rating=Value(None, output_field=IntegerField()),
+        )
+    return queryset.annotate(
+        viewer_liked=Exists(Post.likes.through.objects.filter(post_id=OuterRef('pk'), customuser_id=user.pk)),
+        viewer_disliked=Exists(Post.dislikes.through.objects.filter(post_id=OuterRef('pk'), customuser_id=user.pk)),
+        viewer_rating=Subquery(
+            Rating.objects.filter(post_id=OuterRef('pk'), user_id=user.pk).values('rating')[:1],
+            output_field=IntegerField()
+        ),
+    )
+
+
+def feed_posts(user=None, queryset=None):
+    """Posts (all of them unless a queryset is given) ready for PostSerializer(many=True)"""
+    queryset = Post.objects.all() if queryset is None else queryset
+    return with_engagement(with_tags(queryset.select_related('author', 'company')), user)
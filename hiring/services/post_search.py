@@ -0,0 +1,105 @@
+"""
+Ranked feed search over Post title, tags, content and author name.
+
+On PostgreSQL, Post.search_vector holds a weighted tsvector: title A,
+tags B, content C. A trigger keeps it current and a GIN index backs it
+(migration 0008). SQLite mirrors the same columns in the FTS5 table
+hiring_post_fts and ranks with bm25. Any other backend falls back to
+icontains filters.
+
+Author names are matched separately with icontains, which trigram GIN
+indexes on the upper-cased username, first_name and last_name serve on
+PostgreSQL. Only tokens of at least three characters take part, because
+shorter patterns cannot use a trigram index. The matching author ids are
+read first, at most FEED_SEARCH_MAX_AUTHORS of them. The post query then
+ORs the text match with author_id IN (...), and the planner can answer
+that from the two indexes. Posts matched only by author rank below every
+text match.
+"""
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Func, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Coalesce
+
+from ..models import CustomUser
+from .job_search import SEARCH_TOKEN_RE, fts_match_expression
+
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'hiring_post_fts'
+# bm25 column weights for (title, tags, content), matching PostgreSQL's default A/B/C weights
+FTS_WEIGHTS = (1.0, 0.4, 0.2)
+RELEVANCE_ORDERING = ('-search_rank', '-created_at', '-id')
+MIN_AUTHOR_TOKEN_LENGTH = 3
+MAX_AUTHORS = getattr(settings, 'FEED_SEARCH_MAX_AUTHORS', 200)
+
+
+def matching_author_ids(query_text, limit=MAX_AUTHORS):
+    """Ids of users whose username, first or last name contains every token of query_text"""
+    tokens = [token for token in SEARCH_TOKEN_RE.findall(query_text) if len(token) >= MIN_AUTHOR_TOKEN_LENGTH]
+    if not tokens:
+        return []
+    condition = Q()
+    for token in tokens:
+        condition &= Q(username__icontains=token) | Q(first_name__icontains=token) | Q(last_name__icontains=token)
+    return list(CustomUser.objects.filter(condition).values_list('id', flat=True)[:limit])
+
+
+class FtsRank(Func):
+    """
+    bm25 rank of each post's FTS row for an FTS5 match expression. bm25 is
+    lower-is-better, so it is negated into a higher-is-better rank like
+    ts_rank. The row is looked up by the compiled pk column, which carries
+    whatever alias the enclosing query gives the post table.
+    """
+    output_field = FloatField()
+
+    def __init__(self, match_expression):
+        super().__init__(F('pk'))
+        self.match_expression = match_expression
+
+    def as_sql(self, compiler, connection, **extra_context):
+        pk_sql, pk_params = compiler.compile(self.get_source_expressions()[0])
+        sql = (
+            f"(SELECT -bm25({FTS_TABLE}, %s, %s, %s) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {pk_sql})"
+        )
+        return sql, (*FTS_WEIGHTS, self.match_expression, *pk_params)
+
+
+def _text_match_sqlite(query_text):
+    expression = fts_match_expression(query_text)
+    if not expression:
+        return Q(pk__in=[]), Value(0.0)
+    match = Q(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression]))
+    return match, FtsRank(expression)
+
+
+def _text_match_fallback(query_text):
+    condition = Q()
+    for token in SEARCH_TOKEN_RE.findall(query_text):
+        condition &= Q(title__icontains=token) | Q(tags__icontains=token) | Q(content__icontains=token)
+    return condition, Value(0.0)
+
+
+def search_posts(queryset, query_text):
+    """
+    queryset narrowed to the posts matching query_text, annotated with
+    search_rank (higher is better). Order by RELEVANCE_ORDERING for best
+    match first.
+    """
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(query_text, search_type='websearch', config=SEARCH_CONFIG)
+        # double precision so the rank round-trips exactly through pagination cursors
+        match, rank = Q(search_vector=query), Cast(SearchRank(F('search_vector'), query), FloatField())
+    elif connection.vendor == 'sqlite':
+        match, rank = _text_match_sqlite(query_text)
+    else:
+        match, rank = _text_match_fallback(query_text)
+
+    author_ids = matching_author_ids(query_text)
+    if author_ids:
+        match |= Q(author_id__in=author_ids)
+    return queryset.filter(match).annotate(search_rank=Coalesce(rank, Value(0.0), output_field=FloatField()))
@@ -0,0 +1,167 @@
+"""
+Normalized post tags.
+
+Post.tags remains the comma-separated string that clients send and read.
+After each post write, sync_post_tags() mirrors it into Tag and PostTag
+rows. A tag-filtered feed then becomes an indexed lookup on PostTag
+(tag, post) rather than an icontains scan, which also matched "java"
+inside "javascript". Tags are matched case-insensitively through
+Tag.slug. The first spelling of a tag becomes its display name.
+
+Tag.post_count and the daily TagUsage rows count public, published posts
+only. They are adjusted with F() expressions whenever a link starts or
+stops counting: the post is tagged, untagged, published, hidden or
+deleted. Deletes are caught by a pre_delete signal, so cascades from a
+deleted author count too. trending_tags() therefore sums a few days of small rows instead
+of scanning posts. rebuild_tag_counts() recomputes both from the links
+and backs the rebuild_tag_counts management command.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Prefetch, Q, Sum
+from django.utils import timezone
+
+from ..models import PostTag, Tag, TagUsage
+from .engagement_counters import aggregate_subquery
+
+
+MAX_TAG_LENGTH = 100
+TRENDING_DAYS = getattr(settings, 'TRENDING_TAG_DAYS', 7)
+
+
+def _clean(name):
+    return ' '.join(name.strip().lstrip('#').split())[:MAX_TAG_LENGTH]
+
+
+def tag_slug(name):
+    return _clean(name).casefold()[:MAX_TAG_LENGTH]
+
+
+def parse_tags(tags):
+    """{slug: name} for a comma-separated tags string, in order, first spelling wins"""
+    parsed = {}
+    for raw in (tags or '').split(','):
+        name = _clean(raw)
+        slug = tag_slug(name)
+        if slug and slug not in parsed:
+            parsed[slug] = name
+    return parsed
+
+
+def is_counted(post):
+    return post.is_published and post.visibility == 'public'
+
+
+def _ensure_tags(parsed):
+    """{slug: Tag} for the parsed tags, creating missing ones"""
+    if not parsed:
+        return {}
+    Tag.objects.bulk_create([Tag(name=name, slug=slug) for slug, name in parsed.items()], ignore_conflicts=True)
+    return {tag.slug: tag for tag in Tag.objects.filter(slug__in=list(parsed))}
+
+
+def _apply_counts(changes):
+    """Add {(tag_id, day): delta} to Tag.post_count and the TagUsage rows, one UPDATE per (day, delta)"""
+    changes = {key: delta for key, delta in changes.items() if delta}
+    if not changes:
+        return
+    TagUsage.objects.bulk_create([TagUsage(tag_id=tag_id, day=day) for tag_id, day in changes], ignore_conflicts=True)
+    usage, totals = defaultdict(list), defaultdict(int)
+    for (tag_id, day), delta in changes.items():
+        usage[day, delta].append(tag_id)
+        totals[tag_id] += delta
+    for (day, delta), tag_ids in usage.items():
+        TagUsage.objects.filter(day=day, tag_id__in=tag_ids).update(post_count=F('post_count') + delta)
+    by_delta = defaultdict(list)
+    for tag_id, delta in totals.items():
+        if delta:
+            by_delta[delta].append(tag_id)
+    for delta, tag_ids in by_delta.items():
+        Tag.objects.filter(pk__in=tag_ids).update(post_count=F('post_count') + delta)
+
+
+def sync_post_tags(post):
+    """Mirror post.tags into PostTag links and adjust the tag counters"""
+    parsed = parse_tags(post.tags)
+    counted = is_counted(post)
+    today = timezone.localdate()
+    changes = defaultdict(int)
+    with transaction.atomic():
+        links = {link.tag.slug: link for link in post.post_tags.select_related('tag')}
+        removed = [link for slug, link in links.items() if slug not in parsed]
+        for link in removed:
+            if link.counted_on:
+                changes[link.tag_id, link.counted_on] -= 1
+        PostTag.objects.filter(pk__in=[link.pk for link in removed]).delete()
+
+        tags = _ensure_tags({slug: name for slug, name in parsed.items() if slug not in links})
+        created, updated = [], []
+        for position, slug in enumerate(parsed):
+            link = links.get(slug)
+            if link is None:
+                link = PostTag(post=post, tag=tags[slug], position=position)
+                created.append(link)
+            elif link.position != position or bool(link.counted_on) != counted:
+                link.position = position
+                updated.append(link)
+            if counted and link.counted_on is None:
+                link.counted_on = today
+                changes[link.tag_id, today] += 1
+            elif not counted and link.counted_on is not None:
+                changes[link.tag_id, link.counted_on] -= 1
+                link.counted_on = None
+        PostTag.objects.bulk_create(created)
+        PostTag.objects.bulk_update(updated, ['position', 'counted_on'])
+        _apply_counts(changes)
+
+
+def release_post_tags(post):
+    """Uncount post's tags. Runs from Post's pre_delete signal (hiring.signals), inside the deleting transaction."""
+    changes = defaultdict(int)
+    for tag_id, day in post.post_tags.filter(counted_on__isnull=False).values_list('tag_id', 'counted_on'):
+        changes[tag_id, day] -= 1
+    _apply_counts(changes)
+
+
+def tagged(queryset, name):
+    """queryset narrowed to posts tagged name (case-insensitive)"""
+    return queryset.filter(id__in=PostTag.objects.filter(tag__slug=tag_slug(name)).values('post_id'))
+
+
+def with_tags(queryset):
+    """Prefetch every post's tags in one query, for Post.get_tags_list()"""
+    return queryset.prefetch_related(Prefetch('post_tags', queryset=PostTag.objects.select_related('tag')))
+
+
+def trending_tags(days=TRENDING_DAYS, limit=10):
+    """Tags with the most public posts over the last `days` days, annotated with recent_posts"""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return list(
+        Tag.objects.filter(usage__day__gte=since)
+        .annotate(recent_posts=Sum('usage__post_count'))
+        .filter(recent_posts__gt=0)
+        .order_by('-recent_posts', 'slug')[:limit]
+    )
+
+
+def rebuild_tag_counts():
+    """
+    Recompute link counting state, Tag.post_count and TagUsage from the
+    PostTag rows. Returns the number of tags.
+    """
+    public = Q(post__is_published=True, post__visibility='public')
+    with transaction.atomic():
+        PostTag.objects.filter(public, counted_on__isnull=True).update(counted_on=timezone.localdate())
+        PostTag.objects.filter(~public, counted_on__isnull=False).update(counted_on=None)
+        TagUsage.objects.all().delete()
+        TagUsage.objects.bulk_create([
+            TagUsage(tag_id=row['tag_id'], day=row['counted_on'], post_count=row['total'])
+            for row in PostTag.objects.filter(counted_on__isnull=False).order_by()
+            .values('tag_id', 'counted_on').annotate(total=Count('*'))
+        ])
+        return Tag.objects.update(post_count=aggregate_subquery(
+            PostTag.objects.filter(tag_id=OuterRef('pk'), counted_on__isnull=False), 'tag_id'
+        ))
@@ -0,0 +1,166 @@
+"""
+Online presence and typing state, kept in the cache instead of UserStatus rows.
+
+A heartbeat stores the user's last-seen timestamp under a key that
+expires after PRESENCE_TTL seconds. A user is online while that key
+exists, so a client that stops sending heartbeats drops offline without
+any write. online_user_ids() checks many users with one get_many. Typing
+state is a separate key that expires after TYPING_TTL seconds.
+
+UserStatus.last_seen and is_online are still written, but lazily.
+Heartbeats are collected in a per-process buffer. Every
+PRESENCE_FLUSH_INTERVAL seconds the buffer becomes one bulk insert for
+the missing rows plus one UPDATE for all of them. Writes to the
+database therefore scale with the flush rate, not the heartbeat rate.
+Each flush also sets is_online False on rows whose presence key has
+expired, so a client that simply stops sending heartbeats does not
+stay online in UserStatus. Server processes flush on a timer and at
+exit (services.buffer_flusher). Only last-seen times buffered since the
+last flush are lost if the process dies.
+
+Presence is only shared between processes when the cache is: set
+REDIS_URL in production.
+
+Settings:
+- PRESENCE_TTL: seconds a heartbeat keeps a user online (default 60)
+- TYPING_TTL: seconds a typing signal lasts (default 8)
+- PRESENCE_FLUSH_INTERVAL: seconds between last_seen flushes (default 60)
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BooleanField, Case, DateTimeField, Value, When
+from django.utils import timezone
+
+from ..models import UserStatus
+
+logger = logging.getLogger(__name__)
+
+
+PRESENCE_TTL = getattr(settings, 'PRESENCE_TTL', 60)
+TYPING_TTL = getattr(settings, 'TYPING_TTL', 8)
+
+
+def _online_key(user_id):
+    return f'presence:online:{user_id}'
+
+
+def _typing_key(user_id):
+    return f'presence:typing:{user_id}'
+
+
+class LastSeenBuffer:
+    """Per-process buffer of last-seen times, flushed to UserStatus in batches"""
+
+    def __init__(self, flush_interval=60):
+        self.flush_interval = flush_interval
+        self._pending = {}  # user_id -> (last_seen, is_online)
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, user_id, last_seen, is_online):
+        with self._lock:
+            self._pending[user_id] = (last_seen, is_online)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def pending(self, user_id):
+        with self._lock:
+            return self._pending.get(user_id)
+
+    def flush(self):
+        """Write buffered last-seen times to UserStatus. Returns the number of users written."""
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            self._last_flush = time.monotonic()
+        written = 0
+        try:
+            if pending:
+                written = self._write(pending)
+            mark_expired_offline()
+        except Exception as e:
+            logger.error(f"Failed to flush last-seen times for {len(pending)} users: {e}", exc_info=True)
+        return written
+
+    def _write(self, pending):
+        user_ids = list(pending)
+        with transaction.atomic():
+            # Missing rows first; the UPDATE then sets the real times, which auto_now would overwrite on insert
+            UserStatus.objects.bulk_create([UserStatus(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+            UserStatus.objects.filter(user_id__in=user_ids).update(
+                last_seen=Case(
+                    *(When(user_id=user_id, then=Value(seen)) for user_id, (seen, _) in pending.items()),
+                    output_field=DateTimeField()
+                ),
+                is_online=Case(
+                    *(When(user_id=user_id, then=Value(online)) for user_id, (_, online) in pending.items()),
+                    output_field=BooleanField()
+                ),
+            )
+        return len(pending)
+
+
+last_seen_buffer = LastSeenBuffer(flush_interval=getattr(settings, 'PRESENCE_FLUSH_INTERVAL', 60))
+
+
+def heartbeat(user):
+    """Mark user online for the next PRESENCE_TTL seconds"""
+    now = timezone.now()
+    cache.set(_online_key(user.pk), now.timestamp(), PRESENCE_TTL)
+    last_seen_buffer.record(user.pk, now, True)
+
+
+def go_offline(user):
+    now = timezone.now()
+    cache.delete_many([_online_key(user.pk), _typing_key(user.pk)])
+    last_seen_buffer.record(user.pk, now, False)
+
+
+def online_user_ids(user_ids):
+    """The subset of user_ids currently online, from one cache lookup"""
+    user_ids = list(user_ids)
+    found = cache.get_many([_online_key(user_id) for user_id in user_ids])
+    return {user_id for user_id in user_ids if _online_key(user_id) in found}
+
+
+def mark_expired_offline():
+    """Set is_online False on UserStatus rows whose presence key has expired. Returns the number updated."""
+    marked_online = list(UserStatus.objects.filter(is_online=True).values_list('user_id', flat=True))
+    expired = set(marked_online) - online_user_ids(marked_online)
+    if not expired:
+        return 0
+    return UserStatus.objects.filter(user_id__in=expired, is_online=True).update(is_online=False)
+
+
+def is_online(user_id):
+    return cache.get(_online_key(user_id)) is not None
+
+
+def set_typing(user, conversation_id, is_typing):
+    if is_typing:
+        cache.set(_typing_key(user.pk), str(conversation_id), TYPING_TTL)
+    else:
+        cache.delete(_typing_key(user.pk))
+
+
+def typing_conversation(user_id):
+    """Id of the conversation user_id is typing in, or None"""
+    return cache.get(_typing_key(user_id))
+
+
+def last_seen(user_id):
+    """Most recent last-seen time known to this process: live key, unflushed buffer, then UserStatus"""
+    timestamp = cache.get(_online_key(user_id))
+    if timestamp is not None:
+        return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+    pending = last_seen_buffer.pending(user_id)
+    if pending is not None:
+        return pending[0]
+    return UserStatus.objects.filter(user_id=user_id).values_list('last_seen', flat=True).first()
@@ -0,0 +1,79 @@
+"""
+Conversation events pushed over WebSockets.
+
+Each conversation has a channel-layer group, and every socket open on
+the conversation (hiring.consumers.ConversationConsumer) joins it. Each
+socket also joins its user's group, which carries per-user events such
+as the unread badge. The
+REST views publish to the group after their transaction commits. Events
+reach every node that shares the channel layer: Redis when REDIS_URL is
+set, otherwise the in-process memory layer.
+
+Events, as sent to clients:
+- {"type": "message.new", "message": {...MessageSerializer...}}
+- {"type": "message.read", "user_id": ..., "read_at": ...}
+- {"type": "typing", "user_id": ..., "is_typing": ...}
+- {"type": "unread", "total": ...}, sent to the user's group only
+
+Publishing is best effort. A channel layer failure is logged, and the
+request that caused the event still succeeds.
+"""
+import json
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from ..serializers import MessageSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def conversation_group(conversation_id):
+    return f'conversation.{conversation_id}'
+
+
+def user_group(user_id):
+    return f'user.{user_id}'
+
+
+def _publish_to_group(group, event):
+    def send():
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        try:
+            async_to_sync(channel_layer.group_send)(group, {'type': 'conversation.event', 'event': event})
+        except Exception as e:
+            logger.error(f"Failed to publish {event['type']} to {group}: {e}", exc_info=True)
+    transaction.on_commit(send)
+
+
+def publish(conversation_id, event):
+    """Send event to the conversation's sockets once the current transaction commits"""
+    _publish_to_group(conversation_group(conversation_id), event)
+
+
+def publish_to_user(user_id, event):
+    """Send event to every socket user_id has open, once the current transaction commits"""
+    _publish_to_group(user_group(user_id), event)
+
+
+def publish_message(message, request=None):
+    """Push a newly created message to the conversation"""
+    # Round-trip through JSON so UUIDs and datetimes survive any channel layer's encoding
+    data = json.loads(JSONRenderer().render(MessageSerializer(message, context={'request': request}).data))
+    publish(message.conversation_id, {'type': 'message.new', 'message': data})
+
+
+def publish_read(conversation_id, user, read_at=None):
+    """Tell the conversation that user has read everything sent to them"""
+    read_at = read_at or timezone.now()
+    publish(conversation_id, {'type': 'message.read', 'user_id': user.pk, 'read_at': read_at.isoformat()})
+
+
+def publish_typing(conversation_id, user, is_typing):
+    publish(conversation_id, {'type': 'typing', 'user_id': user.pk, 'is_typing': bool(is_typing)})
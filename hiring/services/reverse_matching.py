@@ -0,0 +1,224 @@
+"""
+Reverse matching: the business preferences that match each applicant.
+
+ApplicantPreferenceMatch stores each applicant's best employment and best
+education matches against the active preferences, at most
+APPLICANT_MATCH_LIMIT (default 50) of each, so applicant dashboards read
+stored rows instead of scoring every preference per request.
+
+Rescoring is too expensive for the write path: an applicant is scored
+against every active preference, a preference against every applicant.
+Writes therefore only queue the work on commit:
+
+- queue_applicant_refresh() after an applicant's features change
+  (called by feature_store.refresh_applicant_features)
+- queue_preference_refresh() after a preference is created or edited;
+  deleted preferences take their rows with them through the FK cascade
+
+The per-process match_refresh_queue is drained every
+MATCH_REFRESH_INTERVAL seconds (default 5) by services.buffer_flusher, on
+its background thread and once more at exit. Stored matches therefore
+trail writes by a few seconds. Processes without a flusher, such as
+management commands and shells, drain the queue with
+match_refresh_queue.flush(). Refreshes still queued when a process dies
+are lost. rebuild_applicant_matches() recomputes everything synchronously
+and backs the rebuild_applicant_matches management command, which repairs
+that.
+"""
+import heapq
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Subquery, Window
+from django.db.models.functions import RowNumber
+
+from ..models import ApplicantPreferenceMatch, BusinessEmploymentPreference, BusinessPreference
+from .match_cache import load_feature_matrix
+from .matching_service import EmploymentFeatureMatrix, EducationFeatureMatrix
+
+logger = logging.getLogger(__name__)
+
+MATCH_LIMIT = getattr(settings, 'APPLICANT_MATCH_LIMIT', 50)
+
+
+def active_employment_preferences():
+    return BusinessEmploymentPreference.objects.filter(is_active=True)
+
+
+def active_education_preferences():
+    return BusinessPreference.objects.filter(preference_type='education', is_active=True)
+
+
+def _employment_rows(features, preferences):
+    for preference in preferences:
+        ranked, scores, reasons = features.score(preference)
+        for index in ranked.tolist():
+            yield ApplicantPreferenceMatch(
+                profile_id=int(features.applicant_ids[index]),
+                employment_preference=preference,
+                match_score=int(scores[index]),
+                match_reasons=reasons[index],
+                total_experience_years=int(features.experience_months[index]) // 12
+            )
+
+
+def _education_rows(features, preferences):
+    for preference in preferences:
+        ranked, scores, reasons = features.score(preference)
+        for index in ranked.tolist():
+            yield ApplicantPreferenceMatch(
+                profile_id=int(features.applicant_ids[index]),
+                education_preference=preference,
+                match_score=int(scores[index]),
+                match_reasons=reasons[index]
+            )
+
+
+def _best_per_applicant(rows, preference_field):
+    """
+    The MATCH_LIMIT best rows of each applicant, ties going to the lower
+    preference id like the dashboard ordering. Keeps a bounded heap per
+    applicant, so rows can stream from every preference.
+    """
+    best = defaultdict(list)
+    for row in rows:
+        key = (row.match_score, -getattr(row, preference_field))
+        heap = best[row.profile_id]
+        if len(heap) < MATCH_LIMIT:
+            heapq.heappush(heap, (key, row))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, row))
+    return [row for heap in best.values() for _, row in sorted(heap, key=lambda entry: entry[0], reverse=True)]
+
+
+def refresh_applicant_matches(profile_ids):
+    """Rescore the given applicants against every active preference"""
+    employment = EmploymentFeatureMatrix.load(profile_ids=profile_ids)
+    education = EducationFeatureMatrix.load(profile_ids=profile_ids)
+    rows = []
+    if len(employment):
+        rows.extend(_best_per_applicant(
+            _employment_rows(employment, active_employment_preferences()), 'employment_preference_id'
+        ))
+    if len(education):
+        rows.extend(_best_per_applicant(
+            _education_rows(education, active_education_preferences()), 'education_preference_id'
+        ))
+
+    with transaction.atomic():
+        ApplicantPreferenceMatch.objects.filter(profile_id__in=profile_ids).delete()
+        ApplicantPreferenceMatch.objects.bulk_create(rows)
+    return len(rows)
+
+
+def refresh_preference_matches(preference):
+    """Rescore every applicant against one employment or education preference"""
+    if isinstance(preference, BusinessEmploymentPreference):
+        field = 'employment_preference'
+        rows = list(_employment_rows(load_feature_matrix(EmploymentFeatureMatrix), [preference])) if preference.is_active else []
+    else:
+        field = 'education_preference'
+        is_matched = preference.is_active and preference.preference_type == 'education'
+        rows = list(_education_rows(load_feature_matrix(EducationFeatureMatrix), [preference])) if is_matched else []
+    same_kind = ApplicantPreferenceMatch.objects.filter(**{f'{field}__isnull': False})
+    matched = ApplicantPreferenceMatch.objects.filter(**{field: preference}).values('profile_id')
+
+    with transaction.atomic():
+        # Applicants at the limit had matches trimmed that this preference's
+        # old row may have been keeping out; they are rescored in full below
+        capped = list(
+            same_kind.filter(profile_id__in=Subquery(matched)).order_by().values('profile_id')
+            .annotate(matches=Count('id')).filter(matches__gte=MATCH_LIMIT).values_list('profile_id', flat=True)
+        )
+        ApplicantPreferenceMatch.objects.filter(**{field: preference}).delete()
+        ApplicantPreferenceMatch.objects.bulk_create(rows)
+
+        # Drop what the new rows pushed past each applicant's limit
+        ranked = same_kind.filter(profile_id__in=Subquery(matched)).annotate(rank=Window(
+            RowNumber(), partition_by=F('profile_id'), order_by=(F('match_score').desc(), F(f'{field}_id').asc())
+        ))
+        overflow = list(ranked.filter(rank__gt=MATCH_LIMIT).values_list('id', flat=True))
+        ApplicantPreferenceMatch.objects.filter(id__in=overflow).delete()
+        if capped:
+            refresh_applicant_matches(capped)
+    return len(rows) - len(overflow)
+
+
+def rebuild_applicant_matches(batch_size=1000):
+    """Recompute every stored match. Returns the number of rows written."""
+    employment = EmploymentFeatureMatrix.load()
+    education = EducationFeatureMatrix.load()
+    rows = _best_per_applicant(
+        _employment_rows(employment, active_employment_preferences().iterator()), 'employment_preference_id'
+    )
+    rows += _best_per_applicant(
+        _education_rows(education, active_education_preferences().iterator()), 'education_preference_id'
+    )
+    with transaction.atomic():
+        ApplicantPreferenceMatch.objects.all().delete()
+        ApplicantPreferenceMatch.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+class MatchRefreshQueue:
+    """Per-process queue of applicants and preferences whose stored matches are stale"""
+
+    def __init__(self, flush_interval=5):
+        self.flush_interval = flush_interval
+        self._profile_ids = set()
+        self._preferences = set()  # (model, pk)
+        self._lock = threading.Lock()
+
+    def _add(self, profile_id=None, preference_key=None):
+        with self._lock:
+            if profile_id is not None:
+                self._profile_ids.add(profile_id)
+            if preference_key is not None:
+                self._preferences.add(preference_key)
+
+    def add_applicant(self, profile_id):
+        """Queue an applicant once the current transaction commits"""
+        transaction.on_commit(lambda: self._add(profile_id=profile_id))
+
+    def add_preference(self, preference):
+        """Queue a preference once the current transaction commits"""
+        key = (type(preference), preference.pk)
+        transaction.on_commit(lambda: self._add(preference_key=key))
+
+    def flush(self):
+        """Refresh every queued preference, then every queued applicant. Returns the number refreshed."""
+        with self._lock:
+            profile_ids, self._profile_ids = self._profile_ids, set()
+            preferences, self._preferences = self._preferences, set()
+        refreshed = 0
+        for model, pk in sorted(preferences, key=lambda key: (key[0].__name__, key[1])):
+            try:
+                preference = model.objects.filter(pk=pk).first()
+                if preference is not None:  # Deleted preferences lose their rows through the FK cascade
+                    refresh_preference_matches(preference)
+                    refreshed += 1
+            except Exception as e:
+                logger.error(f"Failed to refresh matches of {model.__name__} {pk}: {e}", exc_info=True)
+        if profile_ids:
+            try:
+                refresh_applicant_matches(sorted(profile_ids))
+                refreshed += len(profile_ids)
+            except Exception as e:
+                logger.error(f"Failed to refresh matches of {len(profile_ids)} applicants: {e}", exc_info=True)
+        return refreshed
+
+
+match_refresh_queue = MatchRefreshQueue(flush_interval=getattr(settings, 'MATCH_REFRESH_INTERVAL', 5))
+
+
+def queue_applicant_refresh(profile_id):
+    """Rescore an applicant in the background after the current transaction commits"""
+    match_refresh_queue.add_applicant(profile_id)
+
+
+def queue_preference_refresh(preference):
+    """Rescore a preference in the background after the current transaction commits"""
+    match_refresh_queue.add_preference(preference)
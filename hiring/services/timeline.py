@@ -0,0 +1,119 @@
+"""
+Precomputed timelines for the default "newest" public feed.
+
+Each post type, plus the "all" bucket, has a capped list of the newest
+published public posts stored in Django's cache as (created_at timestamp,
+id) pairs. Post signals (hiring.signals) rebuild the buckets a post
+touches after it is created or deleted, or saved with a changed type,
+publication, visibility or creation time: the "all" bucket, the post's
+old type and its new type. Each rebuild is one indexed LIMIT query, run
+after the transaction commits. Writes that bypass signals, such as
+QuerySet.update(), are picked up when the entry expires after
+FEED_TIMELINE_TTL seconds (default 300).
+
+A feed page within the first FEED_TIMELINE_SIZE posts is served from the
+list. The posts are hydrated with a single id__in query that re-applies
+the bucket's filters, so a stale entry never shows a post that left the
+public feed. A page that loses posts that way falls back to the regular
+query and schedules a rebuild. Pages past the cap, searches and other
+sorts also return None and fall back. Cursors and page numbers mean the
+same thing on both paths, so a client can cross from one to the other
+mid-scroll.
+"""
+from bisect import bisect_right
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from ..models import Post
+from ..pagination import CursorPage, decode_cursor, encode_cursor
+from .post_queries import feed_posts
+
+
+TIMELINE_ORDERING = ('-created_at', '-id')
+TIMELINE_SIZE = getattr(settings, 'FEED_TIMELINE_SIZE', 500)
+TIMELINE_TTL = getattr(settings, 'FEED_TIMELINE_TTL', 300)
+# Post fields that decide whether and where a post sits in a timeline
+TIMELINE_FIELDS = ('post_type', 'is_published', 'visibility', 'created_at')
+ALL_TYPES = 'all'
+
+
+def _key(post_type):
+    return f'feed:timeline:public:{post_type}'
+
+
+def timeline_queryset(post_type=ALL_TYPES):
+    posts = Post.objects.filter(is_published=True, visibility='public')
+    return posts if post_type == ALL_TYPES else posts.filter(post_type=post_type)
+
+
+def rebuild_timeline(post_type=ALL_TYPES):
+    posts = timeline_queryset(post_type)
+    rows = posts.order_by(*TIMELINE_ORDERING).values_list('created_at', 'id')[:TIMELINE_SIZE]
+    entries = [(created_at.timestamp(), post_id) for created_at, post_id in rows]
+    timeline = {
+        'entries': entries,
+        'total': posts.count() if len(entries) >= TIMELINE_SIZE else len(entries),
+    }
+    cache.set(_key(post_type), timeline, TIMELINE_TTL)
+    return timeline
+
+
+def get_timeline(post_type=ALL_TYPES):
+    timeline = cache.get(_key(post_type))
+    return timeline if timeline is not None else rebuild_timeline(post_type)
+
+
+def refresh_timelines(*post_types):
+    """Rebuild the "all" timeline and the given post types' timelines once the current transaction commits"""
+    def rebuild():
+        for post_type in {ALL_TYPES, *post_types} - {None}:
+            rebuild_timeline(post_type)
+    transaction.on_commit(rebuild)
+
+
+def timeline_state(post):
+    """The post's loaded TIMELINE_FIELDS values, None for deferred fields"""
+    return tuple(post.__dict__.get(field) for field in TIMELINE_FIELDS)
+
+
+def _start_after(entries, cursor):
+    created_at, post_id = decode_cursor(cursor, TIMELINE_ORDERING)
+    created_at = parse_datetime(created_at) if isinstance(created_at, str) else None
+    if created_at is None:
+        return None
+    # entries are newest first; bisect over the negated keys, which ascend
+    return bisect_right(entries, (-created_at.timestamp(), -int(post_id)), key=lambda entry: (-entry[0], -entry[1]))
+
+
+def timeline_page(post_type, page_size, cursor=None, page=None, with_total=False, user=None):
+    """
+    A CursorPage of newest public posts from the stored timeline, or None if
+    the page lies beyond it. Raises InvalidCursor for a bad cursor.
+    """
+    timeline = get_timeline(post_type)
+    entries, total = timeline['entries'], timeline['total']
+    if cursor is None and page is not None:
+        start = (page - 1) * page_size
+    else:
+        page = None
+        start = _start_after(entries, cursor) if cursor else 0
+    if start is None:
+        return None
+    window = entries[start:start + page_size + 1]
+    if len(window) <= page_size and start + len(window) < total:
+        return None  # page continues past the stored entries
+
+    ids = [post_id for _, post_id in window[:page_size]]
+    posts = feed_posts(user, timeline_queryset(post_type).filter(id__in=ids)).in_bulk()
+    if len(posts) < len(ids):
+        refresh_timelines(post_type)  # posts left the feed without a signal
+        return None
+    items = [posts[post_id] for post_id in ids]
+    next_cursor = None
+    if len(window) > page_size and items:
+        next_cursor = encode_cursor(TIMELINE_ORDERING, [items[-1].created_at, items[-1].id])
+    show_total = page is not None or with_total
+    return CursorPage(items, page_size, next_cursor, total if show_total else None, False, page)
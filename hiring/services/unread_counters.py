@@ -0,0 +1,98 @@
+"""
+Per-user, per-conversation unread message counters.
+
+UnreadCounter holds one row per conversation participant. A new message
+increments the rows of every participant except its sender with one
+F() UPDATE. Marking a conversation read zeroes the reader's row.
+Both lock the counter rows they change, and a new message is only
+counted if it is still unread once the lock is held. So a message that
+arrives while its reader is marking the conversation read is counted
+exactly when it was not marked read.
+Badges then read one indexed SUM over the user's rows, and the inbox
+reads one row per conversation; neither counts Message rows. After each
+change the affected users' new totals are pushed to their sockets as an
+"unread" event (services.realtime).
+
+rebuild_unread_counters() recomputes every row from Message.is_read and
+backs the rebuild_unread_counters management command.
+"""
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from ..models import Conversation, Message, UnreadCounter
+from .engagement_counters import aggregate_subquery
+from .realtime import publish_to_user
+
+
+def unread_subquery(user, conversation_ref='pk'):
+    """Correlated unread count for user in the outer conversation, 0 without a counter row"""
+    counts = UnreadCounter.objects.filter(conversation_id=OuterRef(conversation_ref), user_id=user.pk).values('count')[:1]
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def unread_total(user):
+    return UnreadCounter.objects.filter(user_id=user.pk).aggregate(total=Sum('count'))['total'] or 0
+
+
+def publish_totals(user_ids):
+    """Push each user's new unread total to their sockets after commit"""
+    totals = dict(
+        UnreadCounter.objects.filter(user_id__in=list(user_ids)).order_by()
+        .values('user_id').annotate(total=Sum('count')).values_list('user_id', 'total')
+    )
+    for user_id in user_ids:
+        publish_to_user(user_id, {'type': 'unread', 'total': totals.get(user_id) or 0})
+
+
+def record_new_message(message):
+    """Count message as unread for every participant except its sender"""
+    recipients = list(
+        Conversation.participants.through.objects.filter(conversation_id=message.conversation_id)
+        .exclude(customuser_id=message.sender_id).values_list('customuser_id', flat=True)
+    )
+    if not recipients:
+        return
+    with transaction.atomic():
+        UnreadCounter.objects.bulk_create([
+            UnreadCounter(user_id=user_id, conversation_id=message.conversation_id) for user_id in recipients
+        ], ignore_conflicts=True)
+        counters = UnreadCounter.objects.filter(conversation_id=message.conversation_id, user_id__in=recipients)
+        list(counters.select_for_update().order_by('user_id').values_list('pk', flat=True))
+        # A reader who held the lock may already have marked it read
+        if not Message.objects.filter(pk=message.pk, is_read=False).exists():
+            return
+        counters.update(count=F('count') + 1)
+    publish_totals(recipients)
+
+
+def lock_unread(conversation_id, user):
+    """Lock user's counter for the conversation until the surrounding transaction ends"""
+    list(UnreadCounter.objects.select_for_update().filter(
+        conversation_id=conversation_id, user_id=user.pk
+    ).values_list('pk', flat=True))
+
+
+def reset_unread(conversation_id, user):
+    """Zero user's counter for the conversation"""
+    if UnreadCounter.objects.filter(conversation_id=conversation_id, user_id=user.pk, count__gt=0).update(count=0):
+        publish_totals([user.pk])
+
+
+def rebuild_unread_counters():
+    """Recompute every participant's counter from Message.is_read. Returns the number of counters written."""
+    memberships = Conversation.participants.through.objects.annotate(
+        unread=aggregate_subquery(
+            Message.objects.filter(conversation_id=OuterRef('conversation_id'), is_read=False)
+            .exclude(sender_id=OuterRef('customuser_id')),
+            'conversation_id'
+        )
+    ).values_list('customuser_id', 'conversation_id', 'unread')
+    counters = [
+        UnreadCounter(user_id=user_id, conversation_id=conversation_id, count=count)
+        for user_id, conversation_id, count in memberships
+    ]
+    with transaction.atomic():
+        UnreadCounter.objects.all().delete()
+        UnreadCounter.objects.bulk_create(counters, batch_size=1000)
+    return len(counters)
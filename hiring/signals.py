@@ -0,0 +1,32 @@
+# hiring/signals.py
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Post
+from .services.post_tags import release_post_tags
+from .services.timeline import refresh_timelines, timeline_state
+
+
+@receiver(pre_delete, sender=Post)
+def uncount_deleted_post_tags(sender, instance, **kwargs):
+    """Keep Tag.post_count and TagUsage right however a post is deleted, cascades and bulk deletes included"""
+    release_post_tags(instance)
+
+
+@receiver(post_init, sender=Post)
+def remember_timeline_state(sender, instance, **kwargs):
+    instance._timeline_state = timeline_state(instance)
+
+
+@receiver(post_save, sender=Post)
+def refresh_saved_post_timelines(sender, instance, created, **kwargs):
+    """Rebuild the public timelines a post enters or leaves, whichever code path saved it"""
+    previous, current = instance._timeline_state, timeline_state(instance)
+    if created or previous != current:
+        refresh_timelines(previous[0], current[0])
+    instance._timeline_state = current
+
+
+@receiver(post_delete, sender=Post)
+def refresh_deleted_post_timelines(sender, instance, **kwargs):
+    refresh_timelines(timeline_state(instance)[0])
@@ -1,3 +1,1133 @@
-from django.test import TestCase
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone
+from unittest import mock
 
-# Create your tests here.
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .models import (
+    JobListing, CustomUser, Post, PostView, Tag, TagUsage, Conversation, Message, UserStatus, UnreadCounter, ChunkedUpload, Rating, Comment, JobInteraction, ApplicantProfile, BusinessProfile, BusinessPreference,
+    BusinessEmploymentPreference, EmploymentHistory, Education, ApplicantFeatures
+)
+from .pagination import InvalidCursor, paginate
+from .routing import websocket_urlpatterns
+from .services.chunked_upload import S3MultipartWriter, expire_uploads
+from .services.comment_tree import post_comment_tree
+from .services.inbox import mark_conversation_read
+from .services.engagement_counters import rate_post, reconcile_counters, remove_post_rating, set_post_reaction
+from .services.job_search import search_jobs
+from .services import presence
+from .services.popularity import popularity_score, recompute_popularity
+from .services.post_search import RELEVANCE_ORDERING, search_posts
+from .services.post_tags import rebuild_tag_counts, trending_tags
+from .services.timeline import refresh_timelines
+from .services.unread_counters import rebuild_unread_counters, record_new_message
+from .services.view_counter import ViewBuffer
+from .services.buffer_flusher import BufferFlusher
+from .services.job_facets import job_facet_counts, invalidate_job_facets
+from .services.feature_store import refresh_applicant_features, rebuild_applicant_features
+from .services.matching_service import EmploymentFeatureMatrix, EducationFeatureMatrix, TitleTokenIndex, match_page
+from .services.match_cache import match_cache, feature_matrix_cache
+from .services import reverse_matching
+from .services.reverse_matching import match_refresh_queue, refresh_preference_matches, rebuild_applicant_matches
+from .views import (
+    api_job_listings_with_interactions,
+    calculate_employment_matches, calculate_education_matches, get_highest_degree, find_matching_applicants,
+    get_stored_employment_matches, get_stored_education_matches
+)
+
+
+class MatchingEngineTest(TestCase):
+    """The vectorized engine must agree with the per-applicant functions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        business_user = CustomUser.objects.create_user(username='acme', password='pass12345', user_type='admin')
+        cls.business = BusinessProfile.objects.create(user=business_user, company_name='Acme')
+
+        applicants = [
+            ('thandi', [('Senior Python Developer', 'full_time', date(2015, 1, 1), date(2020, 6, 1), False),
+                        ('Python Team Lead', 'contract', date(2020, 7, 1), None, True)],
+             [('BSc Computer Science', 'Computer Science', '3.4'), ('MSc Data Science', 'Data Science', '75%')]),
+            ('sipho', [('Backend developer', None, date(2021, 3, 1), date(2022, 3, 1), False),
+                       ('Java Developer', 'part_time', date(2019, 1, 1), date(2020, 1, 1), False),
+                       ('Developer Advocate', 'freelance', date(2018, 1, 1), date(2018, 9, 1), False)],
+             [('National Diploma', 'Information Technology', '')]),
+            ('lerato', [('Accountant', 'full_time', date(2010, 1, 1), date(2012, 1, 1), False)],
+             [('Matric', '', 'Distinction'), ('Honours Degree in Accounting', 'Accounting', '0')]),
+        ]
+        for username, employment, education in applicants:
+            user = CustomUser.objects.create_user(username=username, password='pass12345', first_name=username.title())
+            profile = ApplicantProfile.objects.create(user=user)
+            for job_title, contract_type, start, end, current in employment:
+                EmploymentHistory.objects.create(
+                    profile=profile, job_title=job_title, company='Co', contract_type=contract_type,
+                    start_date=start, end_date=end, currently_working=current
+                )
+            for qualification, major, grade in education:
+                Education.objects.create(
+                    profile=profile, qualification=qualification, institution='Uni',
+                    completion_year=2015, major_subject=major, grade=grade
+                )
+        rebuild_applicant_features()
+
+    def setUp(self):
+        # Cached results outlive the per-test database rollback
+        match_cache.clear()
+        feature_matrix_cache.clear()
+
+    def test_title_index_resolves_keywords_by_token_prefix(self):
+        index = TitleTokenIndex(['Senior Python Developer', 'Python Team Lead', 'Backend developer', 'Accountant'])
+        self.assertEqual(index.lookup('dev'), {0, 2})
+        self.assertEqual(index.lookup('Team Lead'), {1})
+        self.assertEqual(index.lookup('python lead'), {1})
+        self.assertEqual(index.lookup('count'), set())
+        self.assertEqual(index.lookup_any(['accountant', 'backend', '']), {2, 3})
+
+    def test_percentage_grades_are_not_gpas(self):
+        grades = ['3.4', 'GPA 3.2/4.0', '75%', '75', 'Distinction', '']
+        self.assertEqual([Education.parse_grade(grade) for grade in grades], [3.4, 3.2, None, None, None, None])
+        preference = BusinessPreference.objects.create(
+            business_profile=self.business, preference_type='education', title='Grads', criteria={'minimum_gpa': '3.5'}
+        )
+        self.assertEqual(EducationFeatureMatrix.load().match(preference), [])
+
+    def legacy_employment_matches(self, preference):
+        results = []
+        for applicant in ApplicantProfile.objects.filter(employment_history__isnull=False).distinct().order_by('id'):
+            matches = calculate_employment_matches(applicant, [preference])
+            if matches:
+                results.append((applicant.id, matches[0]['match_score'], matches[0]['match_reasons'],
+                                matches[0]['total_experience_years']))
+        return sorted(results, key=lambda x: x[1], reverse=True)
+
+    def legacy_education_matches(self, preference):
+        results = []
+        for applicant in ApplicantProfile.objects.filter(education__isnull=False).distinct().order_by('id'):
+            matches = calculate_education_matches(applicant, [preference])
+            if matches:
+                results.append((applicant.id, matches[0]['match_score'], matches[0]['match_reasons'],
+                                get_highest_degree(applicant)))
+        return sorted(results, key=lambda x: x[1], reverse=True)
+
+    def test_employment_scores_match_per_applicant_loop(self):
+        features = EmploymentFeatureMatrix.load()
+        for contract_type, keywords, years in [
+            ('full_time', ['python'], 3),
+            ('contract', ['developer', 'lead'], 0),
+            ('remote', ['developer'], 20),
+            ('part_time', [], 1),
+        ]:
+            preference = BusinessEmploymentPreference.objects.create(
+                business_profile=self.business, preferred_contract_type=contract_type,
+                job_title_keywords=keywords, required_experience_years=years
+            )
+            engine = [(row['applicant_id'], row['match_score'], row['match_reasons'], row['total_experience_years'])
+                      for row in features.match(preference)]
+            self.assertEqual(engine, self.legacy_employment_matches(preference))
+
+    def test_education_scores_match_per_applicant_loop(self):
+        features = EducationFeatureMatrix.load()
+        for criteria in [
+            {'degree_level': 'master', 'field_of_study': 'science', 'minimum_gpa': '3'},
+            {'degree_level': 'bachelor', 'required_certifications': ['CA(SA)', 'CFA', 'ACCA']},
+            {'field_of_study': 'information', 'minimum_gpa': 50},
+            {'degree_level': 'phd'},
+        ]:
+            preference = BusinessPreference.objects.create(
+                business_profile=self.business, preference_type='education', title='Grads', criteria=criteria
+            )
+            engine = [(row['applicant_id'], row['match_score'], row['match_reasons'], row['highest_degree'])
+                      for row in features.match(preference)]
+            self.assertEqual(engine, self.legacy_education_matches(preference))
+
+    def test_incremental_refresh_matches_rebuild(self):
+        profile = ApplicantProfile.objects.get(user__username='sipho')
+        profile.employment_history.filter(job_title='Java Developer').delete()
+        Education.objects.create(profile=profile, qualification='PhD Informatics', institution='Uni',
+                                 completion_year=2023, major_subject='Informatics', grade='80')
+        refresh_applicant_features(profile)
+        refreshed = ApplicantFeatures.objects.values().get(profile=profile)
+        refreshed_postings = list(profile.title_tokens.order_by('record', 'token').values_list('record', 'token'))
+
+        rebuild_applicant_features()
+        rebuilt = ApplicantFeatures.objects.values().get(profile=profile)
+        for row in (refreshed, rebuilt):
+            row.pop('id'), row.pop('updated_at')
+        self.assertEqual(refreshed, rebuilt)
+        self.assertEqual(rebuilt['highest_degree_level'], 'phd')
+        self.assertEqual(list(profile.title_tokens.order_by('record', 'token').values_list('record', 'token')),
+                         refreshed_postings)
+        self.assertEqual(refreshed_postings, [(0, 'backend'), (0, 'developer'), (1, 'advocate'), (1, 'developer')])
+
+        preference = BusinessEmploymentPreference.objects.create(
+            business_profile=self.business, preferred_contract_type='internship',
+            job_title_keywords=['java'], required_experience_years=99
+        )
+        self.assertEqual(EmploymentFeatureMatrix.load(profile_ids=[profile.id]).match(preference), [])
+
+    def test_match_pages_follow_full_ranking(self):
+        features = EmploymentFeatureMatrix.load()
+        preference = BusinessEmploymentPreference.objects.create(
+            business_profile=self.business, preferred_contract_type='full_time',
+            job_title_keywords=['developer'], required_experience_years=0
+        )
+        pages, cursor = [], None
+        while True:
+            page, cursor = match_page(features, preference, 1, cursor)
+            pages.extend(page)
+            if cursor is None:
+                break
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(pages, features.match(preference))
+
+    def test_match_cache_invalidated_by_feature_refresh(self):
+        preference = BusinessEmploymentPreference.objects.create(
+            business_profile=self.business, preferred_contract_type='freelance',
+            job_title_keywords=['advocate'], required_experience_years=0
+        )
+        first = find_matching_applicants(preference)
+        self.assertIs(find_matching_applicants(preference), first)
+        self.assertEqual((match_cache.hits, match_cache.misses), (1, 1))
+
+        profile = ApplicantProfile.objects.get(user__username='sipho')
+        profile.employment_history.filter(job_title='Developer Advocate').delete()
+        refresh_applicant_features(profile)
+        self.assertNotEqual(find_matching_applicants(preference), first)
+        self.assertEqual(match_cache.misses, 2)
+
+    def test_stored_applicant_matches_agree_with_live_scoring(self):
+        employment_preferences = [
+            BusinessEmploymentPreference.objects.create(
+                business_profile=self.business, preferred_contract_type=contract_type,
+                job_title_keywords=keywords, required_experience_years=years
+            )
+            for contract_type, keywords, years in [('full_time', ['python'], 3), ('freelance', ['java'], 10)]
+        ]
+        education_preferences = [
+            BusinessPreference.objects.create(
+                business_profile=self.business, preference_type='education', title='Grads', criteria=criteria
+            )
+            for criteria in [{'degree_level': 'master'}, {'field_of_study': 'accounting'}]
+        ]
+        for preference in employment_preferences + education_preferences:
+            refresh_preference_matches(preference)
+        incremental = {}
+        for profile in ApplicantProfile.objects.all():
+            incremental[profile.id] = (get_stored_employment_matches(profile), get_stored_education_matches(profile))
+            live = sorted(
+                (match['preference']['id'], match['match_score'], match['match_reasons'])
+                for match in calculate_employment_matches(profile, employment_preferences)
+            )
+            stored = sorted(
+                (match['preference']['id'], match['match_score'], match['match_reasons'])
+                for match in incremental[profile.id][0]
+            )
+            self.assertEqual(stored, live)
+            live = sorted(
+                (match['preference']['id'], match['match_score'], match['match_reasons'])
+                for match in calculate_education_matches(profile, education_preferences)
+            )
+            stored = sorted(
+                (match['preference']['id'], match['match_score'], match['match_reasons'])
+                for match in incremental[profile.id][1]
+            )
+            self.assertEqual(stored, live)
+
+        rebuild_applicant_matches()
+        for profile in ApplicantProfile.objects.all():
+            self.assertEqual(
+                (get_stored_employment_matches(profile), get_stored_education_matches(profile)),
+                incremental[profile.id]
+            )
+
+    def test_match_refreshes_run_from_the_queue(self):
+        profile = ApplicantProfile.objects.get(user__username='sipho')
+        preference = BusinessEmploymentPreference.objects.create(
+            business_profile=self.business, preferred_contract_type='freelance',
+            job_title_keywords=['java'], required_experience_years=0
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            reverse_matching.queue_preference_refresh(preference)
+        self.assertFalse(profile.preference_matches.exists())
+        self.assertEqual(match_refresh_queue.flush(), 1)
+        self.assertEqual(profile.preference_matches.get().match_score, 100)
+
+        profile.employment_history.filter(job_title='Java Developer').delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_applicant_features(profile)
+        self.assertEqual(profile.preference_matches.get().match_score, 100)
+        self.assertEqual(match_refresh_queue.flush(), 1)
+        self.assertEqual(profile.preference_matches.get().match_score, 60)
+
+    def test_stored_matches_keep_each_applicants_best(self):
+        profile = ApplicantProfile.objects.get(user__username='thandi')
+        weak, strong = (
+            BusinessEmploymentPreference.objects.create(
+                business_profile=self.business, preferred_contract_type=contract_type,
+                job_title_keywords=['python'], required_experience_years=20
+            )
+            for contract_type in ('full_time', 'internship')
+        )
+
+        def stored():
+            return list(profile.preference_matches.values_list('employment_preference_id', 'match_score'))
+
+        with mock.patch.object(reverse_matching, 'MATCH_LIMIT', 1):
+            refresh_preference_matches(weak)
+            refresh_preference_matches(strong)
+            self.assertEqual(stored(), [(strong.id, 80)])
+            refresh_preference_matches(weak)
+            self.assertEqual(stored(), [(strong.id, 80)])
+
+            strong.is_active = False
+            strong.save()
+            refresh_preference_matches(strong)
+            self.assertEqual(stored(), [(weak.id, 70)])
+
+            rebuild_applicant_matches()
+            self.assertEqual(stored(), [(weak.id, 70)])
+
+
+class JobSearchTest(TestCase):
+    """Full-text job search ranks title hits above skills and description hits"""
+
+    def create_job(self, reference, title, skills='', description='', status='published', location='Durban',
+                   contract_type='full_time'):
+        return JobListing.objects.create(
+            listing_reference=reference, title=title, status=status, apply_by=date(2030, 1, 1),
+            position_summary='', industry='Technology', job_category='IT', location=location,
+            contract_type=contract_type, company_description='', job_description=description,
+            knowledge_requirements='', skills_requirements=skills, competencies_requirements='',
+            experience_requirements='', education_requirements=''
+        )
+
+    def test_ranked_search_and_sync(self):
+        described = self.create_job('J1', 'Analyst', description='Maintain our python services')
+        titled = self.create_job('J2', 'Python Developer')
+        skilled = self.create_job('J3', 'Engineer', skills='Python, Django')
+        self.create_job('J4', 'Python Intern', status='draft')
+
+        jobs, total = search_jobs('python')
+        self.assertEqual(total, 3)
+        self.assertEqual([job.id for job in jobs], [titled.id, skilled.id, described.id])
+
+        jobs, total = search_jobs('python', page=2, page_size=2)
+        self.assertEqual(([job.id for job in jobs], total), ([described.id], 3))
+
+        titled.title = 'Data Engineer'
+        titled.save()
+        self.assertEqual(search_jobs('developer'), ([], 0))
+        self.assertEqual(search_jobs('engineer')[1], 2)
+        described.delete()
+        self.assertEqual(search_jobs('services'), ([], 0))
+
+    def test_search_endpoint(self):
+        self.create_job('J1', 'Python Developer')
+        response = self.client.get('/api/jobs/search/', {'q': 'developers'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['pagination']['total_items'], 1)
+        self.assertEqual(self.client.get('/api/jobs/search/', {'q': ' '}).status_code, 400)
+
+    def test_interaction_counts_for_a_page_in_two_queries(self):
+        users = [CustomUser.objects.create_user(username=f'user{index}', password='pass12345') for index in range(3)]
+        jobs = [self.create_job(f'J{index}', f'Job {index}') for index in range(4)]
+        for user in users:
+            JobInteraction.objects.create(user=user, job_listing=jobs[0], interaction_type='like')
+        JobInteraction.objects.create(user=users[0], job_listing=jobs[1], interaction_type='dislike')
+        comment = JobInteraction.objects.create(
+            user=users[1], job_listing=jobs[0], interaction_type='comment', comment_text='Nice'
+        )
+        JobInteraction.objects.create(
+            user=users[2], job_listing=jobs[0], interaction_type='comment', comment_text='Agreed',
+            parent_interaction=comment
+        )
+
+        request = APIRequestFactory().get('/api/jobs/interactions/')
+        force_authenticate(request, user=users[0])
+        with CaptureQueriesContext(connection) as context:
+            payload = api_job_listings_with_interactions(request).data
+        self.assertEqual(len(context.captured_queries), 2)
+        by_reference = {job['listing_reference']: job for job in payload['jobs']}
+        self.assertEqual(
+            [by_reference['J0'][key] for key in ('likes_count', 'dislikes_count', 'comments_count', 'user_has_liked')],
+            [3, 0, 1, True]
+        )
+        self.assertEqual((by_reference['J1']['dislikes_count'], by_reference['J1']['user_has_disliked']), (1, True))
+        self.assertEqual(payload['total_jobs'], 4)
+
+    def test_facet_counts_exclude_own_selection_and_invalidate(self):
+        invalidate_job_facets()
+        self.create_job('J1', 'Python Developer', location='Durban', contract_type='full_time')
+        self.create_job('J2', 'Java Developer', location='Durban', contract_type='contract')
+        self.create_job('J3', 'Python Analyst', location='Cape Town', contract_type='full_time')
+        closing = self.create_job('J4', 'Python Tester', location='Pretoria', contract_type='contract')
+
+        facets = job_facet_counts('python', {'location': ['Durban'], 'contract_type': []})
+        self.assertEqual(facets['location'], [
+            {'value': 'Cape Town', 'count': 1}, {'value': 'Durban', 'count': 1}, {'value': 'Pretoria', 'count': 1}
+        ])
+        self.assertEqual(facets['contract_type'], [{'value': 'full_time', 'count': 1}])
+
+        closing.status = 'closed'
+        closing.save()
+        self.assertEqual(len(job_facet_counts('python', {'location': ['Durban']})['location']), 3)
+        invalidate_job_facets()
+        self.assertEqual(len(job_facet_counts('python', {'location': ['Durban']})['location']), 2)
+
+        response = self.client.get('/api/jobs/faceted-search/', {'q': 'developer', 'contract_type': 'contract'})
+        payload = response.json()
+        self.assertEqual([job['listing_reference'] for job in payload['jobs']], ['J2'])
+        self.assertEqual(payload['facets']['contract_type'], [
+            {'value': 'contract', 'count': 1}, {'value': 'full_time', 'count': 1}
+        ])
+
+
+class CursorPaginationTest(TestCase):
+    """Keyset pages walk the full ordering, ties included, without gaps or repeats"""
+
+    def test_pages_concatenate_to_full_ordering(self):
+        joined = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for index in range(7):
+            CustomUser.objects.create(
+                username=f'user{index}', email=f'user{index}@example.com',
+                date_joined=joined if index % 2 else datetime(2024, 1, index + 2, tzinfo=timezone.utc)
+            )
+        ordering = ('-date_joined', '-id')
+        expected = list(CustomUser.objects.order_by(*ordering).values_list('id', flat=True))
+
+        seen, cursor = [], None
+        while True:
+            result = paginate(CustomUser.objects.all(), ordering, 3, cursor=cursor, with_total=True)
+            seen.extend(user.id for user in result.items)
+            self.assertEqual(result.total, 7)
+            if not result.has_more:
+                break
+            cursor = result.next_cursor
+        self.assertEqual(seen, expected)
+
+        numbered = paginate(CustomUser.objects.all(), ordering, 3, page=2)
+        self.assertEqual([user.id for user in numbered.items], expected[3:6])
+        self.assertEqual(numbered.pagination(total_key='total_users')['total_pages'], 3)
+
+        with self.assertRaises(InvalidCursor):
+            paginate(CustomUser.objects.all(), ('-id',), 3, cursor=cursor)
+        with self.assertRaises(InvalidCursor):
+            paginate(CustomUser.objects.all(), ordering, 3, cursor='not-a-cursor')
+
+
+class FeedQueryCountTest(TestCase):
+    """Feed pages cost the same number of queries whatever their size"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_queries_do_not_grow_with_page_size(self):
+        author = CustomUser.objects.create_user(username='author', password='pass12345')
+        reader = CustomUser.objects.create_user(username='reader', password='pass12345')
+        for index in range(6):
+            post = Post.objects.create(author=author, title=f'Post {index}', content='Hello')
+            set_post_reaction(post, author, 'like')
+        set_post_reaction(post, reader, 'like')
+        Rating.objects.create(user=reader, post=post, rating=4)
+        self.client.force_login(reader)
+
+        def queries_for(page_size):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get('/api/posts/feed/', {'page_size': page_size})
+            return len(context.captured_queries), response.json()['posts']
+
+        queries_for(1)  # builds the stored timeline
+        small, _ = queries_for(2)
+        large, posts = queries_for(6)
+        self.assertEqual(small, large)
+        self.assertEqual((posts[0]['likes_count'], posts[0]['user_has_liked'], posts[0]['user_rating']), (2, True, 4))
+        self.assertEqual((posts[1]['likes_count'], posts[1]['user_has_liked'], posts[1]['user_rating']), (1, False, None))
+
+
+class EngagementCounterTest(TestCase):
+    """Reaction and comment writes keep the denormalized counters in step"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_reactions_comments_and_reconcile(self):
+        author = CustomUser.objects.create_user(username='author', password='pass12345')
+        reader = CustomUser.objects.create_user(username='reader', password='pass12345')
+        post = Post.objects.create(author=author, title='Hello', content='World')
+        self.client.force_login(reader)
+        url = f'/api/posts/{post.id}/like-dislike/'
+
+        payload = self.client.post(url, {'action': 'like'}).json()
+        self.assertEqual((payload['likes_count'], payload['dislikes_count']), (1, 0))
+        self.client.post(url, {'action': 'like'})
+        payload = self.client.post(url, {'action': 'dislike'}).json()
+        self.assertEqual((payload['likes_count'], payload['dislikes_count'], payload['user_has_disliked']), (0, 1, True))
+        payload = self.client.post(url, {'action': 'remove'}).json()
+        self.assertEqual((payload['likes_count'], payload['dislikes_count']), (0, 0))
+
+        response = self.client.post(f'/api/post-comments/{post.id}/', {'content': 'Nice'})
+        self.assertEqual(response.json()['comment_count'], 1)
+
+        post.likes.add(author)
+        Post.objects.filter(pk=post.pk).update(comment_count=5)
+        self.assertEqual(reconcile_counters(), (1, 0))
+        post.refresh_from_db()
+        self.assertEqual((post.likes_count, post.dislikes_count, post.comment_count), (1, 0, 1))
+        self.assertEqual(reconcile_counters(), (0, 0))
+
+    def test_reaction_updates_counters_and_score_together(self):
+        author = CustomUser.objects.create_user(username='author', password='pass12345')
+        reader = CustomUser.objects.create_user(username='reader', password='pass12345')
+        post = Post.objects.create(author=author, title='Hello', content='World')
+
+        def statements(action):
+            with CaptureQueriesContext(connection) as context:
+                set_post_reaction(post, reader, action)
+            return [query['sql'].split()[0] for query in context.captured_queries
+                    if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+
+        self.assertEqual(statements('like'), ['SELECT', 'INSERT', 'DELETE', 'UPDATE', 'SELECT'])
+        self.assertEqual(statements('like'), ['SELECT', 'SELECT'])
+        self.assertEqual(statements('remove'), ['DELETE', 'UPDATE', 'SELECT'])
+        self.assertEqual(statements('dislike'), ['SELECT', 'INSERT', 'DELETE', 'UPDATE', 'SELECT'])
+        self.assertEqual((post.likes_count, post.dislikes_count), (0, 1))
+
+        set_post_reaction(post, author, 'like')
+        post.refresh_from_db()
+        self.assertEqual((post.likes_count, post.dislikes_count), (1, 1))
+        self.assertAlmostEqual(post.popularity_score, popularity_score(post), places=6)
+
+    def test_popularity_score_follows_engagement_and_decays(self):
+        author, fan, other = (
+            CustomUser.objects.create_user(username=name, password='pass12345') for name in ('author', 'fan', 'other')
+        )
+        old = Post.objects.create(author=author, title='Old', content='Liked a lot, long ago')
+        new = Post.objects.create(author=author, title='New', content='Liked once, just now')
+        for user in (author, fan, other):
+            set_post_reaction(old, user, 'like')
+        set_post_reaction(new, fan, 'like')
+
+        def popular_titles():
+            posts = self.client.get('/api/feed/', {'sort': 'popular'}).json()['posts']
+            return [post['title'] for post in posts]
+
+        self.assertEqual(popular_titles(), ['Old', 'New'])
+        Post.objects.filter(pk=old.pk).update(created_at=old.created_at - timedelta(days=2))
+        self.assertEqual(popular_titles(), ['Old', 'New'])
+        self.assertEqual(recompute_popularity(), 2)
+        self.assertEqual(popular_titles(), ['New', 'Old'])
+
+    def test_ratings_adjust_sum_and_count(self):
+        author, first, second = (
+            CustomUser.objects.create_user(username=name, password='pass12345') for name in ('author', 'first', 'second')
+        )
+        post = Post.objects.create(author=author, title='Hello', content='World')
+        rate_post(post, first, 5)
+        rate_post(post, second, 2)
+        self.assertEqual((post.rating_sum, post.rating_count, post.average_rating), (7, 2, 3.5))
+        rate_post(post, second, 4)
+        self.assertEqual((post.rating_sum, post.rating_count), (9, 2))
+        self.assertTrue(remove_post_rating(post, first))
+        self.assertFalse(remove_post_rating(post, first))
+        self.assertEqual((post.rating_sum, post.rating_count, post.average_rating), (4, 1, 4.0))
+
+        self.client.force_login(first)
+        payload = self.client.post(f'/api/posts/{post.id}/rate/', {'rating': 1}).json()
+        self.assertEqual((payload['average_rating'], payload['rating_count'], payload['user_rating']), (2.5, 2, 1))
+
+        third = CustomUser.objects.create_user(username='third', password='pass12345')
+        rate_post(post, third, 5)
+        better = Post.objects.create(author=author, title='Better', content='World')
+        for user in (first, second, third):
+            rate_post(better, user, 5)
+        titles = [item['title'] for item in self.client.get('/api/feed/', {'sort': 'top'}).json()['posts']]
+        self.assertEqual(titles, ['Better', 'Hello'])
+
+    def test_repeated_first_rating_updates_the_existing_rating(self):
+        author = CustomUser.objects.create_user(username='author', password='pass12345')
+        reader = CustomUser.objects.create_user(username='reader', password='pass12345')
+        post = Post.objects.create(author=author, title='Hello', content='World')
+        # Two requests that each loaded the post before either rating was written
+        first, second = Post.objects.get(pk=post.pk), Post.objects.get(pk=post.pk)
+        rate_post(first, reader, 2)
+        rate_post(second, reader, 4)
+        self.assertEqual((second.rating_sum, second.rating_count), (4, 1))
+        self.assertEqual(Rating.objects.get(post=post, user=reader).rating, 4)
+
+        self.client.force_login(author)
+        url = f'/api/posts/{post.id}/rate/'
+        self.assertEqual(self.client.post(url, {'rating': 3}).status_code, 200)
+        payload = self.client.post(url, {'rating': 5}).json()
+        self.assertEqual((payload['average_rating'], payload['rating_count'], payload['user_rating']), (4.5, 2, 5))
+
+
+class ViewBufferTest(TestCase):
+    """Views are counted once per IP address and written in batches"""
+
+    def test_views_are_buffered_and_deduplicated(self):
+        author = CustomUser.objects.create_user(username='author', password='pass12345')
+        post = Post.objects.create(author=author, title='Hello', content='World')
+        buffer = ViewBuffer(flush_interval=3600, max_pending=3)
+
+        self.assertTrue(buffer.record(post.id, '10.0.0.1'))
+        self.assertFalse(buffer.record(post.id, '10.0.0.1'))
+        self.assertTrue(buffer.record(post.id, '10.0.0.2', author.id))
+        post.refresh_from_db()
+        self.assertEqual(post.views, 0)
+
+        buffer.record(post.id, '10.0.0.3')  # third pending view triggers a flush
+        post.refresh_from_db()
+        self.assertEqual((post.views, PostView.objects.filter(post=post).count()), (3, 3))
+        self.assertGreater(post.popularity_score, 0)
+
+        # Another worker's filter has not seen 10.0.0.1; the flush-time check has
+        other_worker = ViewBuffer(flush_interval=3600)
+        other_worker.record(post.id, '10.0.0.1')
+        other_worker.record(post.id, '10.0.0.4')
+        self.assertEqual(other_worker.flush(), 1)
+        post.refresh_from_db()
+        self.assertEqual(post.views, 4)
+
+    def test_flusher_writes_without_further_views(self):
+        author = CustomUser.objects.create_user(username='author', password='pass12345')
+        post = Post.objects.create(author=author, title='Hello', content='World')
+        buffer = ViewBuffer(flush_interval=3600)
+        buffer.record(post.id, '10.0.0.1')
+
+        # Shutdown writes what is left
+        self.assertEqual(BufferFlusher(buffer, 3600).stop(), 1)
+        post.refresh_from_db()
+        self.assertEqual(post.views, 1)
+
+        # The timer flushes on its own thread
+        flushed = threading.Event()
+        idle_buffer = mock.Mock()
+        idle_buffer.flush.side_effect = lambda: flushed.set()
+        flusher = BufferFlusher(idle_buffer, 0.01)
+        flusher.start()
+        self.assertTrue(flushed.wait(5))
+        flusher.stop()
+
+
+class TimelineTest(TestCase):
+    """The newest feed is served from the stored timeline and rebuilt on post writes"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_pages_come_from_the_timeline(self):
+        author = CustomUser.objects.create_user(username='author', password='pass12345')
+        for index in range(3):
+            Post.objects.create(author=author, title=f'Post {index}', content='Hello')
+        Post.objects.create(author=author, title='Hidden', content='Hello', visibility='private')
+
+        def feed(**params):
+            payload = self.client.get('/api/posts/feed/', {'page_size': 2, **params}).json()
+            return [post['title'] for post in payload['posts']], payload['pagination']
+
+        titles, pagination = feed()
+        self.assertEqual(titles, ['Post 2', 'Post 1'])
+        self.assertEqual(feed(cursor=pagination['next_cursor'])[0], ['Post 0'])
+        self.assertEqual(feed(page=2)[1]['total_posts'], 3)
+
+        post = Post.objects.create(author=author, title='Unannounced', content='Hello', post_type='question')
+        self.assertEqual(feed()[0], ['Post 2', 'Post 1'])
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_timelines(post.post_type)
+        self.assertEqual(feed()[0], ['Unannounced', 'Post 2'])
+        payload = self.client.get('/api/feed/', {'type': 'question'}).json()
+        self.assertEqual([post['title'] for post in payload['posts']], ['Unannounced'])
+
+    def test_timeline_drops_posts_that_leave_the_public_feed(self):
+        author = CustomUser.objects.create_user(username='author', password='pass12345')
+        with self.captureOnCommitCallbacks(execute=True):
+            posts = [Post.objects.create(author=author, title=f'Post {index}', content='Hello') for index in range(3)]
+
+        def feed():
+            payload = self.client.get('/api/posts/feed/', {'page_size': 2}).json()
+            return [post['title'] for post in payload['posts']]
+
+        self.assertEqual(feed(), ['Post 2', 'Post 1'])
+        Post.objects.filter(pk=posts[2].pk).update(is_published=False)  # no signals
+        self.assertEqual(feed(), ['Post 1', 'Post 0'])
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            posts[1].visibility = 'private'
+            posts[1].save()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(feed(), ['Post 0'])
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            posts[0].title = 'Renamed'
+            posts[0].save()
+        self.assertEqual(callbacks, [])
+        self.assertEqual(feed(), ['Renamed'])
+
+
+class PostSearchTest(TestCase):
+    """Feed search is ranked: title matches first, then tags and content, then author-only matches"""
+
+    def test_search_ranks_and_pages_by_relevance(self):
+        author = CustomUser.objects.create_user(username='author', password='pass12345')
+        writer = CustomUser.objects.create_user(username='writer', password='pass12345', first_name='Pythonista')
+        Post.objects.create(author=author, title='Cooking tips', content='We also talk python here')
+        Post.objects.create(author=author, title='Python tips', content='Decorators explained')
+        Post.objects.create(author=author, title='Weekly notes', content='Nothing', tags='python, django')
+        Post.objects.create(author=writer, title='Gardening', content='Tomatoes')
+        Post.objects.create(author=author, title='Python draft', content='Hidden', visibility='private')
+        Post.objects.create(author=author, title='Unrelated', content='Rust')
+
+        def search(**params):
+            payload = self.client.get('/api/feed/', {'search': 'python', 'page_size': 2, **params}).json()
+            return [post['title'] for post in payload['posts']], payload
+
+        titles, payload = search()
+        self.assertEqual(titles, ['Python tips', 'Weekly notes'])
+        self.assertEqual(payload['filters']['current_sort'], 'relevance')
+        titles, _ = search(cursor=payload['pagination']['next_cursor'])
+        self.assertEqual(titles, ['Cooking tips', 'Gardening'])
+
+        post = Post.objects.get(title='Unrelated')
+        post.content = 'Rust and Python'
+        post.save()
+        self.assertIn('Unrelated', search(page_size=10, sort='newest')[0])
+        post.delete()
+        self.assertNotIn('Unrelated', search(page_size=10)[0])
+
+    def test_rank_follows_the_post_alias_in_subqueries(self):
+        author = CustomUser.objects.create_user(username='author', password='pass12345')
+        Post.objects.create(author=author, title='Cooking tips', content='We also talk python here')
+        Post.objects.create(author=author, title='Python tips', content='Python decorators explained')
+        best = search_posts(Post.objects.all(), 'python').order_by(*RELEVANCE_ORDERING).values('pk')[:1]
+        self.assertEqual(list(Post.objects.filter(pk__in=best).values_list('title', flat=True)), ['Python tips'])
+
+
+class PostTagTest(TestCase):
+    """Tags are normalized into Tag/PostTag rows with incrementally maintained counts"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_tag_links_counts_and_feed_filter(self):
+        author = CustomUser.objects.create_user(username='author', password='pass12345')
+        self.client.force_login(author)
+
+        def create(title, tags, **fields):
+            payload = self.client.post('/api/posts/', {'title': title, 'content': 'Body', 'tags': tags, **fields}).json()
+            return payload['post']['id']
+
+        first = create('First', 'Python, #django')
+        create('Second', 'javascript, python')
+        create('Private', 'python', visibility='private')
+
+        python = Tag.objects.get(slug='python')
+        self.assertEqual((python.name, python.post_count), ('Python', 2))
+        self.assertEqual(list(Post.objects.get(id=first).post_tags.values_list('tag__slug', flat=True)), ['python', 'django'])
+        self.assertEqual([(tag.slug, tag.recent_posts) for tag in trending_tags(limit=2)], [('python', 2), ('django', 1)])
+
+        payload = self.client.get('/api/feed/', {'tag': 'PYTHON'}).json()
+        self.assertEqual([post['title'] for post in payload['posts']], ['Second', 'First'])
+        self.assertEqual(payload['posts'][1]['tags_list'], ['Python', 'django'])
+        self.assertEqual(self.client.get('/api/feed/', {'tag': 'java'}).json()['posts'], [])
+
+        self.client.put(f'/api/posts/{first}/', {'tags': 'rust'}, content_type='application/json')
+        self.client.delete(f'/api/posts/{first}/')
+        self.assertEqual(Tag.objects.get(slug='python').post_count, 1)
+        self.assertEqual(Tag.objects.get(slug='rust').post_count, 0)
+        self.assertEqual(TagUsage.objects.get(tag__slug='django').post_count, 0)
+
+        Tag.objects.update(post_count=7)
+        rebuild_tag_counts()
+        self.assertEqual(Tag.objects.get(slug='python').post_count, 1)
+
+        # Deleting the author cascades to the posts and releases their tags too
+        author.delete()
+        self.assertEqual(Tag.objects.get(slug='python').post_count, 0)
+        self.assertEqual(sum(TagUsage.objects.filter(tag__slug='python').values_list('post_count', flat=True)), 0)
+
+
+class InboxTest(TestCase):
+    """The conversation inbox loads in a fixed number of queries"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_inbox_annotations_and_query_count(self):
+        user = CustomUser.objects.create_user(username='me', password='pass12345')
+        self.client.force_login(user)
+
+        def start(username, *texts):
+            other = CustomUser.objects.create_user(username=username, password='pass12345')
+            presence.heartbeat(other)
+            conversation = Conversation.objects.create()
+            conversation.participants.add(user, other)
+            for sender, text in texts:
+                record_new_message(Message.objects.create(
+                    conversation=conversation, sender=other if sender == 'them' else user, content=text
+                ))
+            conversation.save()
+            return conversation
+
+        def inbox(**params):
+            with CaptureQueriesContext(connection) as context:
+                payload = self.client.get('/api/conversations/', params).json()
+            return payload, len(context.captured_queries)
+
+        start('alice', ('them', 'hi'), ('them', 'there'))
+        start('bob', ('them', 'hey'), ('me', 'hello'))
+        _, queries = inbox()
+        for index in range(5):
+            start(f'user{index}', ('them', 'ping'))
+        start('carol', ('me', 'sent'), ('them', 'latest'))
+
+        payload, more_queries = inbox()
+        self.assertEqual(more_queries, queries)
+        latest = payload['conversations'][0]
+        self.assertEqual(latest['other_user']['username'], 'carol')
+        self.assertTrue(latest['other_user']['is_online'])
+        self.assertEqual((latest['last_message']['content'], latest['unread_count']), ('latest', 1))
+
+        payload, _ = inbox(page_size=7)
+        self.assertTrue(payload['pagination']['has_more'])
+        payload, _ = inbox(page_size=7, cursor=payload['pagination']['next_cursor'])
+        (first,) = payload['conversations']
+        self.assertEqual((first['other_user']['username'], first['unread_count']), ('alice', 2))
+        self.assertEqual(first['last_message']['content'], 'there')
+
+
+class MessageHistoryTest(TestCase):
+    """Message history pages backwards by cursor and catches up with ?since="""
+
+    def test_history_pages_and_since(self):
+        me = CustomUser.objects.create_user(username='me', password='pass12345')
+        them = CustomUser.objects.create_user(username='them', password='pass12345')
+        conversation = Conversation.objects.create()
+        conversation.participants.add(me, them)
+        messages = [Message.objects.create(conversation=conversation, sender=them, content=f'm{index}') for index in range(5)]
+        self.client.force_login(me)
+        url = f'/api/conversations/{conversation.id}/messages/history/'
+
+        def contents(payload):
+            return [message['content'] for message in payload['messages']]
+
+        first = self.client.get(url, {'page_size': 2}).json()
+        self.assertEqual(contents(first), ['m3', 'm4'])
+        self.assertIn('conversation', first)
+        self.assertFalse(Message.objects.filter(is_read=False).exists())
+
+        older = self.client.get(url, {'page_size': 2, 'cursor': first['pagination']['next_cursor']}).json()
+        self.assertEqual(contents(older), ['m1', 'm2'])
+        self.assertNotIn('conversation', older)
+
+        newer = self.client.get(url, {'since': str(messages[2].id), 'page_size': 1}).json()
+        self.assertEqual((contents(newer), newer['pagination']['has_more']), (['m3'], True))
+        self.assertEqual(contents(self.client.get(url, {'since': str(messages[4].id)}).json()), [])
+        self.assertEqual(self.client.get(url, {'since': 'not-a-message'}).status_code, 400)
+
+        for index in (5, 6):
+            Message.objects.create(conversation=conversation, sender=them, content=f'm{index}')
+        newer = self.client.get(url, {'since': str(messages[4].id), 'page_size': 1}).json()
+        self.assertEqual(contents(newer), ['m5'])
+        self.assertEqual(Message.objects.filter(is_read=False).count(), 2)
+        rest = self.client.get(url, {
+            'since': str(messages[4].id), 'page_size': 1, 'cursor': newer['pagination']['next_cursor']
+        }).json()
+        self.assertEqual((contents(rest), rest['pagination']['has_more']), (['m6'], False))
+        self.assertFalse(Message.objects.filter(is_read=False).exists())
+
+
+class PresenceTest(TestCase):
+    """Presence lives in the cache; last_seen reaches UserStatus in batched flushes"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_heartbeats_skip_the_database_until_flushed(self):
+        me = CustomUser.objects.create_user(username='me', password='pass12345')
+        them = CustomUser.objects.create_user(username='them', password='pass12345')
+        self.client.force_login(me)
+
+        self.client.post('/api/conversations/user-status/update/')
+        self.assertFalse(UserStatus.objects.exists())
+        self.assertEqual(presence.online_user_ids([me.id, them.id]), {me.id})
+        status_payload = self.client.get(f'/api/conversations/user-status/{me.id}/').json()['status']
+        self.assertTrue(status_payload['is_online'] and status_payload['user']['is_online'])
+        self.assertFalse(self.client.get(f'/api/conversations/user-status/{them.id}/').json()['status']['is_online'])
+
+        presence.go_offline(me)
+        self.assertFalse(presence.is_online(me.id))
+
+        buffer = presence.LastSeenBuffer(flush_interval=3600)
+        seen = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        UserStatus.objects.create(user=them)
+        presence.heartbeat(me)
+        buffer.record(me.id, seen, True)
+        buffer.record(them.id, seen, False)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(buffer.flush(), 2)
+        self.assertLessEqual(len(context.captured_queries), 5)
+        self.assertEqual(
+            set(UserStatus.objects.values_list('user_id', 'last_seen', 'is_online')),
+            {(me.id, seen, True), (them.id, seen, False)}
+        )
+
+        # The heartbeat lapses without go_offline; the next flush notices
+        cache.clear()
+        self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(
+            set(UserStatus.objects.values_list('user_id', 'last_seen', 'is_online')),
+            {(me.id, seen, False), (them.id, seen, False)}
+        )
+
+
+class UnreadCounterTest(TestCase):
+    """Unread counters rise with new messages and reset when the conversation is read"""
+
+    def test_counters_follow_messages_and_reads(self):
+        me = CustomUser.objects.create_user(username='me', password='pass12345')
+        them = CustomUser.objects.create_user(username='them', password='pass12345')
+        conversation = Conversation.objects.create()
+        conversation.participants.add(me, them)
+        url = f'/api/conversations/{conversation.id}/messages/'
+
+        self.client.force_login(them)
+        for content in ('one', 'two'):
+            self.client.post(url, {'content': content})
+        self.assertEqual(self.client.get('/api/conversations/unread-count/').json()['unread_count'], 0)
+
+        self.client.force_login(me)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get('/api/conversations/unread-count/').json()['unread_count'], 2)
+        self.assertEqual(sum('hiring_message' in query['sql'] for query in context.captured_queries), 0)
+        self.assertEqual(self.client.get('/api/conversations/').json()['conversations'][0]['unread_count'], 2)
+
+        self.client.get(url)
+        self.assertEqual(self.client.get('/api/conversations/unread-count/').json()['unread_count'], 0)
+        self.client.post(url, {'content': 'reply'})
+        self.assertEqual(UnreadCounter.objects.get(user=them).count, 1)
+
+        # A message the reader marked read before it was counted stays uncounted
+        late = Message.objects.create(conversation=conversation, sender=them, content='late')
+        mark_conversation_read(conversation.id, me)
+        record_new_message(late)
+        self.assertEqual(UnreadCounter.objects.get(user=me).count, 0)
+
+        UnreadCounter.objects.update(count=9)
+        rebuild_unread_counters()
+        self.assertEqual(dict(UnreadCounter.objects.values_list('user__username', 'count')), {'me': 0, 'them': 1})
+
+
+class ChunkedUploadTest(TestCase):
+    """Chunked uploads are appended in order, capped by their declared size and attached once"""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name, STORAGES={
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        patcher = mock.patch('hiring.services.chunked_upload.CHUNK_SIZE', 4)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.me = CustomUser.objects.create_user(username='me', password='pass12345')
+        self.client.force_login(self.me)
+
+    def put_chunk(self, upload_id, offset, data):
+        return self.client.put(
+            f'/api/uploads/{upload_id}/chunk/?offset={offset}', data=data, content_type='application/octet-stream'
+        )
+
+    def test_upload_resumes_and_attaches_to_message(self):
+        them = CustomUser.objects.create_user(username='them', password='pass12345')
+        conversation = Conversation.objects.create()
+        conversation.participants.add(self.me, them)
+
+        response = self.client.post('/api/uploads/', {
+            'purpose': 'message_file', 'file_name': 'notes.txt', 'size': 10, 'content_type': 'text/plain'
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.json()['upload']['id']
+
+        ChunkedUpload.objects.update(writing_until=datetime.now(timezone.utc) + timedelta(minutes=1))
+        self.assertEqual(self.put_chunk(upload_id, 0, b'0123').status_code, 409)
+        ChunkedUpload.objects.update(writing_until=None)
+        self.assertEqual(self.put_chunk(upload_id, 0, b'0123').json()['upload']['received'], 4)
+        response = self.put_chunk(upload_id, 0, b'0123')
+        self.assertEqual((response.status_code, response.json()['received']), (409, 4))
+        self.assertEqual(self.put_chunk(upload_id, 4, b'abcde').status_code, 413)
+        self.assertEqual(self.client.post(f'/api/uploads/{upload_id}/complete/').status_code, 409)
+        self.put_chunk(upload_id, 4, b'abcd')
+        self.assertEqual(self.put_chunk(upload_id, 8, b'x').status_code, 400)
+        self.assertEqual(self.put_chunk(upload_id, 8, b'xy').json()['upload']['received'], 10)
+        self.assertEqual(self.client.post(f'/api/uploads/{upload_id}/complete/').json()['upload']['status'], 'complete')
+
+        url = f'/api/conversations/{conversation.id}/messages/send-file/'
+        response = self.client.post(url, {'upload_id': upload_id}, content_type='application/json')
+        self.assertEqual((response.json()['message']['file_name'], response.json()['message']['file_size']), ('notes.txt', 10))
+        message = Message.objects.get()
+        with message.file.open('rb') as f:
+            self.assertEqual(f.read(), b'0123abcdxy')
+        self.assertEqual(self.client.post(url, {'upload_id': upload_id}, content_type='application/json').status_code, 400)
+
+    def test_limits_checked_before_bytes_arrive(self):
+        for file_name, size, expected in (('cv.pdf', 6 * 1024 * 1024, 413), ('cv.exe', 10, 400), ('cv.pdf', 0, 400)):
+            response = self.client.post('/api/uploads/', {
+                'purpose': 'document', 'file_name': file_name, 'size': size
+            }, content_type='application/json')
+            self.assertEqual(response.status_code, expected)
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+    def test_s3_writer_uploads_parts(self):
+        storage = mock.Mock(bucket_name='bucket')
+        storage.get_available_name.side_effect = lambda name: name
+        storage._normalize_name.side_effect = lambda name: f'media/{name}'
+        storage._get_write_parameters.return_value = {'ContentType': 'application/octet-stream'}
+        client = storage.connection.meta.client
+        client.create_multipart_upload.return_value = {'UploadId': 'multi'}
+        client.upload_part.side_effect = [{'ETag': '"one"'}, {'ETag': '"two"'}, {'ETag': '"two-again"'}]
+        writer = S3MultipartWriter(storage)
+        upload = ChunkedUpload(storage_name='posts/videos/clip.mp4', content_type='video/mp4', chunk_size=4, size=6)
+        target = {'Bucket': 'bucket', 'Key': 'media/posts/videos/clip.mp4'}
+
+        writer.start(upload)
+        client.create_multipart_upload.assert_called_once_with(**target, ContentType='video/mp4')
+        self.assertEqual(upload.multipart_id, 'multi')
+
+        for offset, data in ((0, b'0123'), (4, b'45'), (4, b'45')):
+            writer.record(upload, writer.write(upload, offset, data))
+        self.assertEqual(
+            [call.kwargs['PartNumber'] for call in client.upload_part.call_args_list], [1, 2, 2]
+        )
+        self.assertEqual(upload.parts, [{'PartNumber': 1, 'ETag': '"one"'}, {'PartNumber': 2, 'ETag': '"two-again"'}])
+
+        upload.parts.reverse()
+        writer.complete(upload)
+        client.complete_multipart_upload.assert_called_once_with(**target, UploadId='multi', MultipartUpload={
+            'Parts': [{'PartNumber': 1, 'ETag': '"one"'}, {'PartNumber': 2, 'ETag': '"two-again"'}]
+        })
+        writer.abort(upload)
+        client.abort_multipart_upload.assert_called_once_with(**target, UploadId='multi')
+
+    def test_expired_uploads_are_discarded(self):
+        upload_id = self.client.post('/api/uploads/', {
+            'purpose': 'post_video', 'file_name': 'clip.mp4', 'size': 8
+        }, content_type='application/json').json()['upload']['id']
+        self.put_chunk(upload_id, 0, b'0123')
+        upload = ChunkedUpload.objects.get()
+        storage = Post._meta.get_field('video').storage
+        self.assertEqual(storage.size(upload.storage_name), 4)
+        ChunkedUpload.objects.update(updated_at=upload.updated_at - timedelta(days=2))
+
+        self.assertEqual(expire_uploads(), 1)
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, 'aborted')
+        self.assertFalse(storage.exists(upload.storage_name))
+
+
+class ConversationSocketTest(TestCase):
+    """Conversation sockets receive new messages, read receipts and typing events"""
+
+    def make_conversation(self):
+        me = CustomUser.objects.create_user(username='me', password='pass12345')
+        them = CustomUser.objects.create_user(username='them', password='pass12345')
+        outsider = CustomUser.objects.create_user(username='outsider', password='pass12345')
+        conversation = Conversation.objects.create()
+        conversation.participants.add(me, them)
+        return me, them, outsider, conversation
+
+    def send_message(self, user, conversation, content):
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/conversations/{conversation.id}/messages/', {'content': content})
+
+    def read_messages(self, user, conversation):
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(f'/api/conversations/{conversation.id}/messages/')
+
+    async def test_events_reach_participants(self):
+        me, them, outsider, conversation = await database_sync_to_async(self.make_conversation)()
+        application = URLRouter(websocket_urlpatterns)
+
+        def socket(user):
+            communicator = WebsocketCommunicator(application, f'/ws/conversations/{conversation.id}/')
+            communicator.scope['user'] = user
+            return communicator
+
+        rejected = socket(outsider)
+        connected, _ = await rejected.connect()
+        self.assertFalse(connected)
+
+        mine, theirs = socket(me), socket(them)
+        self.assertTrue((await mine.connect())[0])
+        self.assertTrue((await theirs.connect())[0])
+
+        await database_sync_to_async(self.send_message)(them, conversation, 'hello')
+        self.assertEqual(await mine.receive_json_from(), {'type': 'unread', 'total': 1})
+        event = await mine.receive_json_from()
+        self.assertEqual((event['type'], event['message']['content']), ('message.new', 'hello'))
+        self.assertEqual((await theirs.receive_json_from())['type'], 'message.new')
+
+        await database_sync_to_async(self.read_messages)(me, conversation)
+        event = await theirs.receive_json_from()
+        self.assertEqual((event['type'], event['user_id']), ('message.read', me.pk))
+        received = [(await mine.receive_json_from())['type'] for _ in range(2)]
+        self.assertEqual(sorted(received), ['message.read', 'unread'])
+
+        await theirs.send_json_to({'type': 'typing', 'is_typing': True})
+        self.assertEqual(await mine.receive_json_from(), {'type': 'typing', 'user_id': them.pk, 'is_typing': True})
+        await theirs.receive_json_from()
+
+        await theirs.send_json_to({'type': 'read'})
+        self.assertTrue(await mine.receive_nothing())
+
+        await mine.disconnect()
+        await theirs.disconnect()
+
+
+class CommentTreeTest(TestCase):
+    """Comment threads load in a fixed number of queries and nest in memory"""
+
+    def test_threads_nest_and_respect_depth(self):
+        author = CustomUser.objects.create_user(username='author', password='pass12345')
+        post = Post.objects.create(author=author, title='Hello', content='World')
+        first = Comment.objects.create(post=post, author=author, content='first')
+        second = Comment.objects.create(post=post, author=author, content='second')
+        reply = Comment.objects.create(post=post, author=author, content='reply', parent_comment=first)
+        nested = Comment.objects.create(post=post, author=author, content='nested', parent_comment=reply)
+        Comment.objects.create(post=post, author=author, content='deep', parent_comment=nested)
+        Comment.objects.create(post=post, author=author, content='late reply', parent_comment=first)
+        self.client.force_login(author)
+
+        def contents(threads):
+            return [(thread['content'], contents(thread['replies'])) for thread in threads]
+
+        with CaptureQueriesContext(connection) as context:
+            payload = self.client.get(f'/api/post-comments/{post.id}/', {'page_size': 1}).json()
+        self.assertEqual(contents(payload['comments']), [('second', [])])
+        tree_queries = len(context.captured_queries)
+
+        with CaptureQueriesContext(connection) as context:
+            payload = self.client.get(
+                f'/api/post-comments/{post.id}/', {'page_size': 1, 'cursor': payload['pagination']['next_cursor']}
+            ).json()
+        self.assertEqual(len(context.captured_queries), tree_queries)
+        self.assertEqual(contents(payload['comments']), [
+            ('first', [('reply', [('nested', [('deep', [])])]), ('late reply', [])])
+        ])
+        self.assertEqual(payload['comments'][0]['replies_count'], 2)
+        self.assertFalse(payload['pagination']['has_more'])
+
+        request = self.client.get(f'/api/post-comments/{post.id}/').wsgi_request
+        _, threads = post_comment_tree(post, request, max_depth=2)
+        self.assertEqual(contents(threads)[1], ('first', [('reply', [('nested', [])]), ('late reply', [])]))
@@ -0,0 +1,83 @@
+# upload_views.py - resumable chunked uploads
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.parsers import FormParser, JSONParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .serializers import ChunkedUploadSerializer
+from .services.chunked_upload import (
+    UploadError, abort_upload, append_chunk, complete_upload, get_upload, start_upload
+)
+
+
+def upload_error_response(error):
+    data = {'success': False, 'error': str(error)}
+    if error.received is not None:
+        data['received'] = error.received
+    return Response(data, status=error.status_code)
+
+
+def upload_response(upload, status_code=status.HTTP_200_OK):
+    return Response({'success': True, 'upload': ChunkedUploadSerializer(upload).data}, status=status_code)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([JSONParser, FormParser])
+def api_start_upload(request):
+    """
+    Open a chunked upload. Takes purpose (message_file, document or
+    post_video), file_name, size in bytes and optionally content_type.
+    """
+    try:
+        size = int(request.data.get('size'))
+    except (TypeError, ValueError):
+        return Response({'success': False, 'error': 'size must be a number of bytes'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        upload = start_upload(
+            request.user, request.data.get('purpose', ''), request.data.get('file_name', ''), size,
+            request.data.get('content_type', '')
+        )
+    except UploadError as e:
+        return upload_error_response(e)
+    return upload_response(upload, status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def api_upload_detail(request, upload_id):
+    """GET reports progress, including the received offset to resume from. DELETE aborts the upload."""
+    try:
+        if request.method == 'DELETE':
+            return upload_response(abort_upload(request.user, upload_id))
+        return upload_response(get_upload(request.user, upload_id))
+    except UploadError as e:
+        return upload_error_response(e)
+
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def api_upload_chunk(request, upload_id):
+    """
+    Append the raw request body at ?offset=, which must equal the bytes
+    received so far. The body is read straight from the request stream.
+    """
+    try:
+        offset = int(request.query_params.get('offset', ''))
+    except ValueError:
+        return Response({'success': False, 'error': 'offset must be a number of bytes'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        return upload_response(append_chunk(request.user, upload_id, offset, request))
+    except UploadError as e:
+        return upload_error_response(e)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def api_complete_upload(request, upload_id):
+    """Finish a fully received upload; its id can then be attached to a message, document or post"""
+    try:
+        return upload_response(complete_upload(request.user, upload_id))
+    except UploadError as e:
+        return upload_error_response(e)
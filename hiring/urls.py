@@ -1,6 +1,7 @@
 from django.urls import path, include
 from . import views
 from . import message_views
+from . import upload_views
 from django.views.generic import TemplateView
 
 
@@ -14,6 +15,7 @@ message_urlpatterns = [
     # Messages within conversation
     path('<uuid:conversation_id>/messages/', message_views.MessageViewSet.as_view({'get': 'list', 'post': 'create'}), name='conversation-messages'),
     path('<uuid:conversation_id>/messages/send-file/', message_views.MessageViewSet.as_view({'post': 'send_file'}), name='send-file'),  # ADD THIS LINE
+    path('<uuid:conversation_id>/messages/history/', message_views.MessageViewSet.as_view({'get': 'history'}), name='conversation-message-history'),
     
     # Users
     path('users/', message_views.UserViewSet.as_view({'get': 'list'}), name='user-list'),
@@ -46,6 +48,12 @@ urlpatterns = [
     # ===================== MESSAGING API =====================
     path('api/conversations/', include(message_urlpatterns)),  # This is the key change!
 
+    # ===================== CHUNKED UPLOAD API =====================
+    path('api/uploads/', upload_views.api_start_upload, name='api_start_upload'),
+    path('api/uploads/<uuid:upload_id>/', upload_views.api_upload_detail, name='api_upload_detail'),
+    path('api/uploads/<uuid:upload_id>/chunk/', upload_views.api_upload_chunk, name='api_upload_chunk'),
+    path('api/uploads/<uuid:upload_id>/complete/', upload_views.api_complete_upload, name='api_complete_upload'),
+
     # ===================== PROFILE API =====================
     path('api/profile/edit/', views.api_edit_profile, name='edit-profile'),
     path('api/profile/', views.api_profile, name='api_profile'),
@@ -65,6 +73,7 @@ urlpatterns = [
     path('api/profile/education/<int:education_id>/update/', views.update_education, name='update_education'),
     
     # Universal preference endpoints (for any preference type)
+    path('api/business/preferences/<int:preference_id>/matches/', views.api_business_preference_matches, name='business_preference_matches'),
     # Business document access URLs
     path('api/business/applications/documents/', views.api_business_applications_with_documents, name='business_applications_documents'),
     path('api/business/applications/<uuid:application_id>/documents/', views.api_business_applicant_documents, name='business_applicant_documents'),
@@ -83,6 +92,8 @@ urlpatterns = [
     # ===================== JOBS & APPLICATIONS =====================
     path('api/applications/', views.api_applications, name='api_applications'),
     path('api/jobs/', views.api_job_listings, name='api_job_listings'),
+    path('api/jobs/search/', views.api_job_search, name='api_job_search'),
+    path('api/jobs/faceted-search/', views.api_job_faceted_search, name='api_job_faceted_search'),
     path('api/jobs/<str:job_id>/', views.api_job_detail, name='api_job_detail'),
     path('api/jobs/<str:job_id>/apply/', views.api_apply_job, name='api_apply_job'),
     path('jobs/<str:job_id>/', views.job_detail_page, name='job_detail_page'),
@@ -169,13 +180,14 @@ urlpatterns = [
    # Post/Feed URLs
     path('api/feed/', views.api_home_feed, name='api_home_feed'),
     path('api/posts/', views.api_posts, name='api_posts'),
-    path('api/posts/<uuid:post_id>/', views.api_post_detail, name='api_post_detail'),
-    path('api/posts/<uuid:post_id>/like-dislike/', views.api_post_like_dislike, name='api_post_like_dislike'),
-    path('api/posts/<uuid:post_id>/share/', views.api_post_share, name='api_post_share'),
-    path('api/posts/<uuid:post_id>/rate/', views.api_post_rating, name='api_post_rating'),
+    path('api/posts/<int:post_id>/', views.api_post_detail, name='api_post_detail'),
+    path('api/posts/<int:post_id>/like-dislike/', views.api_post_like_dislike, name='api_post_like_dislike'),
+    path('api/posts/<int:post_id>/share/', views.api_post_share, name='api_post_share'),
+    path('api/posts/<int:post_id>/rate/', views.api_post_rating, name='api_post_rating'),
     # ADD THIS LINE ↓↓↓
     path('api/post-comments/<int:post_id>/', views.api_post_comments, name='api_post_comments'),
     path('api/posts/feed/', views.api_feed_posts, name='api_feed_posts'),
+    path('api/tags/trending/', views.api_trending_tags, name='api_trending_tags'),
     # ADD THIS LINE ↑↑↑
     path('api/posts/stats/', views.api_post_stats, name='api_post_stats'),
     path('api/posts/user-stats/', views.api_user_post_stats, name='api_user_post_stats'),
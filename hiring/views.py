@@ -10,6 +10,7 @@ import psutil  # for system health check
 from django.db.models import Count, Q
 from django.utils import timezone
 from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from rest_framework.response import Response
 from rest_framework import status
 import time
@@ -52,6 +53,23 @@ from .models import (
 
 # Import serializers
 from .serializers import *
+from .pagination import InvalidCursor, page_params, paginate
+from .services.engagement_counters import (
+    rate_post, record_comment_added, record_share, remove_post_rating, set_post_reaction
+)
+from .services.comment_tree import job_reply_tree, post_comment_tree
+from .services.job_interactions import interaction_counts, with_interaction_counts
+from .services.post_queries import feed_posts
+from .services.post_search import RELEVANCE_ORDERING, search_posts
+from .services.post_tags import sync_post_tags, tagged, trending_tags
+from .services.timeline import ALL_TYPES, timeline_page
+from .services.view_counter import record_post_view
+from .services.matching_service import EmploymentFeatureMatrix, EducationFeatureMatrix, TitleTokenIndex, match_page
+from .services.feature_store import refresh_applicant_features
+from .services.match_cache import cached_matches, load_feature_matrix, match_cache
+from .services.reverse_matching import queue_preference_refresh
+from .services.job_search import search_jobs
+from .services.job_facets import FACET_FIELDS, apply_facet_filters, invalidate_job_facets, job_facet_counts, normalize_selection
 
 # ===== FIXED ADMIN ACCESS CONTROL FUNCTIONS =====
 def has_admin_access(user):
@@ -807,6 +825,7 @@ def api_education(request, education_id=None):
             serializer = EducationCreateSerializer(data=request.data)
             if serializer.is_valid():
                 education = serializer.save(profile=profile)
+                refresh_applicant_features(profile)
                 return Response({
                     'success': True,
                     'education': EducationSerializer(education).data,
@@ -828,6 +847,7 @@ def api_education(request, education_id=None):
             try:
                 education = Education.objects.get(id=education_id, profile=profile)
                 education.delete()
+                refresh_applicant_features(profile)
                 return Response({
                     'success': True,
                     'message': 'Education deleted successfully'
@@ -872,6 +892,7 @@ def api_education(request, education_id=None):
             if serializer.is_valid():
                 try:
                     preference = serializer.save(business_profile=business_profile)
+                    queue_preference_refresh(preference)
                     return Response({
                         'success': True,
                         'preference': BusinessPreferenceSerializer(preference).data,
@@ -923,13 +944,8 @@ def get_applicant_education(profile):
         education = profile.education.all().order_by('-graduation_year', '-start_year')
         education_data = EducationSerializer(education, many=True).data
         
-        # Get business education preferences
-        business_preferences = BusinessPreference.objects.filter(
-            preference_type='education',
-            is_active=True
-        )
-        
-        matches = calculate_education_matches(profile, business_preferences)
+        # Precomputed matches against active business education preferences
+        matches = get_stored_education_matches(profile)
         
         return Response({
             'success': True,
@@ -949,6 +965,7 @@ def create_applicant_education(profile, data):
     if serializer.is_valid():
         try:
             education = serializer.save(profile=profile)
+            refresh_applicant_features(profile)
             
             # Update profile completeness if function exists
             try:
@@ -985,6 +1002,7 @@ def delete_applicant_education(profile, education_id):
     try:
         education = Education.objects.get(id=education_id, profile=profile)
         education.delete()
+        refresh_applicant_features(profile)
         
         # Update profile completeness if function exists
         try:
@@ -1047,6 +1065,7 @@ def create_business_education_preference(business_profile, data):
     if serializer.is_valid():
         try:
             preference = serializer.save(business_profile=business_profile)
+            queue_preference_refresh(preference)
             
             return Response({
                 'success': True,
@@ -1119,6 +1138,7 @@ def update_education(request, education_id):
             serializer = EducationCreateSerializer(education, data=request.data, partial=True)
             if serializer.is_valid():
                 updated_education = serializer.save()
+                refresh_applicant_features(profile)
                 
                 # Update profile completeness if function exists
                 try:
@@ -1159,6 +1179,7 @@ def update_education(request, education_id):
             )
             if serializer.is_valid():
                 updated_preference = serializer.save()
+                queue_preference_refresh(updated_preference)
                 
                 return Response({
                     'success': True,
@@ -1178,6 +1199,20 @@ def update_education(request, education_id):
             }, status=status.HTTP_404_NOT_FOUND)
 
 # DYNAMIC MATCHING CALCULATIONS
+def get_stored_education_matches(applicant_profile):
+    """Precomputed education preference matches for an applicant, best first"""
+    stored = list(applicant_profile.preference_matches.filter(
+        education_preference__isnull=False
+    ).select_related('education_preference__business_profile').order_by('-match_score', 'education_preference_id'))
+    preferences = BusinessPreferenceSerializer([match.education_preference for match in stored], many=True).data
+    
+    return [{
+        'preference': preference_data,
+        'match_score': match.match_score,
+        'match_reasons': match.match_reasons,
+        'company_name': match.education_preference.business_profile.company_name
+    } for match, preference_data in zip(stored, preferences)]
+
 def calculate_education_matches(applicant_profile, business_preferences):
     """Calculate matches between applicant education and business preferences"""
     matches = []
@@ -1234,33 +1269,15 @@ def calculate_education_matches(applicant_profile, business_preferences):
     
     return sorted(matches, key=lambda x: x['match_score'], reverse=True)
 
-def find_education_matching_applicants(preference):
+def find_education_matching_applicants(preference, features=None, limit=None):
     """Find applicants that match business education preferences"""
-    matching_applicants = []
-    
     try:
-        criteria = preference.criteria or {}
-        
-        # Get all applicants with education
-        all_applicants = ApplicantProfile.objects.filter(
-            education__isnull=False
-        ).distinct()
-        
-        for applicant in all_applicants:
-            # Calculate matches for this applicant
-            matches = calculate_education_matches(applicant, [preference])
-            if matches:
-                match_data = matches[0]
-                matching_applicants.append({
-                    'applicant_id': applicant.id,
-                    'applicant_name': applicant.user.get_full_name() or applicant.user.username,
-                    'email': applicant.user.email,
-                    'match_score': match_data['match_score'],
-                    'match_reasons': match_data['match_reasons'],
-                    'highest_degree': get_highest_degree(applicant)
-                })
-        
-        return sorted(matching_applicants, key=lambda x: x['match_score'], reverse=True)
+        # Score the whole applicant pool in one vectorized pass, reusing
+        # results cached for this preference and applicant-feature version
+        def compute():
+            matrix = features if features is not None else load_feature_matrix(EducationFeatureMatrix)
+            return matrix.match(preference, limit=limit)
+        return cached_matches('education', preference, compute, limit)
     
     except Exception as e:
         print(f"Error finding matching applicants: {e}")
@@ -1272,18 +1289,7 @@ def get_highest_degree(applicant):
     if not education:
         return "No degree"
     
-    degree_levels = {
-        'high_school': 1,
-        'associate': 2,
-        'bachelor': 3,
-        'master': 4,
-        'phd': 5,
-        'certificate': 1,
-        'diploma': 2,
-        'other': 1
-    }
-    
-    highest_edu = max(education, key=lambda x: degree_levels.get(x.degree_level, 0))
+    highest_edu = max(education, key=lambda x: Education.DEGREE_LEVEL_RANKS.get(x.degree_level, 0))
     return highest_edu.get_degree_level_display()
 
 
@@ -1306,11 +1312,10 @@ def api_documents(request, document_id=None):
         })
     
     elif request.method == 'POST':
-        serializer = DocumentCreateSerializer(data=request.data)
+        # A multipart file, or the upload_id of a completed chunked upload
+        serializer = DocumentCreateSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             document = serializer.save(profile=profile)
-            document.file_name = request.FILES['file'].name
-            document.save()
             
             # Send notification for document upload
             Alert.objects.create(
@@ -1471,6 +1476,84 @@ def api_job_listings(request):
         'jobs': serializer.data
     })
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def api_job_search(request):
+    """Ranked full-text search over published jobs with pagination"""
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+        page_size = min(100, max(1, int(request.GET.get('page_size', 20))))
+    except ValueError:
+        return Response({
+            'success': False,
+            'error': 'Invalid page or page_size parameter'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return Response({
+            'success': False,
+            'error': 'Search query (q) is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    jobs, total = search_jobs(query, page, page_size)
+    jobs_data = JobListingSerializer(jobs, many=True, context={'request': request}).data
+    for job_data, job in zip(jobs_data, jobs):
+        job_data['search_rank'] = round(float(job.search_rank), 6)
+    
+    return Response({
+        'success': True,
+        'query': query,
+        'jobs': jobs_data,
+        'pagination': {
+            'current_page': page,
+            'total_pages': (total + page_size - 1) // page_size,
+            'total_items': total,
+            'page_size': page_size
+        }
+    })
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def api_job_faceted_search(request):
+    """
+    Published jobs filtered by location, job_category, industry and contract_type
+    (each may repeat), optionally ranked by a search query, with per-facet counts
+    """
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+        page_size = min(100, max(1, int(request.GET.get('page_size', 20))))
+    except ValueError:
+        return Response({
+            'success': False,
+            'error': 'Invalid page or page_size parameter'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    query = request.GET.get('q', '').strip()
+    selected = normalize_selection({field: request.GET.getlist(field) for field in FACET_FIELDS})
+    jobs = apply_facet_filters(JobListing.objects.filter(status='published'), selected)
+    
+    if query:
+        page_jobs, total = search_jobs(query, page, page_size, queryset=jobs)
+    else:
+        jobs = jobs.order_by('-created_at', '-id')
+        total = jobs.count()
+        page_jobs = list(jobs[(page - 1) * page_size:page * page_size])
+    
+    return Response({
+        'success': True,
+        'query': query,
+        'selected': selected,
+        'jobs': JobListingSerializer(page_jobs, many=True, context={'request': request}).data,
+        'facets': job_facet_counts(query, selected),
+        'pagination': {
+            'current_page': page,
+            'total_pages': (total + page_size - 1) // page_size,
+            'total_items': total,
+            'page_size': page_size
+        }
+    })
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def api_job_detail(request, job_id):
@@ -2176,6 +2259,20 @@ def api_system_health(request):
             'color': 'danger'
         })
     
+    # Match cache effectiveness
+    cache_stats = match_cache.stats()
+    health_checks.append({
+        'component': 'Match Cache',
+        'status': 'info',
+        'message': (
+            f"{cache_stats['hits']} hits, {cache_stats['misses']} misses "
+            f"({cache_stats['hit_rate']:.0%} hit rate, {cache_stats['size']}/{cache_stats['maxsize']} entries)"
+        ),
+        'stats': cache_stats,
+        'icon': 'info-circle',
+        'color': 'info'
+    })
+    
     # Background tasks check
     health_checks.append({
         'component': 'Background Tasks',
@@ -3280,9 +3377,8 @@ def get_applicant_employment(profile):
         employment = profile.employment_history.all().order_by('-start_date')
         employment_data = EmploymentHistorySerializer(employment, many=True).data
         
-        # Get business preferences for matching
-        business_preferences = BusinessEmploymentPreference.objects.filter(is_active=True)
-        matches = calculate_employment_matches(profile, business_preferences)
+        # Precomputed matches against active business preferences
+        matches = get_stored_employment_matches(profile)
         
         return Response({
             'success': True,
@@ -3302,6 +3398,7 @@ def create_applicant_employment(profile, data):
     if serializer.is_valid():
         try:
             employment = serializer.save(profile=profile)
+            refresh_applicant_features(profile)
             
             # Update profile completeness if function exists
             try:
@@ -3339,6 +3436,7 @@ def delete_applicant_employment(profile, employment_id):
     try:
         employment = EmploymentHistory.objects.get(id=employment_id, profile=profile)
         employment.delete()
+        refresh_applicant_features(profile)
         
         # Update profile completeness if function exists
         try:
@@ -3398,6 +3496,7 @@ def create_business_preference(business_profile, data):
     if serializer.is_valid():
         try:
             preference = serializer.save(business_profile=business_profile)
+            queue_preference_refresh(preference)
             
             return Response({
                 'success': True,
@@ -3469,6 +3568,7 @@ def update_employment(request, employment_id):
             serializer = EmploymentCreateSerializer(employment, data=request.data, partial=True)
             if serializer.is_valid():
                 updated_employment = serializer.save()
+                refresh_applicant_features(profile)
                 
                 # Update profile completeness if function exists
                 try:
@@ -3510,6 +3610,7 @@ def update_employment(request, employment_id):
             )
             if serializer.is_valid():
                 updated_preference = serializer.save()
+                queue_preference_refresh(updated_preference)
                 
                 return Response({
                     'success': True,
@@ -3544,10 +3645,26 @@ def calculate_experience_months(employment):
     except:
         return 0
 
+def get_stored_employment_matches(applicant_profile):
+    """Precomputed employment preference matches for an applicant, best first"""
+    stored = list(applicant_profile.preference_matches.filter(
+        employment_preference__isnull=False
+    ).select_related('employment_preference__business_profile').order_by('-match_score', 'employment_preference_id'))
+    preferences = BusinessEmploymentPreferenceSerializer([match.employment_preference for match in stored], many=True).data
+    
+    return [{
+        'preference': preference_data,
+        'match_score': match.match_score,
+        'match_reasons': match.match_reasons,
+        'company_name': match.employment_preference.business_profile.company_name,
+        'total_experience_years': match.total_experience_years
+    } for match, preference_data in zip(stored, preferences)]
+
 def calculate_employment_matches(applicant_profile, business_preferences):
     """Calculate matches between applicant employment and business preferences"""
     matches = []
-    applicant_employment = applicant_profile.employment_history.all()
+    applicant_employment = list(applicant_profile.employment_history.all())
+    title_index = TitleTokenIndex([emp.job_title for emp in applicant_employment])
     
     # Calculate total experience
     total_experience_months = sum(calculate_experience_months(emp) for emp in applicant_employment)
@@ -3567,16 +3684,13 @@ def calculate_employment_matches(applicant_profile, business_preferences):
         
         # 2. Check job title keywords match (40 points)
         if hasattr(preference, 'job_title_keywords') and preference.job_title_keywords:
-            for employment in applicant_employment:
-                if employment.job_title:
-                    job_title_lower = employment.job_title.lower()
-                    for keyword in preference.job_title_keywords:
-                        if keyword and keyword.lower() in job_title_lower:
-                            match_score += 40
-                            match_reasons.append(f"Relevant job title: {employment.job_title}")
-                            break
-                    if match_score >= 70:  # If we found a match, break the loop
-                        break
+            matched_records = title_index.lookup_any(preference.job_title_keywords)
+            for record, employment in enumerate(applicant_employment):
+                if record in matched_records:
+                    match_score += 40
+                    match_reasons.append(f"Relevant job title: {employment.job_title}")
+                if match_score >= 70:  # If we found a match, break the loop
+                    break
         
         # 3. Check experience match (30 points)
         required_months = preference.required_experience_years * 12
@@ -3598,37 +3712,83 @@ def calculate_employment_matches(applicant_profile, business_preferences):
     # Sort by match score (highest first)
     return sorted(matches, key=lambda x: x['match_score'], reverse=True)
 
-def find_matching_applicants(preference):
+def find_matching_applicants(preference, features=None, limit=None):
     """Find applicants that match business employment preferences"""
-    matching_applicants = []
-    
     try:
-        # Get all applicants with employment history
-        all_applicants = ApplicantProfile.objects.filter(
-            employment_history__isnull=False
-        ).distinct()
-        
-        for applicant in all_applicants:
-            # Calculate matches for this applicant
-            matches = calculate_employment_matches(applicant, [preference])
-            if matches:
-                match_data = matches[0]  # Get the best match
-                matching_applicants.append({
-                    'applicant_id': applicant.id,
-                    'applicant_name': applicant.user.get_full_name() or applicant.user.username,
-                    'email': applicant.user.email,
-                    'match_score': match_data['match_score'],
-                    'match_reasons': match_data['match_reasons'],
-                    'total_experience_years': match_data['total_experience_years']
-                })
-        
-        # Sort by match score (highest first)
-        return sorted(matching_applicants, key=lambda x: x['match_score'], reverse=True)
+        # Score the whole applicant pool in one vectorized pass, reusing
+        # results cached for this preference and applicant-feature version
+        def compute():
+            matrix = features if features is not None else load_feature_matrix(EmploymentFeatureMatrix)
+            return matrix.match(preference, limit=limit)
+        return cached_matches('employment', preference, compute, limit)
     
     except Exception as e:
         print(f"Error finding matching applicants: {e}")
         return []
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def api_business_preference_matches(request, preference_id):
+    """
+    Paginated matching applicants for one business preference, best first.
+    Query params: type (employment|education), limit, cursor (from next_cursor).
+    """
+    if request.user.user_type != 'admin':
+        return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        business_profile = BusinessProfile.objects.get(user=request.user)
+    except BusinessProfile.DoesNotExist:
+        return Response({
+            'success': False,
+            'error': 'Business profile not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        limit = min(100, max(1, int(request.GET.get('limit', 20))))
+    except ValueError:
+        return Response({
+            'success': False,
+            'error': 'Invalid limit parameter'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    preference_type = request.GET.get('type', 'employment')
+    if preference_type == 'employment':
+        preference = get_object_or_404(BusinessEmploymentPreference, id=preference_id, business_profile=business_profile)
+        matrix_class = EmploymentFeatureMatrix
+    elif preference_type == 'education':
+        preference = get_object_or_404(
+            BusinessPreference, id=preference_id, business_profile=business_profile, preference_type='education'
+        )
+        matrix_class = EducationFeatureMatrix
+    else:
+        return Response({
+            'success': False,
+            'error': 'Invalid type. Allowed: employment, education'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        cursor = request.GET.get('cursor')
+        matches, next_cursor = cached_matches(
+            preference_type, preference,
+            lambda: match_page(load_feature_matrix(matrix_class), preference, limit, cursor),
+            limit, cursor
+        )
+    except ValueError:
+        return Response({
+            'success': False,
+            'error': 'Invalid cursor parameter'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'success': True,
+        'preference_id': preference.id,
+        'preference_type': preference_type,
+        'matches': matches,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    })
+
 
 #profile
 @api_view(['PUT'])
@@ -3918,21 +4078,17 @@ def api_business_applications_with_documents(request):
         
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
-@parser_classes([MultiPartParser, FormParser])  # Use MultiPartParser for file uploads
+@parser_classes([MultiPartParser, FormParser, JSONParser])  # Use MultiPartParser for file uploads
 def api_add_document(request):
-    """Upload a new document"""
+    """Upload a new document, as a file or the upload_id of a completed chunked upload"""
     if request.user.user_type != 'applicant':
         return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
     
     profile = get_object_or_404(ApplicantProfile, user=request.user)
     
-    # Create a mutable copy of the data
-    data = request.data.copy()
-    data['profile'] = profile.id
-    
-    serializer = DocumentCreateSerializer(data=data)
+    serializer = DocumentCreateSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
-        document = serializer.save()
+        document = serializer.save(profile=profile)
         
         return Response({
             'success': True,
@@ -4035,6 +4191,7 @@ def api_admin_jobs(request):
         serializer = AdminJobCreateSerializer(data=data, context={'request': request})
         if serializer.is_valid():
             job = serializer.save()
+            invalidate_job_facets()
             
             # Log the creation
             logger.info(f"User {request.user.username} created job: {job.title} for company: {job.company_name}")
@@ -4114,6 +4271,7 @@ def api_admin_job_detail(request, job_id):
         serializer = AdminJobCreateSerializer(job, data=data, partial=True, context={'request': request})
         if serializer.is_valid():
             updated_job = serializer.save()
+            invalidate_job_facets()
             
             logger.info(f"User {request.user.username} updated job: {job.title} for company: {job.company_name}")
             
@@ -4147,6 +4305,7 @@ def api_admin_job_detail(request, job_id):
         job_title = job.title
         company_name = job.company_name
         job.delete()
+        invalidate_job_facets()
         
         logger.info(f"User {request.user.username} deleted job: {job_title} from company: {company_name}")
         
@@ -4193,6 +4352,7 @@ def api_admin_job_status(request, job_id):
     old_status = job.status
     job.status = new_status
     job.save()
+    invalidate_job_facets()
     
     logger.info(f"Admin {request.user.username} changed job {job.title} status from {old_status} to {new_status}")
     
@@ -4424,6 +4584,7 @@ def api_edit_job(request, job_id):
     
     if serializer.is_valid():
         updated_job = serializer.save()
+        invalidate_job_facets()
         
         print(f"DEBUG: Job updated successfully")
         print(f"DEBUG: New company_logo: {updated_job.company_logo}")
@@ -4560,6 +4721,7 @@ def save_job(request):
                 job.listing_reference = f"JOB-{job.id or 'NEW'}"
             
             job.save()
+            invalidate_job_facets()
             
             return JsonResponse({
                 'success': True,
@@ -4634,13 +4796,18 @@ def api_admin_applications_list(request):
     if request.method == 'POST':
         try:
             data = request.data
-            page = data.get('page', 1)
-            page_size = data.get('page_size', 10)
+            try:
+                page_size, cursor, page, with_total = page_params(data, default_page_size=10)
+            except (TypeError, ValueError):
+                return Response({
+                    'success': False,
+                    'error': 'Invalid page or page_size parameter'
+                }, status=status.HTTP_400_BAD_REQUEST)
             
             # Start with all applications
             applications = Application.objects.select_related(
                 'applicant', 'applicant__user', 'job_listing'
-            ).all().order_by('-applied_date')
+            ).all()
             
             # Apply filters
             status_filter = data.get('status')
@@ -4666,18 +4833,22 @@ def api_admin_applications_list(request):
                     Q(job_listing__company_name__icontains=search_query)
                 )
             
-            # Calculate pagination
-            total_applications = applications.count()
-            total_pages = (total_applications + page_size - 1) // page_size
-            start_index = (page - 1) * page_size
-            end_index = start_index + page_size
-            
-            # Get paginated applications
-            paginated_applications = applications[start_index:end_index]
+            # Keyset pagination on (applied_date, id)
+            try:
+                result = paginate(
+                    applications, ('-applied_date', '-id'), page_size,
+                    cursor=cursor, page=page, with_total=with_total
+                )
+            except InvalidCursor:
+                return Response({
+                    'success': False,
+                    'error': 'Invalid cursor parameter'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            pagination = result.pagination(total_key='total_applications')
             
             # Prepare application data
             application_data = []
-            for app in paginated_applications:
+            for app in result.items:
                 application_data.append({
                     'id': str(app.id),
                     'applicant_name': f"{app.applicant.first_name} {app.applicant.last_name}",
@@ -4708,9 +4879,11 @@ def api_admin_applications_list(request):
             return Response({
                 'success': True,
                 'applications': application_data,
-                'total_pages': total_pages,
+                'total_pages': pagination.get('total_pages'),
                 'current_page': page,
-                'total_applications': total_applications,
+                'total_applications': pagination.get('total_applications'),
+                'next_cursor': result.next_cursor,
+                'has_more': result.has_more,
                 'stats': stats
             })
             
@@ -4948,11 +5121,16 @@ def api_admin_users_list(request):
     
     try:
         data = request.data
-        page = data.get('page', 1)
-        page_size = data.get('page_size', 10)
+        try:
+            page_size, cursor, page, with_total = page_params(data, default_page_size=10)
+        except (TypeError, ValueError):
+            return Response({
+                'success': False,
+                'error': 'Invalid page or page_size parameter'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         # Start with all users
-        users = CustomUser.objects.all().order_by('-date_joined')
+        users = CustomUser.objects.all()
         
         # Apply filters
         user_type_filter = data.get('user_type')
@@ -4985,18 +5163,19 @@ def api_admin_users_list(request):
                 Q(last_name__icontains=search_query)
             )
         
-        # Calculate pagination
-        total_users = users.count()
-        total_pages = (total_users + page_size - 1) // page_size
-        start_index = (page - 1) * page_size
-        end_index = start_index + page_size
-        
-        # Get paginated users
-        paginated_users = users[start_index:end_index]
+        # Keyset pagination on (date_joined, id)
+        try:
+            result = paginate(users, ('-date_joined', '-id'), page_size, cursor=cursor, page=page, with_total=with_total)
+        except InvalidCursor:
+            return Response({
+                'success': False,
+                'error': 'Invalid cursor parameter'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        pagination = result.pagination(total_key='total_users')
         
         # Prepare user data
         user_data = []
-        for user in paginated_users:
+        for user in result.items:
             user_info = {
                 'id': user.id,
                 'username': user.username,
@@ -5055,9 +5234,11 @@ def api_admin_users_list(request):
         return Response({
             'success': True,
             'users': user_data,
-            'total_pages': total_pages,
+            'total_pages': pagination.get('total_pages'),
             'current_page': page,
-            'total_users': total_users,
+            'total_users': pagination.get('total_users'),
+            'next_cursor': result.next_cursor,
+            'has_more': result.has_more,
             'stats': stats
         })
         
@@ -5343,12 +5524,10 @@ def api_admin_analytics(request):
             status_labels.append(item['status'].replace('_', ' ').title())
             status_data.append(item['count'])
         
-        # Top job locations
-        top_locations = JobListing.objects.filter(status='published').values('location').annotate(
-            count=Count('id')
-        ).order_by('-count')[:10]
+        # Top job locations (cached facet counts)
+        top_locations = job_facet_counts()['location'][:10]
         
-        location_labels = [item['location'] for item in top_locations]
+        location_labels = [item['value'] for item in top_locations]
         location_data = [item['count'] for item in top_locations]
         
         # Profile completion statistics
@@ -6117,18 +6296,13 @@ def api_home_feed(request):
         
         # Apply sorting
         if sort_by == 'popular':
-            # Calculate popularity score
-            posts = posts.annotate(
-                popularity_score=(
-                    Count('likes') + 
-                    Count('comments') * 2 + 
-                    F('views') * 0.1 + 
-                    F('shares') * 3
-                )
-            ).order_by('-popularity_score', '-created_at')
+            # Stored, time-decayed score (services.popularity)
+            posts = posts.order_by('-popularity_score', '-created_at')
         elif sort_by == 'top':
             # Top posts based on rating
-            posts = posts.filter(rating_count__gte=3).order_by('-average_rating', '-created_at')
+            posts = posts.filter(rating_count__gte=3).annotate(
+                rating_average=post_average_rating()
+            ).order_by('-rating_average', '-created_at')
         else:  # newest
             posts = posts.order_by('-created_at')
         
@@ -6543,8 +6717,10 @@ def api_posts(request):
     if request.method == 'GET':
         try:
             # Get query parameters
-            page = int(request.GET.get('page', 1))
-            page_size = int(request.GET.get('page_size', 10))
+            try:
+                page_size, cursor, page, with_total = page_params(request.GET, default_page_size=10)
+            except ValueError:
+                return error_response('Invalid page or page_size parameter')
             post_type = request.GET.get('type', 'all')
             show_all = request.GET.get('show_all', 'false').lower() == 'true'
             
@@ -6563,17 +6739,18 @@ def api_posts(request):
             if post_type != 'all':
                 posts = posts.filter(post_type=post_type)
             
-            # Apply pagination
-            total_posts = posts.count()
-            total_pages = (total_posts + page_size - 1) // page_size
-            
-            start_index = (page - 1) * page_size
-            end_index = start_index + page_size
-            paginated_posts = posts.order_by('-created_at')[start_index:end_index]
+            # Apply keyset pagination
+            try:
+                result = paginate(
+                    feed_posts(request.user, posts), ('-created_at', '-id'), page_size,
+                    cursor=cursor, page=page, with_total=with_total
+                )
+            except InvalidCursor:
+                return error_response('Invalid cursor parameter')
             
             # Serialize posts
             serializer = PostSerializer(
-                paginated_posts, 
+                result.items, 
                 many=True, 
                 context={'request': request}
             )
@@ -6581,12 +6758,7 @@ def api_posts(request):
             return Response({
                 'success': True,
                 'posts': serializer.data,
-                'pagination': {
-                    'current_page': page,
-                    'total_pages': total_pages,
-                    'total_posts': total_posts,
-                    'page_size': page_size
-                },
+                'pagination': result.pagination(total_key='total_posts'),
                 'show_all': show_all
             })
             
@@ -6652,6 +6824,7 @@ def api_posts(request):
                 
                 # Save the post
                 post = serializer.save(author=request.user)
+                sync_post_tags(post)
                 
                 print(f"✓ Post created successfully! ID: {post.id}")
                 print(f"Post created successfully! ID: {post.id}, Title: '{post.title}'")
@@ -6750,34 +6923,27 @@ def api_post_detail(request, post_id):
         post = get_object_or_404(Post, id=post_id)
         
         # Check if user can access this post
-        if not post.can_user_view(request.user):
+        if not can_user_view_post(post, request.user):
             return Response({
                 'success': False,
                 'error': 'You do not have permission to access this post'
             }, status=status.HTTP_403_FORBIDDEN)
         
         if request.method == 'GET':
-            # Increment view count if not the author
+            # Count the view if not the author (buffered, once per IP address)
             if request.user != post.author:
-                post.increment_views()
+                record_post_view(request, post)
             
             serializer = PostSerializer(post, context={'request': request})
             
-            # Get comments for this post
-            comments = Comment.objects.filter(
-                post=post, 
-                parent_comment__isnull=True
-            ).order_by('-created_at')
-            comment_serializer = CommentSerializer(
-                comments, 
-                many=True, 
-                context={'request': request}
-            )
+            # First page of comment threads; later pages via api_post_comments
+            comment_page, comments = post_comment_tree(post, request)
             
             return Response({
                 'success': True,
                 'post': serializer.data,
-                'comments': comment_serializer.data,
+                'comments': comments,
+                'comments_pagination': comment_page.pagination(),
                 'can_edit': request.user == post.author or request.user.is_staff,
                 'can_delete': request.user == post.author or request.user.is_staff
             })
@@ -6799,6 +6965,7 @@ def api_post_detail(request, post_id):
             
             if serializer.is_valid():
                 updated_post = serializer.save()
+                sync_post_tags(updated_post)
                 
                 return Response({
                     'success': True,
@@ -6820,7 +6987,7 @@ def api_post_detail(request, post_id):
                 }, status=status.HTTP_403_FORBIDDEN)
             
             post_title = post.title
-            post.delete()
+            post.delete()  # tag counts and timelines are updated by post signals
             
             return Response({
                 'success': True,
@@ -6841,7 +7008,7 @@ def api_post_like_dislike(request, post_id):
     try:
         post = get_object_or_404(Post, id=post_id)
         
-        if not post.can_user_view(request.user):
+        if not can_user_view_post(post, request.user):
             return Response({
                 'success': False,
                 'error': 'You do not have permission to interact with this post'
@@ -6855,38 +7022,18 @@ def api_post_like_dislike(request, post_id):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         action = serializer.validated_data['action']
+        messages = {'like': 'Post liked', 'dislike': 'Post disliked', 'remove': 'Reaction removed'}
         
-        if action == 'like':
-            # Remove from dislikes if present
-            post.dislikes.remove(request.user)
-            # Add to likes
-            post.likes.add(request.user)
-            message = 'Post liked'
-            
-        elif action == 'dislike':
-            # Remove from likes if present
-            post.likes.remove(request.user)
-            # Add to dislikes
-            post.dislikes.add(request.user)
-            message = 'Post disliked'
-            
-        else:  # remove
-            # Remove from both
-            post.likes.remove(request.user)
-            post.dislikes.remove(request.user)
-            message = 'Reaction removed'
-        
-        # Update like/dislike counts
-        likes_count = post.likes.count()
-        dislikes_count = post.dislikes.count()
+        # Swap the reaction and adjust the denormalized counts in one transaction
+        set_post_reaction(post, request.user, action)
         
         return Response({
             'success': True,
-            'message': message,
-            'likes_count': likes_count,
-            'dislikes_count': dislikes_count,
-            'user_has_liked': post.likes.filter(id=request.user.id).exists(),
-            'user_has_disliked': post.dislikes.filter(id=request.user.id).exists()
+            'message': messages[action],
+            'likes_count': post.likes_count,
+            'dislikes_count': post.dislikes_count,
+            'user_has_liked': action == 'like',
+            'user_has_disliked': action == 'dislike'
         })
         
     except Exception as e:
@@ -6952,14 +7099,14 @@ def api_post_share(request, post_id):
     try:
         post = get_object_or_404(Post, id=post_id)
         
-        if not post.can_user_view(request.user):
+        if not can_user_view_post(post, request.user):
             return Response({
                 'success': False,
                 'error': 'You do not have permission to share this post'
             }, status=status.HTTP_403_FORBIDDEN)
         
         # Increment share count
-        post.increment_shares()
+        record_share(post)
         
         return Response({
             'success': True,
@@ -6974,26 +7121,37 @@ def api_post_share(request, post_id):
             'error': 'Failed to share post'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-@api_view(['POST'])
+@api_view(['POST', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def api_post_rating(request, post_id):
-    """Rate a post (1-5 stars)"""
+    """Rate a post (1-5 stars), or remove your rating"""
     try:
         post = get_object_or_404(Post, id=post_id)
         
-        if not post.can_user_view(request.user):
+        if not can_user_view_post(post, request.user):
             return Response({
                 'success': False,
                 'error': 'You do not have permission to rate this post'
             }, status=status.HTTP_403_FORBIDDEN)
         
+        if request.method == 'DELETE':
+            removed = remove_post_rating(post, request.user)
+            return Response({
+                'success': True,
+                'message': 'Rating removed' if removed else 'You have not rated this post',
+                'average_rating': post.average_rating,
+                'rating_count': post.rating_count,
+                'user_rating': None
+            })
+        
         serializer = RatingSerializer(
             data=request.data, 
             context={'request': request, 'post': post}
         )
         
         if serializer.is_valid():
-            rating = serializer.save()
+            # Adjusts the post's rating_sum / rating_count in one UPDATE
+            rating = rate_post(post, request.user, serializer.validated_data['rating'])
             
             return Response({
                 'success': True,
@@ -7034,33 +7192,25 @@ def api_post_comments(request, post_id):
         
         if request.method == 'GET':
             # Get query parameters for pagination
-            page = int(request.GET.get('page', 1))
-            page_size = int(request.GET.get('page_size', 10))
-            
-            # Get all comments for this post (no parent = top-level comments)
-            comments = Comment.objects.filter(post=post, parent_comment__isnull=True)
-            total_comments = comments.count()
-            total_pages = (total_comments + page_size - 1) // page_size
-            
-            # Apply pagination
-            start_index = (page - 1) * page_size
-            end_index = start_index + page_size
-            paginated_comments = comments.order_by('-created_at')[start_index:end_index]
+            try:
+                page_size, cursor, page, with_total = page_params(request.GET, default_page_size=10)
+            except ValueError:
+                return error_response('Invalid page or page_size parameter')
             
-            # Serialize comments
-            from .serializers import CommentSerializer
-            serializer = CommentSerializer(paginated_comments, many=True, context={'request': request})
+            # Page of top-level comments, each with its reply thread
+            try:
+                comment_page, comments = post_comment_tree(
+                    post, request, page_size=page_size, cursor=cursor, page=page, with_total=with_total
+                )
+            except InvalidCursor:
+                return error_response('Invalid cursor parameter')
             
             return Response({
                 'success': True,
                 'message': 'Comments loaded',
-                'comments': serializer.data,
-                'total_comments': total_comments,
-                'pagination': {
-                    'current_page': page,
-                    'total_pages': total_pages,
-                    'page_size': page_size
-                },
+                'comments': comments,
+                'total_comments': post.comment_count,
+                'pagination': comment_page.pagination(),
                 'post_id': post_id,
                 'post_title': post.title
             }, status=status.HTTP_200_OK)
@@ -7096,8 +7246,7 @@ def api_post_comments(request, post_id):
             )
             
             # UPDATE COMMENT COUNT ON POST
-            post.comment_count = Comment.objects.filter(post=post).count()
-            post.save(update_fields=['comment_count'])
+            record_comment_added(comment)
             
             # Create notification for post author (if not commenting on own post)
             if post.author != request.user:
@@ -7173,7 +7322,7 @@ def api_post_stats(request):
         ).order_by('-count')
         
         # Recent activity
-        recent_posts = Post.objects.filter(is_published=True).order_by('-created_at')[:5]
+        recent_posts = feed_posts(request.user, Post.objects.filter(is_published=True)).order_by('-created_at')[:5]
         recent_posts_data = PostSerializer(
             recent_posts, 
             many=True, 
@@ -7181,9 +7330,7 @@ def api_post_stats(request):
         ).data
         
         # Most liked posts
-        most_liked = Post.objects.filter(is_published=True).annotate(
-            likes_count=Count('likes')
-        ).order_by('-likes_count')[:5]
+        most_liked = Post.objects.filter(is_published=True).select_related('author').order_by('-likes_count')[:5]
         
         most_liked_data = []
         for post in most_liked:
@@ -7191,7 +7338,7 @@ def api_post_stats(request):
                 'id': post.id,
                 'title': post.title,
                 'author': post.author.username,
-                'likes_count': post.likes.count(),
+                'likes_count': post.likes_count,
                 'post_type': post.post_type
             })
         
@@ -7231,12 +7378,12 @@ def api_user_post_stats(request):
         total_views = 0
         
         for post in user_posts:
-            total_likes += post.likes.count()
-            total_comments += post.comments.count()
+            total_likes += post.likes_count
+            total_comments += post.comment_count
             total_views += post.views
         
         # Recent posts
-        recent_posts = user_posts.order_by('-created_at')[:5]
+        recent_posts = feed_posts(request.user, user_posts).order_by('-created_at')[:5]
         recent_posts_data = PostSerializer(
             recent_posts, 
             many=True, 
@@ -7245,7 +7392,7 @@ def api_user_post_stats(request):
         
         # Most popular post
         most_popular = user_posts.annotate(
-            engagement=Count('likes') + Count('comments') + F('shares')
+            engagement=F('likes_count') + F('comment_count') + F('shares')
         ).order_by('-engagement').first()
         
         most_popular_data = None
@@ -7289,8 +7436,7 @@ def api_job_comments(request, job_id):
         if request.method == 'GET':
             # Get query parameters
             try:
-                page = max(1, int(request.GET.get('page', 1)))
-                page_size = min(50, max(1, int(request.GET.get('page_size', 20))))
+                page_size, cursor, page, with_total = page_params(request.GET, default_page_size=20, max_page_size=50)
             except ValueError:
                 return error_response('Invalid page or page_size parameter')
             
@@ -7298,16 +7444,21 @@ def api_job_comments(request, job_id):
             comments = Comment.objects.filter(
                 job_posting=job,  # Using your actual field name
                 parent_comment__isnull=True  # Only top-level comments
-            ).order_by('-created_at')
+            )
             
             # Get paginated comments
-            paginated_data = get_paginated_data(
-                queryset=comments,
-                page=page,
-                page_size=page_size,
-                serializer_class=CommentSerializer,
-                context={'request': request}
-            )
+            try:
+                paginated_data = get_paginated_data(
+                    queryset=comments,
+                    page=page,
+                    page_size=page_size,
+                    serializer_class=CommentSerializer,
+                    context={'request': request},
+                    cursor=cursor,
+                    with_total=with_total
+                )
+            except InvalidCursor:
+                return error_response('Invalid cursor parameter')
             
             # Get total comment count
             total_comments = Comment.objects.filter(job_posting=job).count()
@@ -7476,7 +7627,7 @@ def api_job_like_dislike(request, job_id):
 def api_job_listings_with_interactions(request):
     """Get all job listings with interaction counts"""
     try:
-        jobs = JobListing.objects.filter(status='published').order_by('-created_at')
+        jobs = JobListing.objects.filter(status='published').order_by('-created_at', '-id')
         
         # Pagination
         page = request.GET.get('page', 1)
@@ -7488,8 +7639,13 @@ def api_job_listings_with_interactions(request):
         except EmptyPage:
             jobs_page = paginator.page(paginator.num_pages)
         
+        # The page's jobs with all interaction counts in one aggregate query
+        page_jobs = with_interaction_counts(
+            jobs.filter(id__in=jobs_page.object_list.values('id')), request.user
+        ).order_by('-created_at', '-id')
+        
         serializer = JobListingInteractionSerializer(
-            jobs_page, 
+            page_jobs, 
             many=True, 
             context={'request': request}
         )
@@ -7499,7 +7655,7 @@ def api_job_listings_with_interactions(request):
             'jobs': serializer.data,
             'total_pages': paginator.num_pages,
             'current_page': jobs_page.number,
-            'total_jobs': jobs.count()
+            'total_jobs': paginator.count
         })
         
     except Exception as e:
@@ -7529,31 +7685,10 @@ def api_job_interactions(request, job_id):
                 context={'request': request}
             )
             
-            # Get counts
-            likes_count = JobInteraction.objects.filter(
-                job_listing=job, 
-                interaction_type='like'
-            ).count()
-            
-            dislikes_count = JobInteraction.objects.filter(
-                job_listing=job, 
-                interaction_type='dislike'
-            ).count()
-            
-            comments_count = JobInteraction.objects.filter(
-                job_listing=job, 
-                interaction_type='comment',
-                parent_interaction__isnull=True
-            ).count()
-            
             return Response({
                 'success': True,
                 'interactions': serializer.data,
-                'counts': {
-                    'likes': likes_count,
-                    'dislikes': dislikes_count,
-                    'comments': comments_count
-                }
+                'counts': interaction_counts(job)
             })
         
         elif request.method == 'POST':
@@ -7677,19 +7812,10 @@ def api_job_comment_replies(request, interaction_id):
         parent_comment = get_object_or_404(JobInteraction, id=interaction_id)
         
         if request.method == 'GET':
-            replies = JobInteraction.objects.filter(
-                parent_interaction=parent_comment
-            ).order_by('created_at')
-            
-            serializer = JobInteractionSerializer(
-                replies, 
-                many=True, 
-                context={'request': request}
-            )
-            
+            # Whole reply thread (bounded depth and size) in one query
             return Response({
                 'success': True,
-                'replies': serializer.data
+                'replies': job_reply_tree(parent_comment, request)
             })
         
         elif request.method == 'POST':
@@ -7741,18 +7867,18 @@ def api_home_feed(request):
     try:
         # Get and validate query parameters
         try:
-            page = max(1, int(request.GET.get('page', 1)))
-            page_size = min(100, max(1, int(request.GET.get('page_size', 10))))
+            page_size, cursor, page, with_total = page_params(request.GET, default_page_size=10)
         except ValueError:
             return error_response('Invalid page or page_size parameter')
         
         post_type = request.GET.get('type', 'all')
-        sort_by = request.GET.get('sort', 'newest')
         search = request.GET.get('search', '').strip()
+        tag = request.GET.get('tag', '').strip()
+        sort_by = request.GET.get('sort', 'relevance' if search else 'newest')
         
         # Allowed values
         ALLOWED_POST_TYPES = ['all', 'general', 'job-update', 'advice', 'question']
-        ALLOWED_SORT_OPTIONS = ['newest', 'popular', 'top']
+        ALLOWED_SORT_OPTIONS = ['newest', 'popular', 'top', 'relevance']
         
         # Validate parameters
         if post_type not in ALLOWED_POST_TYPES:
@@ -7773,73 +7899,56 @@ def api_home_feed(request):
         if post_type != 'all':
             posts = posts.filter(post_type=post_type)
         
-        # Search filter (case-insensitive)
+        # Filter by tag through the PostTag index (services.post_tags)
+        if tag:
+            posts = tagged(posts, tag)
+        
+        # Indexed full-text search, ranked (services.post_search)
         if search:
-            search_filter = (
-                Q(title__icontains=search) |
-                Q(content__icontains=search) |
-                Q(tags__icontains=search) |
-                Q(author__username__icontains=search) |
-                Q(author__first_name__icontains=search) |
-                Q(author__last_name__icontains=search)
-            )
-            posts = posts.filter(search_filter)
+            posts = search_posts(posts, search)
         
         # Apply sorting
         if sort_by == 'popular':
-            # Calculate popularity score
-            posts = posts.annotate(
-                popularity_score=(
-                    Count('likes') + 
-                    Count('comments') * 2 + 
-                    F('views') * 0.1 + 
-                    F('shares') * 3
-                )
-            ).order_by('-popularity_score', '-created_at')
+            # Stored, time-decayed score (services.popularity)
+            ordering = ('-popularity_score', '-created_at', '-id')
         elif sort_by == 'top':
             # Top posts based on rating
-            posts = posts.filter(rating_count__gte=3).order_by('-average_rating', '-created_at')
+            posts = posts.filter(rating_count__gte=3).annotate(rating_average=post_average_rating())
+            ordering = ('-rating_average', '-created_at', '-id')
+        elif sort_by == 'relevance' and search:
+            ordering = RELEVANCE_ORDERING
         else:  # newest
-            posts = posts.order_by('-created_at')
+            ordering = ('-created_at', '-id')
         
-        # Apply pagination
-        total_posts = posts.count()
-        total_pages = (total_posts + page_size - 1) // page_size
-        
-        start_index = (page - 1) * page_size
-        end_index = start_index + page_size
-        paginated_posts = posts[start_index:end_index]
+        # Apply keyset pagination, serving the default feed from the precomputed timeline
+        try:
+            result = None
+            if sort_by in ('newest', 'relevance') and not search and not tag:
+                result = timeline_page(
+                    post_type, page_size, cursor=cursor, page=page, with_total=with_total, user=request.user
+                )
+            if result is None:
+                result = paginate(feed_posts(request.user, posts), ordering, page_size, cursor=cursor, page=page, with_total=with_total)
+        except InvalidCursor:
+            return error_response('Invalid cursor parameter')
         
         # Serialize posts
         from .serializers import PostSerializer
         serializer = PostSerializer(
-            paginated_posts, 
+            result.items, 
             many=True, 
             context={'request': request}
         )
         
-        # Check which posts user has liked
-        posts_data = serializer.data
-        if request.user.is_authenticated:
-            liked_post_ids = set(
-                request.user.liked_posts.values_list('id', flat=True)
-            )
-            for post in posts_data:
-                post['user_has_liked'] = post['id'] in liked_post_ids
-        
         return Response({
             'success': True,
-            'posts': posts_data,
-            'pagination': {
-                'current_page': page,
-                'total_pages': total_pages,
-                'total_posts': total_posts,
-                'page_size': page_size
-            },
+            'posts': serializer.data,
+            'pagination': result.pagination(total_key='total_posts'),
             'filters': {
                 'current_type': post_type,
                 'current_sort': sort_by,
                 'search_query': search if search else None,
+                'tag': tag if tag else None,
                 'allowed_types': ALLOWED_POST_TYPES,
                 'allowed_sort_options': ALLOWED_SORT_OPTIONS
             },
@@ -7857,54 +7966,67 @@ def api_home_feed(request):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def api_trending_tags(request):
+    """Tags used by the most public posts over the last few days"""
+    try:
+        days = min(90, max(1, int(request.GET.get('days', 7))))
+        limit = min(50, max(1, int(request.GET.get('limit', 10))))
+    except ValueError:
+        return error_response('Invalid days or limit parameter')
+    
+    tags = trending_tags(days=days, limit=limit)
+    return Response({
+        'success': True,
+        'days': days,
+        'tags': [
+            {'name': tag.name, 'slug': tag.slug, 'recent_posts': tag.recent_posts, 'total_posts': tag.post_count}
+            for tag in tags
+        ]
+    })
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def api_feed_posts(request):
     """Get feed of all public posts (simplified version for home page)"""
     try:
-        page = int(request.GET.get('page', 1))
-        page_size = int(request.GET.get('page_size', 20))
+        try:
+            page_size, cursor, page, with_total = page_params(request.GET, default_page_size=20)
+        except ValueError:
+            return error_response('Invalid page or page_size parameter')
         
         # Get all public published posts
         posts = Post.objects.filter(
             is_published=True,
             visibility='public'
-        ).order_by('-created_at')
-        
-        # Apply pagination
-        total_posts = posts.count()
-        total_pages = (total_posts + page_size - 1) // page_size
+        )
         
-        start_index = (page - 1) * page_size
-        end_index = start_index + page_size
-        paginated_posts = posts[start_index:end_index]
+        # Apply keyset pagination, from the precomputed timeline when it covers the page
+        try:
+            result = timeline_page(
+                ALL_TYPES, page_size, cursor=cursor, page=page, with_total=with_total, user=request.user
+            )
+            if result is None:
+                result = paginate(
+                    feed_posts(request.user, posts), ('-created_at', '-id'), page_size,
+                    cursor=cursor, page=page, with_total=with_total
+                )
+        except InvalidCursor:
+            return error_response('Invalid cursor parameter')
         
         # Serialize posts
         from .serializers import PostSerializer
         serializer = PostSerializer(
-            paginated_posts, 
+            result.items, 
             many=True, 
             context={'request': request}
         )
         
-        # Check which posts user has liked
-        posts_data = serializer.data
-        if request.user.is_authenticated:
-            liked_post_ids = set(
-                request.user.liked_posts.values_list('id', flat=True)
-            )
-            for post in posts_data:
-                post['user_has_liked'] = post['id'] in liked_post_ids
-        
         return Response({
             'success': True,
-            'posts': posts_data,
-            'pagination': {
-                'current_page': page,
-                'total_pages': total_pages,
-                'total_posts': total_posts,
-                'page_size': page_size
-            }
+            'posts': serializer.data,
+            'pagination': result.pagination(total_key='total_posts')
         })
         
     except Exception as e:
@@ -7928,7 +8050,7 @@ def api_post_stats(request):
         ).order_by('-count')
         
         # Recent activity
-        recent_posts = Post.objects.filter(is_published=True).order_by('-created_at')[:5]
+        recent_posts = feed_posts(request.user, Post.objects.filter(is_published=True)).order_by('-created_at')[:5]
         
         from .serializers import PostSerializer
         recent_posts_data = PostSerializer(
@@ -7938,9 +8060,7 @@ def api_post_stats(request):
         ).data
         
         # Most liked posts
-        most_liked = Post.objects.filter(is_published=True).annotate(
-            likes_count=Count('likes')
-        ).order_by('-likes_count')[:5]
+        most_liked = Post.objects.filter(is_published=True).select_related('author').order_by('-likes_count')[:5]
         
         most_liked_data = []
         for post in most_liked:
@@ -7948,7 +8068,7 @@ def api_post_stats(request):
                 'id': post.id,
                 'title': post.title,
                 'author': post.author.username,
-                'likes_count': post.likes.count(),
+                'likes_count': post.likes_count,
                 'post_type': post.post_type
             })
         
@@ -7988,12 +8108,12 @@ def api_user_post_stats(request):
         total_views = 0
         
         for post in user_posts:
-            total_likes += post.likes.count()
-            total_comments += post.comments.count()
+            total_likes += post.likes_count
+            total_comments += post.comment_count
             total_views += post.views
         
         # Recent posts
-        recent_posts = user_posts.order_by('-created_at')[:5]
+        recent_posts = feed_posts(request.user, user_posts).order_by('-created_at')[:5]
         
         from .serializers import PostSerializer
         recent_posts_data = PostSerializer(
@@ -8004,7 +8124,7 @@ def api_user_post_stats(request):
         
         # Most popular post
         most_popular = user_posts.annotate(
-            engagement=Count('likes') + Count('comments') + F('shares')
+            engagement=F('likes_count') + F('comment_count') + F('shares')
         ).order_by('-engagement').first()
         
         most_popular_data = None
@@ -8059,25 +8179,18 @@ def can_user_view_post(post, user):
         return user == post.author  # You can add more logic here later
     return False
 
-def get_paginated_data(queryset, page, page_size, serializer_class, context=None):
-    """Helper to get paginated data"""
-    total = queryset.count()
-    total_pages = (total + page_size - 1) // page_size
-    
-    start_index = (page - 1) * page_size
-    end_index = start_index + page_size
-    
-    paginated_items = queryset[start_index:end_index]
-    serializer = serializer_class(paginated_items, many=True, context=context)
+def get_paginated_data(queryset, page, page_size, serializer_class, context=None, cursor=None,
+                       ordering=('-created_at', '-id'), with_total=False):
+    """
+    Helper to get paginated data using keyset pagination (see hiring.pagination).
+    Raises InvalidCursor for a malformed cursor.
+    """
+    result = paginate(queryset, ordering, page_size, cursor=cursor, page=page, with_total=with_total)
+    serializer = serializer_class(result.items, many=True, context=context)
     
     return {
         'data': serializer.data,
-        'pagination': {
-            'current_page': page,
-            'total_pages': total_pages,
-            'total_items': total,
-            'page_size': page_size
-        }
+        'pagination': result.pagination()
     }
 
 def get_user_visibility_filters(user):